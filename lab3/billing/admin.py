@@ -1,5 +1,15 @@
 from django.contrib import admin
-from .models import Provider, Barrel, Invoice, InvoiceLine
+from django.db import transaction
+from .models import (
+    BillingRollup,
+    BillingRollupMonth,
+    Provider,
+    Barrel,
+    Invoice,
+    InvoiceLine,
+    Job,
+    ProviderLitersSummary,
+)
 
 @admin.register(Provider)
 class ProviderAdmin(admin.ModelAdmin):
@@ -11,6 +21,13 @@ class BarrelAdmin(admin.ModelAdmin):
     list_filter = ("billed", "oil_type")
     search_fields = ("number", "oil_type", "provider__name")
 
+    def delete_queryset(self, request, queryset):
+        # "Delete selected" would use QuerySet.delete(), which skips
+        # Barrel.delete and leaves ProviderLitersSummary behind.
+        with transaction.atomic():
+            for barrel in queryset:
+                barrel.delete()
+
 class InvoiceLineInline(admin.TabularInline):
     model = InvoiceLine
     extra = 0
@@ -19,3 +36,21 @@ class InvoiceLineInline(admin.TabularInline):
 class InvoiceAdmin(admin.ModelAdmin):
     list_display = ("id", "provider", "invoice_no", "issued_on")
     inlines = [InvoiceLineInline]
+
+@admin.register(ProviderLitersSummary)
+class ProviderLitersSummaryAdmin(admin.ModelAdmin):
+    list_display = ("provider", "billed_liters", "liters_to_bill", "billed_barrels", "barrels_to_bill")
+
+@admin.register(BillingRollupMonth)
+class BillingRollupMonthAdmin(admin.ModelAdmin):
+    list_display = ("provider", "month", "stale", "refreshed_at")
+    list_filter = ("stale",)
+
+@admin.register(BillingRollup)
+class BillingRollupAdmin(admin.ModelAdmin):
+    list_display = ("period", "oil_type", "invoices", "lines", "liters", "amount")
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "status", "attempts", "created_by", "created_at", "finished_at")
+    list_filter = ("status", "kind")
@@ -0,0 +1,114 @@
+"""Async read-only list/detail endpoints for providers, barrels and invoices.
+
+For the ASGI deployment (``config.asgi``): these views run on the event loop
+and fetch rows with the async ORM, so a worker keeps serving other requests
+while one waits on PostgreSQL. They return the same JSON as the list/detail
+actions of the DRF viewsets. Scoping, filters, ordering and keyset
+pagination are taken from the viewset itself, and rows are built by the
+viewset's row serializer.
+
+Writes, the per-object response cache and conditional GET stay on the DRF
+viewsets, which run in a thread under ASGI.
+"""
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.request import Request
+
+from users.authentication import ClaimsJWTAuthentication
+
+from ..replicas import areplica_reads
+from .renderers import FastJSONRenderer
+from .views import BarrelViewSet, InvoiceViewSet, ProviderViewSet
+
+
+class AsyncJWTAuthentication(ClaimsJWTAuthentication):
+    async def aauthenticate(self, request):
+        """``authenticate`` with the user lookup moved off the event loop."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await sync_to_async(self.get_user)(validated_token), validated_token
+
+
+class AsyncReadOnlyView(View):
+    viewset_class = None
+    http_method_names = ["get", "head", "options"]
+
+    async def get(self, request, pk=None):
+        drf_request = Request(request, authenticators=(), parsers=())
+        try:
+            user_auth = await AsyncJWTAuthentication().aauthenticate(request)
+            if user_auth is None:
+                raise exceptions.NotAuthenticated()
+            drf_request.user, drf_request.auth = user_auth
+
+            action = "list" if pk is None else "retrieve"
+            viewset = self.viewset_class(
+                request=drf_request, action=action, args=(), kwargs={"pk": pk}, format_kwarg=None
+            )
+            async with areplica_reads(drf_request.user):
+                if pk is None:
+                    data = await self.list(viewset, drf_request)
+                else:
+                    data = await self.retrieve(viewset, pk)
+        except exceptions.APIException as exc:
+            return self.error_response(exc)
+        return self.json_response(data)
+
+    async def list(self, viewset, request):
+        queryset = viewset.filter_queryset(viewset.get_queryset())
+        rows = viewset.row_serializer_class.values(queryset)
+        paginator = viewset.paginator
+        page = None if paginator is None else await paginator.apaginate_queryset(
+            rows, request, view=viewset
+        )
+        if page is None:
+            return await viewset.row_serializer_class([row async for row in rows]).adata()
+        data = await viewset.row_serializer_class(page).adata()
+        return paginator.get_paginated_response(data).data
+
+    async def retrieve(self, viewset, pk):
+        queryset = viewset.row_serializer_class.values(viewset.get_queryset().filter(pk=pk))
+        row = await queryset.afirst()
+        if row is None:
+            # get_object_or_404's message, as the viewset would answer.
+            model_name = viewset.queryset.model._meta.object_name
+            raise exceptions.NotFound(f"No {model_name} matches the given query.")
+        return (await viewset.row_serializer_class([row]).adata())[0]
+
+    def json_response(self, data, status=200):
+        return HttpResponse(
+            FastJSONRenderer().render(data),
+            status=status,
+            content_type=FastJSONRenderer.media_type,
+        )
+
+    def error_response(self, exc):
+        # Same body and headers as DRF's default exception handler.
+        if isinstance(exc.detail, (list, dict)):
+            data = exc.detail
+        else:
+            data = {"detail": exc.detail}
+        response = self.json_response(data, status=exc.status_code)
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            response["WWW-Authenticate"] = AsyncJWTAuthentication().authenticate_header(None)
+        return response
+
+
+class AsyncProviderView(AsyncReadOnlyView):
+    viewset_class = ProviderViewSet
+
+
+class AsyncBarrelView(AsyncReadOnlyView):
+    viewset_class = BarrelViewSet
+
+
+class AsyncInvoiceView(AsyncReadOnlyView):
+    viewset_class = InvoiceViewSet
@@ -0,0 +1,114 @@
+"""Per-object cache of serialized detail responses.
+
+Entries live in the ``responses`` cache alias (locmem by default, Redis when
+``RESPONSE_CACHE_URL`` is set) and are keyed by resource, object id,
+requester scope and the change version of the state the request depends on
+(``ConditionalGetMixin.change_state``). That version is read from the
+database and bumped in the same transaction as any write to the provider's
+data. So once a write commits, no worker looks up the entries built before
+it, whichever process made the write, and an entry filled by a read that
+raced the commit is stored under the version that read saw. Entries of
+older versions are never read again and expire after the alias's
+``TIMEOUT``.
+"""
+
+from django.core.cache import caches
+from rest_framework.response import Response
+
+from ..replicas import primary_reads
+
+CACHE_ALIAS = "responses"
+CACHE_HEADER = "X-Cache"
+SUPERUSER_SCOPE = "all"
+KINDS = ("provider", "invoice")
+OUTCOMES = ("hits", "misses")
+
+
+def _backend():
+    return caches[CACHE_ALIAS]
+
+
+def scope_for(user) -> str | None:
+    if user.is_superuser:
+        return SUPERUSER_SCOPE
+    if user.provider_id is None:
+        return None
+    return f"provider-{user.provider_id}"
+
+
+def cache_key(kind: str, object_id: int, scope: str, version) -> str:
+    return f"response:{kind}:{object_id}:{scope}:{version}"
+
+
+def _count(kind: str, outcome: str, amount: int = 1) -> None:
+    backend = _backend()
+    key = f"response-stats:{kind}:{outcome}"
+    # add() is a no-op if the counter exists; incr() is atomic on Redis.
+    backend.add(key, 0, timeout=None)
+    try:
+        backend.incr(key, amount)
+    except ValueError:
+        # Evicted between add() and incr().
+        backend.set(key, amount, timeout=None)
+
+
+def stats() -> dict:
+    keys = {
+        f"response-stats:{kind}:{outcome}": (kind, outcome)
+        for kind in KINDS
+        for outcome in OUTCOMES
+    }
+    stored = _backend().get_many(list(keys))
+    result = {kind: dict.fromkeys(OUTCOMES, 0) for kind in KINDS}
+    for key, (kind, outcome) in keys.items():
+        result[kind][outcome] = stored.get(key, 0)
+    for kind_stats in result.values():
+        lookups = kind_stats["hits"] + kind_stats["misses"]
+        kind_stats["hit_ratio"] = round(kind_stats["hits"] / lookups, 4) if lookups else None
+    return result
+
+
+class CachedRetrieveMixin:
+    """Serve ``retrieve`` from the response cache.
+
+    Set ``response_cache_kind`` and implement ``get_cached_owner(data)``,
+    returning the provider id a cached payload belongs to; non-superusers
+    are only served payloads of their own provider. Entries are keyed by
+    ``change_state()``, so ``ConditionalGetMixin`` must come first.
+    """
+
+    response_cache_kind = None
+
+    def get_cached_owner(self, data):
+        raise NotImplementedError
+
+    def retrieve(self, request, *args, **kwargs):
+        scope = scope_for(request.user)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            object_id = int(self.kwargs[lookup_url_kwarg])
+        except (KeyError, TypeError, ValueError):
+            scope = None
+        state = self.change_state() if scope is not None else None
+        if state is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        kind = self.response_cache_kind
+        key = cache_key(kind, object_id, scope, state[0])
+        data = _backend().get(key)
+        if data is not None and (
+            request.user.is_superuser or self.get_cached_owner(data) == request.user.provider_id
+        ):
+            _count(kind, "hits")
+            response = Response(data)
+            response[CACHE_HEADER] = "HIT"
+            return response
+
+        _count(kind, "misses")
+        # Shared entries are built from the primary: a lagging replica could
+        # otherwise store a payload older than the version it is keyed by.
+        with primary_reads():
+            response = super().retrieve(request, *args, **kwargs)
+        _backend().set(key, response.data)
+        response[CACHE_HEADER] = "MISS"
+        return response
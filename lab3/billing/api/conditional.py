@@ -0,0 +1,107 @@
+"""Conditional GET (``ETag`` / ``Last-Modified``) for billing resources.
+
+Validators are derived from ``Provider.change_version`` and
+``Provider.changed_at``, which are bumped in the same transaction as any
+barrel, invoice or line write. The state is read from the database on every
+request, with one primary-key lookup (one small aggregate for superusers),
+so every worker and every writer, job workers and commands included, sees a
+change as soon as it commits. A ``304 Not Modified`` is answered before the
+object lookup, the prefetches or the serializer run.
+
+Requests served by a replica read the state from that same replica, so
+validators always describe the payload they are sent with.
+"""
+
+import hashlib
+
+from django.db.models import Count, Max, Sum
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from ..models import Provider
+from .caching import scope_for
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def provider_change_state(provider_id):
+    """``(change_version, changed_at)`` of one provider, or None if missing."""
+    return (
+        Provider.objects.filter(id=provider_id)
+        .values_list("change_version", "changed_at")
+        .first()
+    )
+
+
+def global_change_state():
+    """One state covering every provider, for superuser requests."""
+    # Count and highest id are part of the version so that creating or
+    # deleting providers changes it even when the sum happens to stay the same.
+    totals = Provider.objects.aggregate(
+        versions=Sum("change_version"),
+        changed_at=Max("changed_at"),
+        count=Count("id"),
+        last_id=Max("id"),
+    )
+    if totals["count"] == 0:
+        return None
+    return f"{totals['versions']}.{totals['count']}.{totals['last_id']}", totals["changed_at"]
+
+
+class ConditionalGetMixin:
+    """Answer ``list`` and ``retrieve`` with ``304`` when nothing changed.
+
+    Must come before ``CachedRetrieveMixin`` so cache lookups are skipped too.
+    Override ``get_change_state()`` to narrow the state a request depends on.
+    """
+
+    def change_state(self):
+        """``get_change_state()``, read once per request."""
+        if not hasattr(self, "_change_state"):
+            self._change_state = self.get_change_state()
+        return self._change_state
+
+    def get_change_state(self):
+        user = self.request.user
+        if user.is_superuser:
+            return global_change_state()
+        if user.provider_id is None:
+            return None
+        return provider_change_state(user.provider_id)
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(super().retrieve, request, *args, **kwargs)
+
+    def _conditional(self, handler, request, *args, **kwargs):
+        state = self.change_state()
+        if state is None:
+            return handler(request, *args, **kwargs)
+
+        version, changed_at = state
+        etag = self._etag(request, version)
+        last_modified = int(changed_at.timestamp())
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        response["Cache-Control"] = CACHE_CONTROL
+        return response
+
+    def _etag(self, request, version):
+        parts = [
+            self.basename,
+            self.action,
+            request.get_host(),
+            request.get_full_path(),
+            scope_for(request.user),
+            str(version),
+            request.accepted_media_type,
+        ]
+        digest = hashlib.sha256("\n".join(map(str, parts)).encode()).hexdigest()
+        return f'"{digest}"'
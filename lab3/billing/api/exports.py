@@ -0,0 +1,103 @@
+import csv
+import json
+from decimal import Decimal
+from itertools import groupby
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from ..models import InvoiceLine
+
+INVOICE_FIELDS = ["id", "provider_id", "invoice_no", "issued_on"]
+LINE_FIELDS = ["id", "barrel_id", "liters", "description", "unit_price"]
+
+CSV_HEADER = [
+    "invoice_id",
+    "provider_id",
+    "invoice_no",
+    "issued_on",
+    "line_id",
+    "barrel_id",
+    "liters",
+    "description",
+    "unit_price",
+]
+
+
+def iter_invoices_with_lines(invoices, chunk_size):
+    """Yield ``(invoice, lines)`` pairs of plain dicts, one invoice at a time.
+
+    Invoices and their lines are read by two server-side cursors that share
+    the invoice ordering, then merged, so only one invoice's lines are held in
+    memory at once regardless of how many rows are exported.
+
+    The two cursors do not share a snapshot. A group of lines whose invoice
+    is missing from the invoice stream (deleted, or ``issued_on`` changed in
+    between) is skipped once the invoices have passed its position, so it
+    never holds back the lines of the invoices after it.
+    """
+    invoices = invoices.prefetch_related(None).order_by("-issued_on", "-id")
+    lines = (
+        InvoiceLine.objects.filter(invoice__in=invoices.values("id"))
+        .order_by("-invoice__issued_on", "-invoice_id", "id")
+        .values("invoice__issued_on", "invoice_id", *LINE_FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+    grouped_lines = groupby(
+        lines, key=lambda line: (line["invoice__issued_on"], line["invoice_id"])
+    )
+    pending = next(grouped_lines, None)
+
+    for invoice in invoices.values(*INVOICE_FIELDS).iterator(chunk_size=chunk_size):
+        position = (invoice["issued_on"], invoice["id"])
+        # Both streams are in descending order: a greater key was passed.
+        while pending is not None and pending[0] > position:
+            pending = next(grouped_lines, None)
+        invoice_lines = []
+        if pending is not None and pending[0] == position:
+            invoice_lines = [
+                {field: line[field] for field in LINE_FIELDS} for line in pending[1]
+            ]
+            pending = next(grouped_lines, None)
+        yield invoice, invoice_lines
+
+
+class _Echo:
+    """File-like object whose ``write`` hands the row back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(invoices, chunk_size):
+    """One CSV row per invoice line; invoices without lines get one empty row."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_HEADER)
+    for invoice, lines in iter_invoices_with_lines(invoices, chunk_size):
+        invoice_columns = [invoice[field] for field in INVOICE_FIELDS]
+        if not lines:
+            yield writer.writerow(invoice_columns + [""] * len(LINE_FIELDS))
+        for line in lines:
+            yield writer.writerow(invoice_columns + [line[field] for field in LINE_FIELDS])
+
+
+def stream_ndjson(invoices, chunk_size):
+    """One JSON object per invoice, shaped like ``InvoiceSerializer`` output."""
+    for invoice, lines in iter_invoices_with_lines(invoices, chunk_size):
+        row = {
+            "id": invoice["id"],
+            "provider": invoice["provider_id"],
+            "invoice_no": invoice["invoice_no"],
+            "issued_on": invoice["issued_on"],
+            "total_liters": sum(line["liters"] for line in lines),
+            "total_amount": sum(
+                (line["liters"] * line["unit_price"] for line in lines), Decimal("0.00")
+            ),
+            "lines": lines,
+        }
+        yield json.dumps(row, cls=DjangoJSONEncoder) + "\n"
+
+
+EXPORT_FORMATS = {
+    "csv": (stream_csv, "text/csv", "invoices.csv"),
+    "ndjson": (stream_ndjson, "application/x-ndjson", "invoices.ndjson"),
+}
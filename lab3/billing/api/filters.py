@@ -1,11 +1,57 @@
 import django_filters
-from ..models import Invoice
+from django.contrib.postgres.lookups import TrigramSimilar
+from django.db import connection
+from django.db.models import Exists, OuterRef, Value
+from django.db.models.functions import Upper
+
+from ..models import Barrel, Invoice, InvoiceLine
 
 
 class InvoiceFilter(django_filters.FilterSet):
+    # Substring search, served by the UPPER(invoice_no) trigram index.
     invoice_no = django_filters.CharFilter(lookup_expr="icontains")
+    # Unique index.
+    invoice_no_exact = django_filters.CharFilter(field_name="invoice_no", lookup_expr="exact")
+    # Case-insensitive prefix, served by the UPPER(invoice_no) text_pattern_ops index.
+    invoice_no_prefix = django_filters.CharFilter(
+        field_name="invoice_no", lookup_expr="istartswith"
+    )
+    invoice_no_similar = django_filters.CharFilter(method="filter_invoice_no_similar")
     issued_on = django_filters.DateFromToRangeFilter()
+    provider = django_filters.NumberFilter(field_name="provider_id")
+    barrel_number = django_filters.CharFilter(method="filter_barrel_number")
+    oil_type = django_filters.CharFilter(method="filter_oil_type")
+    # Annotated by InvoiceViewSet: ?total_amount_min=&total_amount_max=
+    total_liters = django_filters.RangeFilter()
+    total_amount = django_filters.RangeFilter()
 
     class Meta:
         model = Invoice
         fields = ["invoice_no", "issued_on"]
+
+    def filter_invoice_no_similar(self, queryset, name, value):
+        """Trigram similarity (pg_trgm ``%``), tolerant of typos.
+
+        Uses the same UPPER(invoice_no) trigram index as ``invoice_no``.
+        Other databases have no trigram support and fall back to a
+        substring match.
+        """
+        if connection.vendor != "postgresql":
+            return queryset.filter(invoice_no__icontains=value)
+        return queryset.filter(TrigramSimilar(Upper("invoice_no"), Upper(Value(value))))
+
+    def filter_barrel_number(self, queryset, name, value):
+        # Barrel numbers are selective: start from the number index, then
+        # follow the unique barrel index on lines to their invoices.
+        barrels = Barrel.objects.filter(number=value)
+        return queryset.filter(
+            id__in=InvoiceLine.objects.filter(barrel__in=barrels).values("invoice_id")
+        )
+
+    def filter_oil_type(self, queryset, name, value):
+        # Oil types match a large share of invoices: check each invoice of
+        # the page in ordering order through the lines' invoice index
+        # instead of collecting every match first.
+        return queryset.filter(
+            Exists(InvoiceLine.objects.filter(invoice_id=OuterRef("pk"), barrel__oil_type=value))
+        )
@@ -0,0 +1,114 @@
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+from ..models import IdempotentResponse
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyKeyInUse(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "A request with this Idempotency-Key is still being processed."
+    default_code = "idempotency_key_in_use"
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = "This Idempotency-Key was already used with a different request body."
+    default_code = "idempotency_key_reused"
+
+
+def _fingerprint(request) -> str:
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+def _claim(key: str, fingerprint: str) -> IdempotentResponse | None:
+    """Start the request of ``key``: None, or the record of an earlier one."""
+    now = timezone.now()
+    IdempotentResponse.objects.filter(key=key, expires_at__lte=now).delete()
+    try:
+        with transaction.atomic():
+            IdempotentResponse.objects.create(
+                key=key,
+                fingerprint=fingerprint,
+                expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_IN_FLIGHT_TIMEOUT),
+            )
+    except IntegrityError:
+        # Gone again if its request failed just now: answer as if in flight.
+        return IdempotentResponse.objects.filter(key=key).first() or IdempotentResponse(
+            key=key, fingerprint=fingerprint
+        )
+    return None
+
+
+def purge_expired() -> int:
+    """Delete the records that are no longer replayed; returns how many."""
+    deleted, _ = IdempotentResponse.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
+
+
+def idempotent(view_method):
+    """Replay the stored response when a request repeats its Idempotency-Key.
+
+    Keys are scoped to the authenticated user and the request path. Only
+    successful responses are stored (for ``IDEMPOTENCY_KEY_TTL`` seconds);
+    failed requests wrote nothing and may simply be retried. A retry that
+    arrives while the original is still running gets ``409`` instead of
+    queueing on the same row locks. Records are ``IdempotentResponse`` rows,
+    so a retry reaching another worker is answered the same way.
+    """
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if key is None:
+            return view_method(self, request, *args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise ValidationError(
+                {IDEMPOTENCY_HEADER: f"Must be 1 to {MAX_KEY_LENGTH} characters."}
+            )
+
+        scope = hashlib.sha256(
+            f"{request.user.pk}:{request.path}:{key}".encode("utf-8")
+        ).hexdigest()
+        fingerprint = _fingerprint(request)
+
+        stored = _claim(scope, fingerprint)
+        if stored is None:
+            succeeded = False
+            try:
+                response = view_method(self, request, *args, **kwargs)
+                if status.is_success(response.status_code):
+                    IdempotentResponse.objects.filter(key=scope).update(
+                        status=response.status_code,
+                        data=response.data,
+                        expires_at=timezone.now()
+                        + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+                    )
+                    succeeded = True
+                return response
+            finally:
+                if not succeeded:
+                    IdempotentResponse.objects.filter(key=scope).delete()
+
+        if stored.status is None:
+            raise IdempotencyKeyInUse()
+        if stored.fingerprint != fingerprint:
+            raise IdempotencyKeyReused()
+        response = Response(stored.data, status=stored.status)
+        response[REPLAYED_HEADER] = "true"
+        return response
+
+    return wrapper
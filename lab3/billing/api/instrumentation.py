@@ -0,0 +1,236 @@
+"""Per-view query count and latency instrumentation.
+
+``RequestMetricsMiddleware`` counts the SQL queries a request runs and the
+time spent in them, ``TimedRepresentationMixin`` adds the time spent turning
+instances into primitives, and each response gets a ``Server-Timing`` header.
+Finished requests are folded into an in-process histogram keyed by view
+(``InvoiceViewSet.list``, ``InvoiceViewSet.add_line``, ...), read by
+superusers through ``GET /api/request-metrics/``. Every worker process keeps
+its own histogram.
+
+Queries are counted by an ``execute_wrapper`` that every connection gets when
+it connects. It adds to the metrics of the request in the current context,
+so queries are counted on whichever thread runs them: under ASGI the ORM
+works in ``sync_to_async`` threads, not on the event loop.
+"""
+
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# Upper bounds (ms) of the latency histogram buckets; the last one is open.
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+SERVER_TIMING_HEADER = "Server-Timing"
+
+_current = ContextVar("billing_request_metrics", default=None)
+_lock = threading.Lock()
+_histograms = {}
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.view = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.total_time = 0.0
+        self.serializing = False
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += perf_counter() - start
+            self.queries += 1
+
+    def server_timing(self) -> str:
+        return ", ".join(
+            [
+                f'db;desc="{self.queries} queries";dur={self.db_time * 1000:.1f}',
+                f"serializer;dur={self.serializer_time * 1000:.1f}",
+                f"total;dur={self.total_time * 1000:.1f}",
+            ]
+        )
+
+
+def current_metrics() -> RequestMetrics | None:
+    return _current.get()
+
+
+def _record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+@receiver(connection_created, dispatch_uid="billing_request_metrics")
+def install_query_wrapper(sender, connection, **kwargs):
+    """Count the queries of every connection, whichever thread opens it."""
+    if _record_query not in connection.execute_wrappers:
+        # First, so the ``execute_wrapper`` blocks open around this
+        # (re)connection pop their own wrappers, not this one.
+        connection.execute_wrappers.insert(0, _record_query)
+
+
+def view_label(view_func, method: str) -> str:
+    # DRF views set ``cls``, Django's View.as_view() sets ``view_class``.
+    view_class = getattr(view_func, "cls", None) or getattr(view_func, "view_class", None)
+    if view_class is None:
+        return f"{view_func.__module__}.{view_func.__qualname__}"
+    # ViewSet routes map HTTP methods to actions; plain APIViews do not.
+    actions = getattr(view_func, "actions", None) or {}
+    return f"{view_class.__name__}.{actions.get(method.lower(), method.lower())}"
+
+
+def record(metrics: RequestMetrics) -> None:
+    total_ms = metrics.total_time * 1000
+    with _lock:
+        histogram = _histograms.get(metrics.view)
+        if histogram is None:
+            histogram = _histograms[metrics.view] = {
+                "count": 0,
+                "queries": 0,
+                "max_queries": 0,
+                "db_ms": 0.0,
+                "serializer_ms": 0.0,
+                "total_ms": 0.0,
+                "max_total_ms": 0.0,
+                "buckets": [0] * (len(LATENCY_BUCKETS_MS) + 1),
+            }
+        histogram["count"] += 1
+        histogram["queries"] += metrics.queries
+        histogram["max_queries"] = max(histogram["max_queries"], metrics.queries)
+        histogram["db_ms"] += metrics.db_time * 1000
+        histogram["serializer_ms"] += metrics.serializer_time * 1000
+        histogram["total_ms"] += total_ms
+        histogram["max_total_ms"] = max(histogram["max_total_ms"], total_ms)
+        histogram["buckets"][bisect_left(LATENCY_BUCKETS_MS, total_ms)] += 1
+
+
+def stats() -> dict:
+    with _lock:
+        snapshot = {view: dict(h, buckets=list(h["buckets"])) for view, h in _histograms.items()}
+    result = {}
+    for view, histogram in sorted(snapshot.items()):
+        count = histogram["count"]
+        bounds = [str(bound) for bound in LATENCY_BUCKETS_MS] + ["+Inf"]
+        result[view] = {
+            "count": count,
+            "avg_queries": round(histogram["queries"] / count, 2),
+            "max_queries": histogram["max_queries"],
+            "avg_db_ms": round(histogram["db_ms"] / count, 3),
+            "avg_serializer_ms": round(histogram["serializer_ms"] / count, 3),
+            "avg_total_ms": round(histogram["total_ms"] / count, 3),
+            "max_total_ms": round(histogram["max_total_ms"], 3),
+            "latency_ms_buckets": dict(zip(bounds, histogram["buckets"])),
+        }
+    return result
+
+
+def reset() -> None:
+    with _lock:
+        _histograms.clear()
+
+
+def database_stats() -> dict:
+    """Connection reuse settings per database alias, plus pool counters.
+
+    ``pool`` holds psycopg_pool's ``get_stats()`` (``pool_size``,
+    ``pool_available``, ``requests_waiting``, ``requests_wait_ms``, ...) for
+    this worker process, or ``None`` when the alias is not pooled.
+    """
+    result = {}
+    for alias in connections:
+        connection = connections[alias]
+        # Only the PostgreSQL backend has a pool; None unless OPTIONS["pool"].
+        pool = getattr(connection, "pool", None)
+        result[alias] = {
+            "vendor": connection.vendor,
+            "conn_max_age": connection.settings_dict["CONN_MAX_AGE"],
+            "health_checks": connection.settings_dict["CONN_HEALTH_CHECKS"],
+            "pool": None if pool is None else pool.get_stats(),
+        }
+    return result
+
+
+class RequestMetricsMiddleware:
+    """Measure each resolved view; unresolved requests (404s) are not recorded.
+
+    Works under WSGI and ASGI; under ASGI the async views keep running on
+    the event loop instead of being adapted to a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self._acall(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(metrics, start, response)
+
+    async def _acall(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(metrics, start, response)
+
+    def _finish(self, metrics, start, response):
+        metrics.total_time = perf_counter() - start
+        if metrics.view is not None:
+            record(metrics)
+        if getattr(settings, "SERVER_TIMING", True):
+            response[SERVER_TIMING_HEADER] = metrics.server_timing()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = current_metrics()
+        if metrics is not None:
+            metrics.view = view_label(view_func, request.method)
+        return None
+
+
+class TimedRepresentationMixin:
+    """Add ``to_representation`` time to the request's serializer time.
+
+    Only the outermost call is timed, so nested and ``many=True`` serializers
+    are not counted twice. Queries run from here (N+1 lookups) are counted
+    in both the serializer and the database figures.
+    """
+
+    def to_representation(self, instance):
+        metrics = current_metrics()
+        if metrics is None or metrics.serializing:
+            return super().to_representation(instance)
+        metrics.serializing = True
+        start = perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metrics.serializer_time += perf_counter() - start
+            metrics.serializing = False
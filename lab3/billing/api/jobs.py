@@ -0,0 +1,66 @@
+"""Job handlers for the API actions that can run in the background.
+
+``InvoiceViewSet.add_lines`` and ``InvoiceViewSet.export`` enqueue these when
+the client sends ``Prefer: respond-async``. The request is validated up
+front; the job only does the work.
+"""
+
+from decimal import Decimal
+
+from ..jobs import JobError, handler, output_path
+from ..models import BulkBillingError, Invoice
+from .exports import EXPORT_FORMATS
+from .filters import InvoiceFilter
+from .serializers import InvoiceLineNestedSerializer
+from .views import InvoiceViewSet
+
+
+@handler("add_lines")
+def add_lines(job) -> dict:
+    try:
+        invoice = Invoice.objects.get(pk=job.payload["invoice"])
+    except Invoice.DoesNotExist:
+        raise JobError({"detail": "Invoice does not exist."})
+    try:
+        lines = invoice.add_lines_for_barrels(
+            [
+                {
+                    "barrel_id": line["barrel"],
+                    "liters": line["liters"],
+                    "unit_price_per_liter": Decimal(line["unit_price"]),
+                    "description": line["description"],
+                }
+                for line in job.payload["lines"]
+            ]
+        )
+    except BulkBillingError as exc:
+        # Same shape as the synchronous 400 response.
+        raise JobError({"lines": [{"detail": error} if error else {} for error in exc.errors]})
+    return {"lines": InvoiceLineNestedSerializer(lines, many=True).data}
+
+
+@handler("export_invoices")
+def export_invoices(job) -> dict:
+    payload = job.payload
+    invoices = InvoiceViewSet.queryset.all()
+    if payload["provider_id"] is not None:
+        invoices = invoices.for_provider(payload["provider_id"])
+    filterset = InvoiceFilter(payload["filters"], queryset=invoices)
+    if not filterset.is_valid():
+        raise JobError(filterset.errors)
+    stream, content_type, filename = EXPORT_FORMATS[payload["export_format"]]
+
+    path = output_path(job, filename[filename.rindex("."):])
+    # Written aside and renamed, so a download never sees a partial file.
+    # Per attempt: a requeued job may still be written by its earlier run.
+    partial = path.with_name(f"{path.name}.{job.attempts}.part")
+    with open(partial, "w", encoding="utf-8", newline="") as output:
+        for chunk in stream(filterset.qs, InvoiceViewSet.export_chunk_size):
+            output.write(chunk)
+    partial.replace(path)
+    return {
+        "file": path.name,
+        "filename": filename,
+        "content_type": content_type,
+        "size": path.stat().st_size,
+    }
@@ -0,0 +1,178 @@
+import json
+import operator
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from functools import reduce
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(CursorPagination):
+    """Cursor pagination keyed on *every* ordering field.
+
+    DRF's CursorPagination only stores the first ordering field in the cursor
+    and falls back to OFFSET for ties (e.g. many invoices issued on the same
+    day). Here the cursor holds the full ordering tuple of the boundary row and
+    the next page is fetched with a keyset filter, so each page costs the same
+    no matter how deep the client goes. Orderings must end in a unique field.
+    """
+
+    ordering = ("id",)
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_queryset = self._page_queryset(queryset, request, view)
+        if page_queryset is None:
+            return None
+        try:
+            # Fetch one extra row to know whether another page follows.
+            results = list(page_queryset)
+        except (DjangoValidationError, TypeError, ValueError):
+            # Cursor position values that do not fit the ordering fields.
+            raise NotFound(self.invalid_cursor_message)
+        return self._set_page(results)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset`` for async views, on the async ORM."""
+        page_queryset = self._page_queryset(queryset, request, view)
+        if page_queryset is None:
+            return None
+        try:
+            results = [row async for row in page_queryset]
+        except (DjangoValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        return self._set_page(results)
+
+    def _page_queryset(self, queryset, request, view):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            self._reverse, self._position = False, None
+        else:
+            self._reverse, self._position = self.cursor.reverse, self.cursor.position
+
+        ordering = _reverse_ordering(self.ordering) if self._reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        try:
+            if self._position is not None:
+                queryset = queryset.filter(_keyset_filter(ordering, self._position))
+        except (DjangoValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        return queryset[: self.page_size + 1]
+
+    def _set_page(self, results):
+        self.page = results[: self.page_size]
+        has_following_position = len(results) > len(self.page)
+
+        if self._reverse:
+            self.page.reverse()
+            self.has_next = self._position is not None
+            self.has_previous = has_following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = self._position is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        # Client-chosen orderings (OrderingFilter) get id as tie-breaker.
+        if ordering[-1].lstrip("-") not in ("id", "pk"):
+            ordering += ("-id" if ordering[-1].startswith("-") else "id",)
+        return ordering
+
+    def get_next_link(self):
+        # An empty page (its rows were deleted since the cursor was issued)
+        # has no boundary row to link from.
+        if not self.has_next or not self.page:
+            return None
+        position = self._get_position_from_instance(self.page[-1], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        position = self._get_position_from_instance(self.page[0], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            tokens = json.loads(urlsafe_b64decode(encoded.encode("ascii")))
+            reverse = bool(tokens.get("r", 0))
+            position = tokens["p"]
+        except (AttributeError, KeyError, TypeError, ValueError, BinasciiError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        if any(isinstance(value, (list, dict)) for value in position):
+            raise NotFound(self.invalid_cursor_message)
+        return Cursor(offset=0, reverse=reverse, position=position)
+
+    def encode_cursor(self, cursor):
+        tokens = {"p": cursor.position}
+        if cursor.reverse:
+            tokens["r"] = 1
+        encoded = urlsafe_b64encode(
+            json.dumps(tokens, separators=(",", ":")).encode("ascii")
+        ).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _get_position_from_instance(self, instance, ordering):
+        position = []
+        for order in ordering:
+            field_name = order.lstrip("-")
+            if isinstance(instance, dict):
+                attr = instance[field_name]
+            else:
+                attr = getattr(instance, field_name)
+            position.append(str(attr))
+        return position
+
+
+class InvoiceKeysetPagination(KeysetPagination):
+    ordering = ("-issued_on", "-id")
+
+
+class JobKeysetPagination(KeysetPagination):
+    ordering = ("-id",)
+
+
+def _reverse_ordering(ordering):
+    return tuple(order[1:] if order.startswith("-") else f"-{order}" for order in ordering)
+
+
+def _keyset_filter(ordering, position):
+    """Rows strictly after ``position`` in ``ordering``.
+
+    Expands ``(a, b, c) > (x, y, z)`` into
+    ``a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)``, flipping
+    the comparison for descending fields.
+    """
+    alternatives = []
+    equal_prefix = Q()
+    for order, value in zip(ordering, position):
+        field_name = order.lstrip("-")
+        lookup = "lt" if order.startswith("-") else "gt"
+        alternatives.append(equal_prefix & Q(**{f"{field_name}__{lookup}": value}))
+        equal_prefix &= Q(**{field_name: value})
+    return reduce(operator.or_, alternatives)
@@ -0,0 +1,8 @@
+from rest_framework.permissions import BasePermission
+
+
+class IsSuperuser(BasePermission):
+    message = "Only superusers can access this endpoint."
+
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_superuser)
@@ -0,0 +1,41 @@
+"""orjson-backed JSON renderer, byte-compatible with DRF's ``JSONRenderer``.
+
+Only compact output is handled here; indented output (``; indent=N`` or the
+browsable API) and anything orjson refuses are left to ``JSONRenderer``.
+Falls back entirely to ``JSONRenderer`` when orjson is not installed. Floats
+may be spelled differently (``1e16`` vs ``1e+16``); billing payloads carry
+decimals as strings and have none.
+"""
+
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+if orjson is not None:
+    # Datetimes go through DRF's encoder, which formats them differently.
+    ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            rendered = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        except TypeError:
+            # orjson.JSONEncodeError: e.g. integers wider than 64 bits.
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same escaping as JSONRenderer, keeping the output a JavaScript subset.
+        return rendered.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+
+
+FAST_RENDERER_CLASSES = [FastJSONRenderer, BrowsableAPIRenderer]
@@ -0,0 +1,17 @@
+from ..replicas import replica_reads
+
+
+class ReplicaReadMixin:
+    """Serve ``list`` and ``retrieve`` from a read replica when one is configured.
+
+    Must come first among the mixins so the conditional GET and response
+    cache lookups run inside the replica scope too.
+    """
+
+    def list(self, request, *args, **kwargs):
+        with replica_reads(request.user):
+            return super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        with replica_reads(request.user):
+            return super().retrieve(request, *args, **kwargs)
@@ -0,0 +1,137 @@
+"""Read-only fast path for list actions.
+
+Row serializers build the same payload as their ``ModelSerializer``
+counterparts straight from ``.values()`` rows, without model instances or
+per-field serializer objects. ``RowListMixin`` uses one for ``list`` when a
+viewset sets ``row_serializer_class``; every other action keeps the regular
+serializer. The async views (``async_views``) use them for list and detail.
+``test_row_serializers`` checks the output stays byte-for-byte identical.
+"""
+
+from decimal import Decimal
+
+from rest_framework.response import Response
+
+from ..models import InvoiceLine
+from .instrumentation import TimedRepresentationMixin
+
+# DecimalField.to_representation quantizes to the field's decimal places
+# (2 for unit_price and InvoiceSerializer.total_amount).
+_CENT = Decimal("0.01")
+
+
+class BaseRowSerializer:
+    values_fields = ()
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    @classmethod
+    def values(cls, queryset):
+        return queryset.prefetch_related(None).values(*cls.values_fields)
+
+    @property
+    def data(self) -> list[dict]:
+        return self.to_representation(self.rows)
+
+    async def adata(self) -> list[dict]:
+        """``data`` for async views: ``rows`` must already be fetched."""
+        return self.to_representation(self.rows)
+
+    def to_representation(self, rows) -> list[dict]:
+        return [self.row_to_representation(row) for row in rows]
+
+    def row_to_representation(self, row: dict) -> dict:
+        raise NotImplementedError
+
+
+class ProviderRowSerializer(TimedRepresentationMixin, BaseRowSerializer):
+    # billed_liters / liters_to_bill are annotated by ProviderViewSet.
+    values_fields = ("id", "name", "address", "tax_id", "billed_liters", "liters_to_bill")
+
+    def row_to_representation(self, row):
+        return {field: row[field] for field in self.values_fields}
+
+
+class BarrelRowSerializer(TimedRepresentationMixin, BaseRowSerializer):
+    values_fields = ("id", "provider_id", "number", "oil_type", "liters", "billed")
+
+    def row_to_representation(self, row):
+        return {
+            "id": row["id"],
+            "provider": row["provider_id"],
+            "number": row["number"],
+            "oil_type": row["oil_type"],
+            "liters": row["liters"],
+            "billed": row["billed"],
+        }
+
+
+class InvoiceRowSerializer(TimedRepresentationMixin, BaseRowSerializer):
+    # total_liters / total_amount are annotated by InvoiceViewSet.
+    values_fields = ("id", "provider_id", "invoice_no", "issued_on", "total_liters", "total_amount")
+
+    # Set by adata(), which fetches the lines with the async ORM.
+    fetched_lines = None
+
+    @staticmethod
+    def line_rows(invoice_ids):
+        return (
+            InvoiceLine.objects.filter(invoice_id__in=invoice_ids)
+            .order_by("id")
+            .values_list("invoice_id", "id", "barrel_id", "liters", "description", "unit_price")
+        )
+
+    async def adata(self):
+        rows = list(self.rows)
+        if rows:
+            self.fetched_lines = [
+                line async for line in self.line_rows([row["id"] for row in rows])
+            ]
+        return self.to_representation(rows)
+
+    def to_representation(self, rows):
+        rows = list(rows)
+        lines_by_invoice = {row["id"]: [] for row in rows}
+        if lines_by_invoice:
+            lines = self.fetched_lines
+            if lines is None:
+                lines = self.line_rows(list(lines_by_invoice))
+            for invoice_id, line_id, barrel_id, liters, description, unit_price in lines:
+                lines_by_invoice[invoice_id].append(
+                    {
+                        "id": line_id,
+                        "barrel_id": barrel_id,
+                        "liters": liters,
+                        "description": description,
+                        "unit_price": format(unit_price.quantize(_CENT), "f"),
+                    }
+                )
+        return [
+            {
+                "id": row["id"],
+                "provider": row["provider_id"],
+                "invoice_no": row["invoice_no"],
+                "issued_on": row["issued_on"].isoformat(),
+                "total_liters": row["total_liters"],
+                "total_amount": format(row["total_amount"].quantize(_CENT), "f"),
+                "lines": lines_by_invoice[row["id"]],
+            }
+            for row in rows
+        ]
+
+
+class RowListMixin:
+    """Serve ``list`` through ``row_serializer_class`` when it is set."""
+
+    row_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        if self.row_serializer_class is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.row_serializer_class.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(self.row_serializer_class(queryset).data)
+        return self.get_paginated_response(self.row_serializer_class(page).data)
@@ -0,0 +1,25 @@
+from contextlib import ExitStack
+
+from ..scoping import row_level_security
+
+
+class ProviderScopedMixin:
+    """Limit ``get_queryset`` to the rows the requester may see.
+
+    The view's ``queryset`` must come from a ``ProviderScopedQuerySet``
+    (``billing.scoping``); its ``select_related``, prefetches and annotations
+    are kept. With ``POSTGRES_ROW_LEVEL_SECURITY`` on, the whole request also
+    runs under the requester's row-level security scope.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().for_user(self.request.user)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # After authentication, so the scope is the requester's.
+        self._row_level_security.enter_context(row_level_security(request.user))
+
+    def dispatch(self, request, *args, **kwargs):
+        with ExitStack() as self._row_level_security:
+            return super().dispatch(request, *args, **kwargs)
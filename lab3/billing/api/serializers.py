@@ -4,19 +4,28 @@ from django.db.models import Sum
 from django.db.models.functions import Coalesce
 from rest_framework import serializers
 
-from ..models import Barrel, Invoice, InvoiceLine, Provider
+from ..models import Barrel, Invoice, InvoiceLine, Job, Provider
+from .instrumentation import TimedRepresentationMixin
 
 
-class ProviderSerializer(serializers.ModelSerializer):
+class ProviderSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     billed_liters = serializers.SerializerMethodField()
     liters_to_bill = serializers.SerializerMethodField()
 
+    # ProviderViewSet annotates both totals on its queryset; the aggregate
+    # queries are only a fallback for instances loaded elsewhere.
     def get_billed_liters(self, obj: Provider) -> int:
+        annotated = getattr(obj, "billed_liters", None)
+        if annotated is not None:
+            return annotated
         return obj.barrels.filter(billed=True).aggregate(
             total=Coalesce(Sum("liters"), 0)
         )["total"]
 
     def get_liters_to_bill(self, obj: Provider) -> int:
+        annotated = getattr(obj, "liters_to_bill", None)
+        if annotated is not None:
+            return annotated
         return obj.barrels.filter(billed=False).aggregate(
             total=Coalesce(Sum("liters"), 0)
         )["total"]
@@ -26,14 +35,14 @@ class ProviderSerializer(serializers.ModelSerializer):
         fields = ["id", "name", "address", "tax_id", "billed_liters", "liters_to_bill"]
 
 
-class BarrelSerializer(serializers.ModelSerializer):
+class BarrelSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     class Meta:
         model = Barrel
         fields = ["id", "provider", "number", "oil_type", "liters", "billed"]
         read_only_fields = ["provider"]
 
 
-class InvoiceLineNestedSerializer(serializers.ModelSerializer):
+class InvoiceLineNestedSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     # Requirement: return invoice lines WITHOUT the barrel object included.
     # We expose barrel_id only (not nested barrel details).
     barrel_id = serializers.IntegerField(read_only=True)
@@ -66,8 +75,43 @@ class InvoiceLineCreateSerializer(serializers.ModelSerializer):
         )
 
 
-class InvoiceSerializer(serializers.ModelSerializer):
+class InvoiceLineBulkItemSerializer(serializers.Serializer):
+    # Plain id instead of a PrimaryKeyRelatedField: barrels are loaded (and
+    # locked) in one query by Invoice.add_lines_for_barrels.
+    barrel = serializers.IntegerField(min_value=1)
+    liters = serializers.IntegerField(min_value=1)
+    description = serializers.CharField(max_length=255)
+    unit_price = serializers.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        min_value=Decimal("0.01"),
+    )
+
+
+class InvoiceLineBulkCreateSerializer(serializers.Serializer):
+    lines = InvoiceLineBulkItemSerializer(many=True, allow_empty=False, max_length=1000)
+
+    def create(self, validated_data: dict) -> list[InvoiceLine]:
+        invoice = self.context["invoice"]
+        return invoice.add_lines_for_barrels(
+            [
+                {
+                    "barrel_id": line["barrel"],
+                    "liters": line["liters"],
+                    "unit_price_per_liter": line["unit_price"],
+                    "description": line["description"],
+                }
+                for line in validated_data["lines"]
+            ]
+        )
+
+
+class InvoiceSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     lines = InvoiceLineNestedSerializer(many=True, read_only=True)
+    # InvoiceViewSet annotates both totals; to_representation only adds them
+    # up from the lines for instances loaded elsewhere (e.g. just created).
+    total_liters = serializers.IntegerField(read_only=True)
+    total_amount = serializers.DecimalField(max_digits=20, decimal_places=2, read_only=True)
 
     class Meta:
         model = Invoice
@@ -76,15 +120,66 @@ class InvoiceSerializer(serializers.ModelSerializer):
             "provider",
             "invoice_no",
             "issued_on",
+            "total_liters",
+            "total_amount",
             "lines",
         ]
         read_only_fields = ["provider"]
 
-    def to_representation(self, instance):
-        # Validate provider consistency
-        for line in instance.lines.all():
-            if line.barrel.provider != instance.provider:
-                raise serializers.ValidationError(
-                    "barrel provider must match invoice provider"
-                )
+    def to_representation(self, instance: Invoice) -> dict:
+        if not hasattr(instance, "total_amount"):
+            lines = list(instance.lines.all())
+            instance.total_liters = sum(line.liters for line in lines)
+            instance.total_amount = sum(
+                (line.liters * line.unit_price for line in lines), Decimal("0")
+            )
         return super().to_representation(instance)
+
+
+class BillingReportQuerySerializer(serializers.Serializer):
+    period = serializers.ChoiceField(choices=["month", "week"], default="month")
+    # Same parameter names as InvoiceFilter's issued_on range.
+    issued_on_after = serializers.DateField(required=False)
+    issued_on_before = serializers.DateField(required=False)
+    provider = serializers.IntegerField(required=False, min_value=1)
+
+    def validate(self, attrs: dict) -> dict:
+        after, before = attrs.get("issued_on_after"), attrs.get("issued_on_before")
+        if after and before and after > before:
+            raise serializers.ValidationError(
+                {"issued_on_before": "Must not be earlier than issued_on_after."}
+            )
+        return attrs
+
+
+class BillingReportRowSerializer(serializers.Serializer):
+    provider = serializers.IntegerField()
+    period_start = serializers.DateField()
+    oil_type = serializers.CharField()
+    invoices = serializers.IntegerField()
+    lines = serializers.IntegerField()
+    liters = serializers.IntegerField()
+    amount = serializers.DecimalField(max_digits=20, decimal_places=2)
+
+
+class BillingRollupRefreshSerializer(serializers.Serializer):
+    provider = serializers.IntegerField(required=False, min_value=1)
+    full = serializers.BooleanField(default=False)
+
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = [
+            "id",
+            "kind",
+            "status",
+            "attempts",
+            "max_attempts",
+            "result",
+            "error",
+            "created_at",
+            "started_at",
+            "finished_at",
+        ]
+        read_only_fields = fields
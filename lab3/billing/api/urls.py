@@ -1,12 +1,44 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ProviderViewSet, BarrelViewSet, InvoiceViewSet
+from .async_views import AsyncBarrelView, AsyncInvoiceView, AsyncProviderView
+from .views import (
+    BarrelViewSet,
+    BillingReportView,
+    BillingRollupRefreshView,
+    DatabaseStatsView,
+    InvoiceViewSet,
+    JobViewSet,
+    ProviderViewSet,
+    RequestMetricsView,
+    ResponseCacheStatsView,
+)
 
 router = DefaultRouter()
 router.register(r"providers", ProviderViewSet, basename="provider")
 router.register(r"barrels", BarrelViewSet, basename="barrel")
 router.register(r"invoices", InvoiceViewSet, basename="invoice")
+router.register(r"jobs", JobViewSet, basename="job")
+
+# Async read-only twins of the list/detail routes, for ASGI workers.
+async_urlpatterns = [
+    path("providers/", AsyncProviderView.as_view(), name="async-provider-list"),
+    path("providers/<int:pk>/", AsyncProviderView.as_view(), name="async-provider-detail"),
+    path("barrels/", AsyncBarrelView.as_view(), name="async-barrel-list"),
+    path("barrels/<int:pk>/", AsyncBarrelView.as_view(), name="async-barrel-detail"),
+    path("invoices/", AsyncInvoiceView.as_view(), name="async-invoice-list"),
+    path("invoices/<int:pk>/", AsyncInvoiceView.as_view(), name="async-invoice-detail"),
+]
 
 urlpatterns = [
     path("", include(router.urls)),
+    path("async/", include(async_urlpatterns)),
+    path("reports/billing/", BillingReportView.as_view(), name="billing-report"),
+    path(
+        "reports/billing/refresh/",
+        BillingRollupRefreshView.as_view(),
+        name="billing-report-refresh",
+    ),
+    path("cache-stats/", ResponseCacheStatsView.as_view(), name="cache-stats"),
+    path("request-metrics/", RequestMetricsView.as_view(), name="request-metrics"),
+    path("db-stats/", DatabaseStatsView.as_view(), name="db-stats"),
 ]
@@ -1,32 +1,123 @@
+from decimal import Decimal
+
+from django.db.models import BigIntegerField, DecimalField, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.http import FileResponse, StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
-from drf_spectacular.utils import extend_schema
-from rest_framework import serializers, status, viewsets
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+from rest_framework import serializers, status, views, viewsets
 from rest_framework.decorators import action
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import NotFound, PermissionDenied, UnsupportedMediaType
+from rest_framework.filters import OrderingFilter
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 
-from ..models import Barrel, Invoice, Provider
+from ..ingestion import CONTENT_TYPE_FORMATS, ON_CONFLICT_CHOICES, import_barrels
+from ..jobs import enqueue, output_dir
+from ..models import Barrel, BulkBillingError, Invoice, InvoiceLine, Job, Provider
+from ..replicas import replica_reads
+from ..reports import billing_report
+from . import caching, instrumentation
+from .caching import CachedRetrieveMixin
+from .conditional import ConditionalGetMixin, provider_change_state
+from .exports import EXPORT_FORMATS
 from .filters import InvoiceFilter
+from .idempotency import IDEMPOTENCY_HEADER, idempotent
+from .pagination import InvoiceKeysetPagination, JobKeysetPagination
+from .permissions import IsSuperuser
+from .renderers import FAST_RENDERER_CLASSES
+from .replicas import ReplicaReadMixin
+from .scoping import ProviderScopedMixin
+from .rows import BarrelRowSerializer, InvoiceRowSerializer, ProviderRowSerializer, RowListMixin
 from .serializers import (
     BarrelSerializer,
+    BillingReportQuerySerializer,
+    BillingReportRowSerializer,
+    BillingRollupRefreshSerializer,
+    InvoiceLineBulkCreateSerializer,
     InvoiceLineCreateSerializer,
     InvoiceLineNestedSerializer,
     InvoiceSerializer,
+    JobSerializer,
     ProviderSerializer,
 )
 
+TOTAL_AMOUNT_FIELD = DecimalField(max_digits=20, decimal_places=2)
+
+
+def _invoice_line_total(expression, output_field, zero):
+    # A correlated subquery rather than a JOIN + GROUP BY, so a keyset page
+    # only sums the lines of the invoices it returns.
+    lines = (
+        InvoiceLine.objects.filter(invoice=OuterRef("pk"))
+        .order_by()
+        .values("invoice")
+        .annotate(total=Sum(expression, output_field=output_field))
+        .values("total")
+    )
+    return Coalesce(Subquery(lines, output_field=output_field), zero, output_field=output_field)
+
+
+IDEMPOTENCY_KEY_PARAMETER = OpenApiParameter(
+    IDEMPOTENCY_HEADER,
+    str,
+    OpenApiParameter.HEADER,
+    description="Client-chosen key; retries with the same key replay the original response.",
+)
+
+PREFER_ASYNC_PARAMETER = OpenApiParameter(
+    "Prefer",
+    str,
+    OpenApiParameter.HEADER,
+    description="respond-async: run as a background job and answer 202 with the job to poll.",
+)
+
+
+def _prefers_async(request) -> bool:
+    return "respond-async" in request.headers.get("Prefer", "")
 
-class ProviderViewSet(viewsets.ModelViewSet):
+
+def _accepted(request, job: Job) -> Response:
+    response = Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+    response["Location"] = reverse("job-detail", args=[job.pk], request=request)
+    return response
+
+
+class ProviderViewSet(
+    ReplicaReadMixin,
+    ProviderScopedMixin,
+    ConditionalGetMixin,
+    CachedRetrieveMixin,
+    RowListMixin,
+    viewsets.ModelViewSet,
+):
     serializer_class = ProviderSerializer
-    queryset = Provider.objects.all().order_by("id")
+    row_serializer_class = ProviderRowSerializer
+    renderer_classes = FAST_RENDERER_CLASSES
+    response_cache_kind = "provider"
+    # Both liter totals are read from the ProviderLitersSummary ledger in the
+    # list query itself, so the serializer does not aggregate per provider.
+    queryset = Provider.objects.annotate(
+        billed_liters=Coalesce(
+            F("liters_summary__billed_liters"), 0, output_field=BigIntegerField()
+        ),
+        liters_to_bill=Coalesce(
+            F("liters_summary__liters_to_bill"), 0, output_field=BigIntegerField()
+        ),
+    ).order_by("id")
 
-    def get_queryset(self):
-        user = self.request.user
-        if user.is_superuser:
-            return self.queryset
-        if user.provider_id is None:
-            return Provider.objects.none()
-        return self.queryset.filter(id=user.provider_id)
+    def get_cached_owner(self, data):
+        return data["id"]
+
+    def get_change_state(self):
+        # A superuser's provider detail only depends on that one provider.
+        if self.action == "retrieve" and self.request.user.is_superuser:
+            try:
+                return provider_change_state(int(self.kwargs["pk"]))
+            except (KeyError, TypeError, ValueError):
+                return None
+        return super().get_change_state()
 
     def perform_create(self, serializer):
         if not self.request.user.is_superuser:
@@ -39,50 +130,95 @@ class ProviderViewSet(viewsets.ModelViewSet):
         super().perform_destroy(instance)
 
 
-class BarrelViewSet(viewsets.ModelViewSet):
+class BarrelViewSet(
+    ReplicaReadMixin,
+    ProviderScopedMixin,
+    ConditionalGetMixin,
+    RowListMixin,
+    viewsets.ModelViewSet,
+):
     serializer_class = BarrelSerializer
+    row_serializer_class = BarrelRowSerializer
+    renderer_classes = FAST_RENDERER_CLASSES
     queryset = Barrel.objects.select_related("provider").all().order_by("id")
     # Requirement: barrels endpoint without filters on billed/unbilled
     filter_backends = []
 
-    def get_queryset(self):
-        user = self.request.user
-        if user.is_superuser:
-            return self.queryset
-        if user.provider_id is None:
-            return Barrel.objects.none()
-        return self.queryset.filter(provider_id=user.provider_id)
-
     def perform_create(self, serializer):
         user = self.request.user
         if user.provider_id is None:
             raise PermissionDenied("User is not linked to any provider.")
         serializer.save(provider_id=user.provider_id)
 
+    @extend_schema(
+        request={content_type: OpenApiTypes.STR for content_type in CONTENT_TYPE_FORMATS},
+        parameters=[
+            OpenApiParameter("on_conflict", str, enum=list(ON_CONFLICT_CHOICES)),
+        ],
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk(self, request, *args, **kwargs):
+        user = request.user
+        if user.provider_id is None:
+            raise PermissionDenied("User is not linked to any provider.")
 
-class InvoiceViewSet(viewsets.ModelViewSet):
+        content_type = request.content_type.split(";")[0].strip()
+        fmt = CONTENT_TYPE_FORMATS.get(content_type)
+        if fmt is None:
+            raise UnsupportedMediaType(content_type)
+        on_conflict = request.query_params.get("on_conflict", "ignore")
+        if on_conflict not in ON_CONFLICT_CHOICES:
+            raise serializers.ValidationError(
+                {"on_conflict": f"Must be one of: {', '.join(ON_CONFLICT_CHOICES)}."}
+            )
+        if request.stream is None:
+            raise serializers.ValidationError({"detail": "Request body is empty."})
+
+        # Read the body line by line instead of through a parser, so the
+        # upload is never held in memory as a whole.
+        lines = (line.decode("utf-8-sig") for line in iter(request.stream.readline, b""))
+        result = import_barrels(lines, provider_id=user.provider_id, fmt=fmt, on_conflict=on_conflict)
+        return Response(result.as_dict(), status=status.HTTP_200_OK)
+
+
+class InvoiceViewSet(
+    ReplicaReadMixin,
+    ProviderScopedMixin,
+    ConditionalGetMixin,
+    CachedRetrieveMixin,
+    RowListMixin,
+    viewsets.ModelViewSet,
+):
     serializer_class = InvoiceSerializer
+    row_serializer_class = InvoiceRowSerializer
+    renderer_classes = FAST_RENDERER_CLASSES
+    response_cache_kind = "invoice"
     queryset = (
-        Invoice.objects.select_related("provider")
-        .prefetch_related("lines__barrel__provider")
-        .all()
+        Invoice.objects.prefetch_related("lines")
+        .annotate(
+            total_liters=_invoice_line_total(F("liters"), BigIntegerField(), 0),
+            total_amount=_invoice_line_total(
+                F("liters") * F("unit_price"), TOTAL_AMOUNT_FIELD, Decimal("0")
+            ),
+        )
         .order_by("-issued_on", "-id")
     )
 
-    filter_backends = [DjangoFilterBackend]
+    filter_backends = [DjangoFilterBackend, OrderingFilter]
     filterset_class = InvoiceFilter
+    ordering_fields = ["issued_on", "total_liters", "total_amount"]
+    pagination_class = InvoiceKeysetPagination
+    export_chunk_size = 2000
 
-    def get_queryset(self):
-        user = self.request.user
-        if user.is_superuser:
-            return self.queryset
-        if user.provider_id is None:
-            return Invoice.objects.none()
-        return self.queryset.filter(provider_id=user.provider_id)
+    def get_cached_owner(self, data):
+        return data["provider"]
 
     def get_serializer_class(self):
         if self.action == "add_line":
             return InvoiceLineCreateSerializer
+        if self.action == "add_lines":
+            return InvoiceLineBulkCreateSerializer
         return super().get_serializer_class()
 
     def perform_create(self, serializer):
@@ -99,8 +235,10 @@ class InvoiceViewSet(viewsets.ModelViewSet):
     @extend_schema(
         request=InvoiceLineCreateSerializer,
         responses={201: InvoiceLineNestedSerializer},
+        parameters=[IDEMPOTENCY_KEY_PARAMETER],
     )
     @action(detail=True, methods=["post"], url_path="add-line")
+    @idempotent
     def add_line(self, request, *args, **kwargs):
         invoice = self.get_object()
         serializer = InvoiceLineCreateSerializer(
@@ -115,3 +253,194 @@ class InvoiceViewSet(viewsets.ModelViewSet):
 
         output = InvoiceLineNestedSerializer(line)
         return Response(output.data, status=status.HTTP_201_CREATED)
+
+    @extend_schema(
+        request=InvoiceLineBulkCreateSerializer,
+        responses={201: InvoiceLineNestedSerializer(many=True), 202: JobSerializer},
+        parameters=[IDEMPOTENCY_KEY_PARAMETER, PREFER_ASYNC_PARAMETER],
+    )
+    @action(detail=True, methods=["post"], url_path="add-lines")
+    @idempotent
+    def add_lines(self, request, *args, **kwargs):
+        invoice = self.get_object()
+        serializer = InvoiceLineBulkCreateSerializer(
+            data=request.data,
+            context={"invoice": invoice},
+        )
+        serializer.is_valid(raise_exception=True)
+        if _prefers_async(request):
+            job = enqueue(
+                "add_lines",
+                {"invoice": invoice.pk, "lines": serializer.validated_data["lines"]},
+                user=request.user,
+            )
+            return _accepted(request, job)
+        try:
+            lines = serializer.save()
+        except BulkBillingError as exc:
+            # Same shape as serializer errors: one entry per submitted line.
+            raise serializers.ValidationError(
+                {"lines": [{"detail": error} if error else {} for error in exc.errors]}
+            )
+
+        output = InvoiceLineNestedSerializer(lines, many=True)
+        return Response(output.data, status=status.HTTP_201_CREATED)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "export_format",
+                str,
+                enum=list(EXPORT_FORMATS),
+                description="csv (one row per line, default) or ndjson (one invoice per line).",
+            ),
+            PREFER_ASYNC_PARAMETER,
+        ],
+        responses={
+            (200, "text/csv"): OpenApiTypes.STR,
+            (200, "application/x-ndjson"): OpenApiTypes.STR,
+            202: JobSerializer,
+        },
+    )
+    @action(detail=False, methods=["get"], url_path="export")
+    def export(self, request, *args, **kwargs):
+        # Not "format": DRF reserves that query parameter for renderer selection.
+        export_format = request.query_params.get("export_format", "csv")
+        if export_format not in EXPORT_FORMATS:
+            raise serializers.ValidationError(
+                {"export_format": f"Must be one of: {', '.join(EXPORT_FORMATS)}."}
+            )
+        stream, content_type, filename = EXPORT_FORMATS[export_format]
+
+        # Also validates the filters, before a background export is queued.
+        invoices = self.filter_queryset(self.get_queryset())
+        if _prefers_async(request):
+            user = request.user
+            if not user.is_superuser and user.provider_id is None:
+                raise PermissionDenied("User is not linked to any provider.")
+            filters = request.query_params.dict()
+            filters.pop("export_format", None)
+            job = enqueue(
+                "export_invoices",
+                {
+                    "export_format": export_format,
+                    "filters": filters,
+                    # Same scoping as get_queryset.
+                    "provider_id": None if user.is_superuser else user.provider_id,
+                },
+                user=user,
+            )
+            return _accepted(request, job)
+
+        response = StreamingHttpResponse(
+            stream(invoices, self.export_chunk_size),
+            content_type=content_type,
+        )
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+
+class BillingReportView(ProviderScopedMixin, views.APIView):
+    """Liters and revenue per provider, oil type and month (or week)."""
+
+    @extend_schema(
+        parameters=[BillingReportQuerySerializer],
+        responses={200: BillingReportRowSerializer(many=True)},
+    )
+    def get(self, request, *args, **kwargs):
+        query = BillingReportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        user = request.user
+        providers = Provider.objects.for_user(user)
+        if "provider" in params:
+            providers = providers.filter(id=params["provider"])
+
+        with replica_reads(user):
+            rows = billing_report(
+                providers,
+                period=params["period"],
+                start=params.get("issued_on_after"),
+                end=params.get("issued_on_before"),
+            )
+        return Response(BillingReportRowSerializer(rows, many=True).data)
+
+
+class BillingRollupRefreshView(views.APIView):
+    """Refresh the precomputed billing report in the background."""
+
+    permission_classes = [IsSuperuser]
+
+    @extend_schema(request=BillingRollupRefreshSerializer, responses={202: JobSerializer})
+    def post(self, request, *args, **kwargs):
+        serializer = BillingRollupRefreshSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        job = enqueue(
+            "refresh_rollup",
+            {
+                "provider_ids": [params["provider"]] if "provider" in params else None,
+                "full": params["full"],
+            },
+            user=request.user,
+        )
+        return _accepted(request, job)
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Background jobs and their outcome; users see the jobs they started."""
+
+    serializer_class = JobSerializer
+    queryset = Job.objects.order_by("-id")
+    pagination_class = JobKeysetPagination
+    filterset_fields = ["status", "kind"]
+
+    def get_queryset(self):
+        user = self.request.user
+        if user.is_superuser:
+            return self.queryset.all()
+        # The id: request.user may be a users.authentication.ClaimsUser.
+        return self.queryset.filter(created_by_id=user.pk)
+
+    @extend_schema(responses={(200, "application/octet-stream"): OpenApiTypes.BINARY})
+    @action(detail=True, methods=["get"])
+    def download(self, request, *args, **kwargs):
+        job = self.get_object()
+        output = job.result if job.status == Job.Status.SUCCEEDED else None
+        if not isinstance(output, dict) or "file" not in output:
+            raise NotFound("This job has no output to download.")
+        try:
+            file = open(output_dir() / output["file"], "rb")
+        except FileNotFoundError:
+            raise NotFound("The output of this job is no longer available.")
+        return FileResponse(
+            file,
+            as_attachment=True,
+            filename=output["filename"],
+            content_type=output["content_type"],
+        )
+
+
+class ResponseCacheStatsView(views.APIView):
+    permission_classes = [IsSuperuser]
+
+    @extend_schema(responses={200: OpenApiTypes.OBJECT})
+    def get(self, request, *args, **kwargs):
+        return Response(caching.stats())
+
+
+class RequestMetricsView(views.APIView):
+    permission_classes = [IsSuperuser]
+
+    @extend_schema(responses={200: OpenApiTypes.OBJECT})
+    def get(self, request, *args, **kwargs):
+        return Response(instrumentation.stats())
+
+
+class DatabaseStatsView(views.APIView):
+    permission_classes = [IsSuperuser]
+
+    @extend_schema(responses={200: OpenApiTypes.OBJECT})
+    def get(self, request, *args, **kwargs):
+        return Response(instrumentation.database_stats())
@@ -3,3 +3,9 @@ from django.apps import AppConfig
 class BillingConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "billing"
+
+    def ready(self):
+        from . import signals  # noqa: F401  (connects the model signal receivers)
+        from . import reports  # noqa: F401  (marks changed rollup months stale)
+        from .api import jobs  # noqa: F401  (registers the API job handlers)
+        from .api import instrumentation  # noqa: F401  (counts each connection's queries)
@@ -0,0 +1,368 @@
+"""In-process benchmark of the billing API.
+
+Drives the main endpoints through DRF's test client against whatever the
+database holds (see the ``seed_volume`` command), records latency
+percentiles and query counts per scenario, and compares them with a stored
+JSON baseline. Every request runs inside one transaction that is rolled
+back at the end, so write scenarios leave the data as they found it.
+
+Requests are authenticated with ``force_authenticate``: JWT decoding is not
+part of the measured time.
+
+``run_throughput`` instead measures requests per second for read scenarios
+under concurrent clients, once through the WSGI stack (DRF viewsets, one
+thread per client) and once through the ASGI stack (the async views, one
+task per client on a single event loop). Those requests carry a real JWT
+and are not wrapped in a transaction.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from time import perf_counter
+
+from asgiref.sync import ThreadSensitiveContext, async_to_sync, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import close_old_connections, connection, connections, transaction
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from users.authentication import ClaimsTokenObtainPairSerializer
+
+from .api.caching import CACHE_ALIAS
+from .models import Barrel, Invoice
+
+SCENARIOS = (
+    "invoice-list",
+    "invoice-detail",
+    "invoice-filter",
+    "invoice-add-line",
+    "provider-list",
+    "provider-detail",
+    "barrel-list",
+)
+THROUGHPUT_SCENARIOS = (
+    "invoice-list",
+    "invoice-detail",
+    "provider-list",
+    "provider-detail",
+    "barrel-list",
+)
+THROUGHPUT_MODES = ("wsgi", "asgi")
+PERCENTILES = (50, 95, 99)
+# Latency regressions smaller than this are treated as noise.
+DEFAULT_MIN_DELTA_MS = 2.0
+
+
+class BenchmarkSetupError(ValueError):
+    """The database does not hold the data a scenario needs."""
+
+
+@dataclass
+class ScenarioResult:
+    requests: int
+    latencies_ms: list[float]
+    queries: list[int]
+
+    def as_dict(self) -> dict:
+        result = {"requests": self.requests}
+        for rank in PERCENTILES:
+            result[f"p{rank}_ms"] = round(percentile(self.latencies_ms, rank), 3)
+        result["max_queries"] = max(self.queries)
+        result["avg_queries"] = round(sum(self.queries) / len(self.queries), 2)
+        return result
+
+
+def percentile(values: list[float], rank: int) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(rank / 100 * len(ordered)) - 1, 0)]
+
+
+def _host() -> str:
+    return next((host.lstrip(".") for host in settings.ALLOWED_HOSTS if host != "*"), "localhost")
+
+
+class _Fixtures:
+    """Ids the scenarios point at, all owned by the benchmarked user."""
+
+    def __init__(self, user):
+        if user.provider_id is None:
+            raise BenchmarkSetupError(f"User {user.username!r} has no provider.")
+        self.provider_id = user.provider_id
+        invoice = Invoice.objects.filter(provider_id=self.provider_id).order_by("-id").first()
+        if invoice is None:
+            raise BenchmarkSetupError(f"Provider {self.provider_id} has no invoices.")
+        self.invoice_id = invoice.id
+        self.issued_on = invoice.issued_on
+        self.invoice_no_fragment = invoice.invoice_no[-4:]
+        self._unbilled = None
+        self._add_line_invoice = None
+
+    def next_unbilled_barrel(self) -> Barrel:
+        if self._unbilled is None:
+            self._unbilled = iter(
+                Barrel.objects.filter(provider_id=self.provider_id, billed=False).order_by("id")
+            )
+        barrel = next(self._unbilled, None)
+        if barrel is None:
+            raise BenchmarkSetupError(
+                f"Provider {self.provider_id} ran out of unbilled barrels for invoice-add-line."
+            )
+        return barrel
+
+    def add_line_invoice_id(self) -> int:
+        if self._add_line_invoice is None:
+            self._add_line_invoice = Invoice.objects.create(
+                provider_id=self.provider_id,
+                invoice_no=f"BENCH-{self.provider_id}-{self.invoice_id}",
+                issued_on=self.issued_on,
+            )
+        return self._add_line_invoice.id
+
+
+def _request(client, fixtures, scenario):
+    if scenario == "invoice-list":
+        return client.get(reverse("invoice-list"))
+    if scenario == "invoice-detail":
+        return client.get(reverse("invoice-detail", args=[fixtures.invoice_id]))
+    if scenario == "invoice-filter":
+        return client.get(reverse("invoice-list"), {"invoice_no": fixtures.invoice_no_fragment})
+    if scenario == "invoice-add-line":
+        barrel = fixtures.next_unbilled_barrel()
+        return client.post(
+            reverse("invoice-add-line", args=[fixtures.add_line_invoice_id()]),
+            {
+                "barrel": barrel.id,
+                "liters": barrel.liters,
+                "unit_price": "1.00",
+                "description": f"Benchmark line for {barrel.number}",
+            },
+            format="json",
+        )
+    if scenario == "provider-list":
+        return client.get(reverse("provider-list"))
+    if scenario == "provider-detail":
+        return client.get(reverse("provider-detail", args=[fixtures.provider_id]))
+    if scenario == "barrel-list":
+        return client.get(reverse("barrel-list"))
+    raise ValueError(f"scenario must be one of: {', '.join(SCENARIOS)}")
+
+
+def run_benchmark(
+    user,
+    *,
+    scenarios=SCENARIOS,
+    requests: int = 50,
+    warmup: int = 5,
+    warm_cache: bool = False,
+) -> dict[str, ScenarioResult]:
+    """Time ``requests`` calls per scenario after ``warmup`` untimed ones.
+
+    Unless ``warm_cache`` is set the response cache is cleared before every
+    call, so reads measure the queryset and serializer path rather than
+    cache lookups.
+    """
+    client = APIClient(SERVER_NAME=_host())
+    client.force_authenticate(user=user)
+    results = {}
+    with transaction.atomic():
+        fixtures = _Fixtures(user)
+        for scenario in scenarios:
+            latencies, queries = [], []
+            for index in range(warmup + requests):
+                if not warm_cache:
+                    caches[CACHE_ALIAS].clear()
+                with CaptureQueriesContext(connection) as captured:
+                    start = perf_counter()
+                    response = _request(client, fixtures, scenario)
+                    elapsed = perf_counter() - start
+                if response.status_code >= 400:
+                    raise BenchmarkSetupError(
+                        f"{scenario} returned {response.status_code}: {response.content[:200]!r}"
+                    )
+                if index >= warmup:
+                    latencies.append(elapsed * 1000)
+                    queries.append(len(captured))
+            results[scenario] = ScenarioResult(requests, latencies, queries)
+        transaction.set_rollback(True)
+    caches[CACHE_ALIAS].clear()
+    return results
+
+
+@dataclass
+class ThroughputResult:
+    requests: int
+    clients: int
+    elapsed_s: float
+    latencies_ms: list[float]
+
+    def as_dict(self) -> dict:
+        result = {
+            "requests": self.requests,
+            "clients": self.clients,
+            "requests_per_s": round(self.requests / self.elapsed_s, 1),
+        }
+        for rank in PERCENTILES:
+            result[f"p{rank}_ms"] = round(percentile(self.latencies_ms, rank), 3)
+        return result
+
+
+def _read_url(scenario, fixtures, mode) -> str:
+    # The async views mirror the list/detail routes under "async-<name>".
+    prefix = "async-" if mode == "asgi" else ""
+    if scenario == "invoice-list":
+        return reverse(f"{prefix}invoice-list")
+    if scenario == "invoice-detail":
+        return reverse(f"{prefix}invoice-detail", args=[fixtures.invoice_id])
+    if scenario == "provider-list":
+        return reverse(f"{prefix}provider-list")
+    if scenario == "provider-detail":
+        return reverse(f"{prefix}provider-detail", args=[fixtures.provider_id])
+    if scenario == "barrel-list":
+        return reverse(f"{prefix}barrel-list")
+    raise ValueError(f"scenario must be one of: {', '.join(THROUGHPUT_SCENARIOS)}")
+
+
+def _check(scenario, response) -> None:
+    if response.status_code >= 400:
+        raise BenchmarkSetupError(
+            f"{scenario} returned {response.status_code}: {response.content[:200]!r}"
+        )
+
+
+def _wsgi_client_run(url, headers, scenario, count) -> list[float]:
+    client = Client(SERVER_NAME=_host(), headers=headers)
+    latencies = []
+    try:
+        for _ in range(count):
+            start = perf_counter()
+            response = client.get(url)
+            latencies.append((perf_counter() - start) * 1000)
+            _check(scenario, response)
+            # What the request_finished handler does after a real request.
+            close_old_connections()
+    finally:
+        connections.close_all()
+    return latencies
+
+
+def _run_wsgi(url, headers, scenario, counts) -> list[float]:
+    with ThreadPoolExecutor(max_workers=len(counts)) as pool:
+        runs = [
+            pool.submit(_wsgi_client_run, url, headers, scenario, count) for count in counts
+        ]
+        return [latency for run in runs for latency in run.result()]
+
+
+async def _asgi_client_run(url, headers, scenario, count) -> list[float]:
+    client = AsyncClient(SERVER_NAME=_host())
+    latencies = []
+    for _ in range(count):
+        # Like ASGIHandler: each request gets its own thread for sync code,
+        # and that thread's connection is closed when the request ends.
+        async with ThreadSensitiveContext():
+            start = perf_counter()
+            response = await client.get(url, headers=headers)
+            latencies.append((perf_counter() - start) * 1000)
+            await sync_to_async(connections.close_all)()
+        _check(scenario, response)
+    return latencies
+
+
+async def _run_asgi(url, headers, scenario, counts) -> list[float]:
+    runs = await asyncio.gather(
+        *(_asgi_client_run(url, headers, scenario, count) for count in counts)
+    )
+    return [latency for run in runs for latency in run]
+
+
+def run_throughput(
+    user,
+    *,
+    scenarios=THROUGHPUT_SCENARIOS,
+    modes=THROUGHPUT_MODES,
+    clients: int = 8,
+    requests: int = 200,
+) -> dict[str, dict[str, ThroughputResult]]:
+    """Spread ``requests`` GETs per scenario over ``clients`` concurrent clients.
+
+    Returns ``{scenario: {mode: result}}``. As in production, the DRF
+    detail actions answer repeats from the response cache while the async
+    views always query; no request sends conditional headers.
+    """
+    fixtures = _Fixtures(user)
+    # Issued like /api/token/ does, so requests take the claims fast path.
+    access = ClaimsTokenObtainPairSerializer.get_token(user).access_token
+    headers = {"Authorization": f"Bearer {access}"}
+    counts = [requests // clients + (index < requests % clients) for index in range(clients)]
+    counts = [count for count in counts if count]
+    results = {}
+    for scenario in scenarios:
+        results[scenario] = {}
+        for mode in modes:
+            url = _read_url(scenario, fixtures, mode)
+            caches[CACHE_ALIAS].clear()
+            start = perf_counter()
+            if mode == "wsgi":
+                latencies = _run_wsgi(url, headers, scenario, counts)
+            else:
+                latencies = async_to_sync(_run_asgi)(url, headers, scenario, counts)
+            results[scenario][mode] = ThroughputResult(
+                requests, len(counts), perf_counter() - start, latencies
+            )
+    caches[CACHE_ALIAS].clear()
+    return results
+
+
+def results_as_dict(results: dict[str, ScenarioResult]) -> dict:
+    return {"scenarios": {name: result.as_dict() for name, result in results.items()}}
+
+
+def load_baseline(path) -> dict:
+    with open(path, encoding="utf-8") as baseline:
+        return json.load(baseline)
+
+
+def write_baseline(path, data: dict) -> None:
+    with open(path, "w", encoding="utf-8") as baseline:
+        json.dump(data, baseline, indent=2, sort_keys=True)
+        baseline.write("\n")
+
+
+def find_regressions(
+    current: dict,
+    baseline: dict,
+    *,
+    threshold: float = 0.25,
+    min_delta_ms: float = DEFAULT_MIN_DELTA_MS,
+) -> list[str]:
+    """Compare two ``results_as_dict`` outputs; returns one message per regression.
+
+    A scenario regresses when its p95 grows by more than ``threshold``
+    (a fraction) and ``min_delta_ms``, or when it runs more queries.
+    Scenarios missing on either side are ignored.
+    """
+    regressions = []
+    for name, before in sorted(baseline.get("scenarios", {}).items()):
+        after = current["scenarios"].get(name)
+        if after is None:
+            continue
+        if after["max_queries"] > before["max_queries"]:
+            regressions.append(
+                f"{name}: max queries {before['max_queries']} -> {after['max_queries']}"
+            )
+        limit = max(before["p95_ms"] * (1 + threshold), before["p95_ms"] + min_delta_ms)
+        if after["p95_ms"] > limit:
+            regressions.append(
+                f"{name}: p95 {before['p95_ms']:.1f} ms -> {after['p95_ms']:.1f} ms "
+                f"(limit {limit:.1f} ms)"
+            )
+    return regressions
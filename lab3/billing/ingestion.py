@@ -0,0 +1,238 @@
+"""Streaming bulk import of barrels from CSV or NDJSON.
+
+Used by ``POST /api/barrels/bulk/`` and the ``load_barrels`` command. Rows are
+parsed lazily, validated and written in chunks, so a load of any size holds
+one chunk in memory. Invalid rows are reported and skipped; they never abort
+the rest of the load.
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.db import IntegrityError, transaction
+
+from .models import Barrel, ProviderLitersSummary
+from .signals import notify_billing_changed
+
+FORMATS = ("csv", "ndjson")
+CONTENT_TYPE_FORMATS = {"text/csv": "csv", "application/x-ndjson": "ndjson"}
+ON_CONFLICT_CHOICES = ("ignore", "update")
+MAX_REPORTED_REJECTIONS = 1000
+
+_TRUE_VALUES = {"1", "true", "t", "yes", "y"}
+_FALSE_VALUES = {"", "0", "false", "f", "no", "n"}
+
+
+@dataclass
+class BarrelImportResult:
+    created: int = 0
+    updated: int = 0
+    skipped: int = 0
+    rejected_count: int = 0
+    rejected: list[dict] = field(default_factory=list)
+
+    def reject(self, row: int, errors: dict) -> None:
+        self.rejected_count += 1
+        if len(self.rejected) < MAX_REPORTED_REJECTIONS:
+            self.rejected.append({"row": row, "errors": errors})
+
+    def as_dict(self) -> dict:
+        return {
+            "created": self.created,
+            "updated": self.updated,
+            "skipped": self.skipped,
+            "rejected_count": self.rejected_count,
+            "rejected": self.rejected,
+        }
+
+
+def iter_records(lines, fmt: str):
+    """Yield ``(row_number, record_or_None, error_or_None)`` from text lines.
+
+    Row numbers are 1-based data rows (the CSV header is not counted).
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        for row_number, record in enumerate(reader, start=1):
+            if None in record:
+                yield row_number, None, "too many columns"
+            else:
+                yield row_number, record, None
+    elif fmt == "ndjson":
+        row_number = 0
+        for line in lines:
+            if not line.strip():
+                continue
+            row_number += 1
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield row_number, None, "invalid JSON"
+                continue
+            if not isinstance(record, dict):
+                yield row_number, None, "expected a JSON object"
+            else:
+                yield row_number, record, None
+    else:
+        raise ValueError(f"format must be one of: {', '.join(FORMATS)}")
+
+
+def clean_record(record: dict) -> tuple[dict, dict]:
+    """Validate one raw record. Returns ``(values, errors)``."""
+    values: dict = {}
+    errors: dict = {}
+
+    for name in ("number", "oil_type"):
+        value = str(record.get(name) or "").strip()
+        max_length = Barrel._meta.get_field(name).max_length
+        if not value:
+            errors[name] = "This field is required."
+        elif len(value) > max_length:
+            errors[name] = f"Ensure this field has no more than {max_length} characters."
+        values[name] = value
+
+    try:
+        liters = int(record.get("liters"))
+        if liters < 1:
+            raise ValueError
+        values["liters"] = liters
+    except (TypeError, ValueError):
+        errors["liters"] = "A positive integer is required."
+
+    billed = record.get("billed", False)
+    if isinstance(billed, bool):
+        values["billed"] = billed
+    elif str(billed).strip().lower() in _TRUE_VALUES:
+        values["billed"] = True
+    elif str(billed).strip().lower() in _FALSE_VALUES:
+        values["billed"] = False
+    else:
+        errors["billed"] = "Must be a valid boolean."
+
+    return values, errors
+
+
+def import_barrels(
+    lines,
+    *,
+    provider_id: int,
+    fmt: str,
+    on_conflict: str = "ignore",
+    chunk_size: int = 1000,
+) -> BarrelImportResult:
+    """Load barrels for one provider from an iterable of text lines.
+
+    ``on_conflict`` decides what happens when ``(provider, number)`` already
+    exists: ``ignore`` keeps the stored barrel, ``update`` overwrites its
+    ``oil_type`` and ``liters`` unless it is already billed.
+    """
+    if on_conflict not in ON_CONFLICT_CHOICES:
+        raise ValueError(f"on_conflict must be one of: {', '.join(ON_CONFLICT_CHOICES)}")
+
+    result = BarrelImportResult()
+    records = iter_records(lines, fmt)
+    while chunk := list(islice(records, chunk_size)):
+        _import_chunk(chunk, provider_id, on_conflict, result)
+    return result
+
+
+def _lock_existing(provider_id, numbers) -> dict[str, dict]:
+    if not numbers:
+        return {}
+    return {
+        barrel["number"]: barrel
+        for barrel in Barrel.objects.select_for_update()
+        .filter(provider_id=provider_id, number__in=numbers)
+        .values("number", "liters", "billed")
+    }
+
+
+def _plan_writes(valid, existing, on_conflict):
+    to_create = []
+    to_update = []
+    skipped = 0
+    rejections = []
+    for number, (row_number, values) in valid.items():
+        current = existing.get(number)
+        if current is None:
+            to_create.append(values)
+        elif on_conflict == "ignore":
+            skipped += 1
+        elif current["billed"]:
+            rejections.append(
+                (row_number, {"number": "Barrel is already billed and cannot be updated."})
+            )
+        else:
+            to_update.append((current, values))
+    return to_create, to_update, skipped, rejections
+
+
+@transaction.atomic
+def _import_chunk(chunk, provider_id, on_conflict, result) -> None:
+    rejections: list[tuple[int, dict]] = []
+    valid: dict[str, tuple[int, dict]] = {}
+    for row_number, record, error in chunk:
+        if error is not None:
+            rejections.append((row_number, {"non_field_errors": error}))
+            continue
+        values, errors = clean_record(record)
+        if not errors and values["number"] in valid:
+            errors = {"number": "Duplicate barrel number earlier in the same chunk."}
+        if errors:
+            rejections.append((row_number, errors))
+            continue
+        valid[values["number"]] = (row_number, values)
+
+    while True:
+        existing = _lock_existing(provider_id, list(valid))
+        to_create, to_update, skipped, conflicts = _plan_writes(valid, existing, on_conflict)
+        if not to_create:
+            break
+        # Not ignore_conflicts: the rows it skips would still be counted and
+        # booked below. A barrel inserted concurrently after the SELECT makes
+        # this insert wait for that commit and fail; the next SELECT sees it.
+        try:
+            with transaction.atomic():
+                Barrel.objects.bulk_create(
+                    [Barrel(provider_id=provider_id, **values) for values in to_create]
+                )
+            break
+        except IntegrityError:
+            numbers = [values["number"] for values in to_create]
+            if not Barrel.objects.filter(provider_id=provider_id, number__in=numbers).exists():
+                raise
+
+    result.skipped += skipped
+    rejections.extend(conflicts)
+    for row_number, errors in sorted(rejections, key=lambda rejection: rejection[0]):
+        result.reject(row_number, errors)
+
+    if to_update:
+        Barrel.objects.bulk_create(
+            [Barrel(provider_id=provider_id, **values) for _, values in to_update],
+            update_conflicts=True,
+            unique_fields=["provider", "number"],
+            update_fields=["oil_type", "liters"],
+        )
+    result.created += len(to_create)
+    result.updated += len(to_update)
+
+    # bulk_create bypasses Barrel.save, so move the liters ledger here.
+    deltas = {"billed_liters": 0, "liters_to_bill": 0, "billed_barrels": 0, "barrels_to_bill": 0}
+    for values in to_create:
+        if values["billed"]:
+            deltas["billed_liters"] += values["liters"]
+            deltas["billed_barrels"] += 1
+        else:
+            deltas["liters_to_bill"] += values["liters"]
+            deltas["barrels_to_bill"] += 1
+    for current, values in to_update:
+        deltas["liters_to_bill"] += values["liters"] - current["liters"]
+    # Provider row before the ledger row, as on every write path.
+    if to_create or to_update:
+        notify_billing_changed(provider_ids=[provider_id])
+    ProviderLitersSummary.apply_delta(provider_id, **deltas)
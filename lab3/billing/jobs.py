@@ -0,0 +1,224 @@
+"""Database-backed background jobs.
+
+Work too slow for a web request is stored as a ``Job`` row by ``enqueue``
+and run by ``manage.py run_jobs`` workers. That covers bulk billing, invoice
+exports and rollup refreshes. No broker is needed, only the database.
+
+Several workers can share the queue. ``claim`` locks the oldest due job with
+``SELECT ... FOR UPDATE SKIP LOCKED`` where the database supports it. It then
+moves the job to ``running`` with a conditional UPDATE, so two workers never
+run the same job, on SQLite either.
+
+Handlers are registered per ``kind`` with ``@handler`` and receive the job.
+What they return becomes ``Job.result``. If a handler raises ``JobError``,
+the job fails at once with that error. Any other exception is retried until
+``max_attempts`` is reached. The first retry waits ``JOB_RETRY_DELAY``
+seconds, and the wait doubles with each attempt.
+
+While a job runs, its worker's ``run_jobs`` loop bumps ``heartbeat_at``. A
+job whose heartbeat is older than ``JOB_TIMEOUT`` had its worker die, and
+``requeue_stale`` puts it back in the queue. A run only records its outcome
+if the job is still its claim, so a worker that comes back after that never
+overwrites the newer attempt.
+
+Export files older than ``JOB_OUTPUT_TTL`` are deleted by ``purge_output``.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+from .reports import refresh_rollup
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+
+class JobError(Exception):
+    """Raised by a handler for a failure that retrying would not fix."""
+
+    def __init__(self, detail):
+        super().__init__(detail)
+        self.detail = detail
+
+
+def handler(kind: str):
+    """Register the decorated function as the handler of ``kind`` jobs."""
+
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+
+    return register
+
+
+def enqueue(kind: str, payload: dict | None = None, *, user=None, max_attempts=None) -> Job:
+    """Queue a job; it is picked up once the surrounding transaction commits."""
+    if kind not in HANDLERS:
+        raise ValueError(f"unknown job kind: {kind}")
+    return Job.objects.create(
+        kind=kind,
+        payload=payload or {},
+        # The id: request.user may be a users.authentication.ClaimsUser.
+        created_by_id=user.pk if user is not None and user.is_authenticated else None,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+def worker_id() -> str:
+    """A name for this ``run_jobs`` process, never reused by a restarted one.
+
+    Host and PID alone repeat when a container restarts its command as PID 1,
+    and the new process would keep a dead one's jobs alive with heartbeats.
+    """
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+
+
+def claim(worker: str) -> Job | None:
+    """Mark the oldest due job as running for ``worker`` and return it."""
+    while True:
+        now = timezone.now()
+        with transaction.atomic():
+            job = (
+                Job.objects.select_for_update(skip_locked=True)
+                .filter(status=Job.Status.QUEUED, run_after__lte=now)
+                .order_by("run_after", "id")
+                .first()
+            )
+            if job is None:
+                return None
+            claimed = Job.objects.filter(pk=job.pk, status=Job.Status.QUEUED).update(
+                status=Job.Status.RUNNING,
+                attempts=F("attempts") + 1,
+                started_at=now,
+                heartbeat_at=now,
+                worker=worker,
+            )
+        if claimed:
+            job.refresh_from_db()
+            return job
+        # Another worker took it between the SELECT and the UPDATE.
+
+
+def run(job: Job) -> Job:
+    """Run a claimed job and record how it ended."""
+    func = HANDLERS.get(job.kind)
+    try:
+        if func is None:
+            raise JobError(f"unknown job kind: {job.kind}")
+        result = func(job)
+    except JobError as exc:
+        _finish(job, Job.Status.FAILED, error=exc.detail)
+    except Exception as exc:
+        logger.exception("Job %s (%s) failed on attempt %s", job.pk, job.kind, job.attempts)
+        if job.attempts < job.max_attempts:
+            delay = settings.JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+            _record(
+                job,
+                status=Job.Status.QUEUED,
+                run_after=timezone.now() + timedelta(seconds=delay),
+                error=repr(exc),
+            )
+        else:
+            _finish(job, Job.Status.FAILED, error=repr(exc))
+    else:
+        _finish(job, Job.Status.SUCCEEDED, result=result)
+    return job
+
+
+def execute(job_id: int) -> tuple[int, str, str]:
+    """Run one claimed job on a ``run_jobs`` pool thread or process."""
+    close_old_connections()
+    try:
+        job = run(Job.objects.get(pk=job_id))
+        return job.pk, job.kind, job.status
+    finally:
+        close_old_connections()
+
+
+def _finish(job: Job, status: str, *, result=None, error=None) -> None:
+    _record(job, status=status, result=result, error=error, finished_at=timezone.now())
+
+
+def _record(job: Job, **fields) -> None:
+    """Save how this run of ``job`` ended, unless the job was taken from it."""
+    recorded = Job.objects.filter(
+        pk=job.pk, status=Job.Status.RUNNING, worker=job.worker, attempts=job.attempts
+    ).update(**fields)
+    if recorded:
+        for name, value in fields.items():
+            setattr(job, name, value)
+    else:
+        logger.warning(
+            "Job %s (%s) was requeued during attempt %s; its outcome is dropped",
+            job.pk,
+            job.kind,
+            job.attempts,
+        )
+        job.refresh_from_db()
+
+
+def heartbeat(worker: str) -> int:
+    """Mark the jobs ``worker`` is running as alive."""
+    return Job.objects.filter(status=Job.Status.RUNNING, worker=worker).update(
+        heartbeat_at=timezone.now()
+    )
+
+
+def requeue_stale() -> int:
+    """Requeue (or fail, when out of attempts) jobs whose worker went away."""
+    now = timezone.now()
+    stale = Job.objects.filter(
+        status=Job.Status.RUNNING,
+        heartbeat_at__lt=now - timedelta(seconds=settings.JOB_TIMEOUT),
+    )
+    requeued = stale.filter(attempts__lt=F("max_attempts")).update(
+        status=Job.Status.QUEUED, run_after=now, error="worker timed out"
+    )
+    failed = stale.update(status=Job.Status.FAILED, finished_at=now, error="worker timed out")
+    return requeued + failed
+
+
+def output_dir() -> Path:
+    return Path(settings.JOB_OUTPUT_DIR)
+
+
+def purge_output() -> int:
+    """Delete job output files, finished or partial, older than ``JOB_OUTPUT_TTL``."""
+    cutoff = time.time() - settings.JOB_OUTPUT_TTL
+    deleted = 0
+    for path in output_dir().glob("job-*"):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                deleted += 1
+        except FileNotFoundError:
+            # Renamed or deleted by someone else meanwhile.
+            pass
+    return deleted
+
+
+def output_path(job: Job, suffix: str) -> Path:
+    """Where ``job`` writes its output file."""
+    directory = output_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory / f"job-{job.pk}{suffix}"
+
+
+@handler("refresh_rollup")
+def refresh_rollup_job(job: Job) -> dict:
+    written = refresh_rollup(job.payload.get("provider_ids"), full=job.payload.get("full", False))
+    return {"refreshed": written}
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+
+from billing.models import InvoiceLine
+
+
+class Command(BaseCommand):
+    help = "Report invoice lines whose barrel belongs to a different provider than the invoice"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=100,
+            help="Maximum number of violations to print (default: 100).",
+        )
+
+    def handle(self, *args, **options):
+        violations = (
+            InvoiceLine.objects.exclude(barrel__provider_id=F("invoice__provider_id"))
+            .values(
+                "id",
+                "invoice_id",
+                "invoice__provider_id",
+                "barrel_id",
+                "barrel__provider_id",
+            )
+            .order_by("id")
+        )
+
+        count = 0
+        for row in violations.iterator(chunk_size=2000):
+            count += 1
+            if count <= options["limit"]:
+                self.stdout.write(
+                    f"Line {row['id']}: invoice {row['invoice_id']} "
+                    f"(provider {row['invoice__provider_id']}) bills barrel "
+                    f"{row['barrel_id']} (provider {row['barrel__provider_id']})"
+                )
+
+        if count:
+            raise CommandError(f"{count} invoice line(s) bill another provider's barrel.")
+        self.stdout.write(self.style.SUCCESS("All invoice lines match their invoice provider."))
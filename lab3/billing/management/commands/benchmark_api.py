@@ -0,0 +1,115 @@
+import json
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from billing.benchmark import (
+    DEFAULT_MIN_DELTA_MS,
+    SCENARIOS,
+    BenchmarkSetupError,
+    find_regressions,
+    load_baseline,
+    results_as_dict,
+    run_benchmark,
+    write_baseline,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the billing API in-process (p50/p95/p99 latency and query counts) "
+        "and compare against a JSON baseline"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            required=True,
+            help="Username to send requests as; must belong to a provider with invoices.",
+        )
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            dest="scenarios",
+            choices=SCENARIOS,
+            help="Only run this scenario (can be repeated). Default: all.",
+        )
+        parser.add_argument("--requests", type=int, default=50, help="Timed requests per scenario.")
+        parser.add_argument("--warmup", type=int, default=5, help="Untimed requests per scenario.")
+        parser.add_argument(
+            "--warm-cache",
+            action="store_true",
+            help="Keep the response cache between requests instead of clearing it.",
+        )
+        parser.add_argument("--baseline", help="Baseline JSON file to compare against.")
+        parser.add_argument(
+            "--write-baseline",
+            action="store_true",
+            help="Store this run as the --baseline file instead of comparing.",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.25,
+            help="Allowed p95 growth as a fraction of the baseline (default 0.25).",
+        )
+        parser.add_argument(
+            "--min-delta-ms",
+            type=float,
+            default=DEFAULT_MIN_DELTA_MS,
+            help="p95 growth below this many ms is never reported.",
+        )
+
+    def handle(self, *args, **options):
+        if options["requests"] < 1 or options["warmup"] < 0:
+            raise CommandError("--requests must be at least 1 and --warmup not negative.")
+        if options["write_baseline"] and not options["baseline"]:
+            raise CommandError("--write-baseline needs --baseline.")
+        try:
+            user = get_user_model().objects.get(username=options["user"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"User {options['user']!r} does not exist.")
+
+        try:
+            results = run_benchmark(
+                user,
+                scenarios=options["scenarios"] or SCENARIOS,
+                requests=options["requests"],
+                warmup=options["warmup"],
+                warm_cache=options["warm_cache"],
+            )
+        except BenchmarkSetupError as exc:
+            raise CommandError(str(exc))
+        current = results_as_dict(results)
+        for name, row in current["scenarios"].items():
+            self.stdout.write(
+                f"{name:<18} p50={row['p50_ms']:8.2f} ms  p95={row['p95_ms']:8.2f} ms  "
+                f"p99={row['p99_ms']:8.2f} ms  queries={row['max_queries']}"
+            )
+
+        baseline_path = options["baseline"]
+        if not baseline_path:
+            return
+        if options["write_baseline"]:
+            write_baseline(baseline_path, current)
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {baseline_path}."))
+            return
+        if not Path(baseline_path).exists():
+            raise CommandError(f"Baseline {baseline_path} does not exist; run with --write-baseline.")
+        try:
+            baseline = load_baseline(baseline_path)
+        except (OSError, json.JSONDecodeError) as exc:
+            raise CommandError(f"Cannot read baseline {baseline_path}: {exc}")
+
+        regressions = find_regressions(
+            current,
+            baseline,
+            threshold=options["threshold"],
+            min_delta_ms=options["min_delta_ms"],
+        )
+        for regression in regressions:
+            self.stdout.write(self.style.ERROR(regression))
+        if regressions:
+            raise CommandError(f"{len(regressions)} regression(s) against {baseline_path}.")
+        self.stdout.write(self.style.SUCCESS(f"No regressions against {baseline_path}."))
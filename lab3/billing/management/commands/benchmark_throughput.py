@@ -0,0 +1,68 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from billing.benchmark import (
+    THROUGHPUT_MODES,
+    THROUGHPUT_SCENARIOS,
+    BenchmarkSetupError,
+    run_throughput,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare requests per second of the WSGI (DRF) and ASGI (async views) read paths "
+        "under concurrent clients"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            required=True,
+            help="Username to send requests as; must belong to a provider with invoices.",
+        )
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            dest="scenarios",
+            choices=THROUGHPUT_SCENARIOS,
+            help="Only run this scenario (can be repeated). Default: all.",
+        )
+        parser.add_argument(
+            "--mode",
+            action="append",
+            dest="modes",
+            choices=THROUGHPUT_MODES,
+            help="Only run this stack (can be repeated). Default: both.",
+        )
+        parser.add_argument("--clients", type=int, default=8, help="Concurrent clients.")
+        parser.add_argument(
+            "--requests", type=int, default=200, help="Requests per scenario and mode."
+        )
+
+    def handle(self, *args, **options):
+        if options["clients"] < 1 or options["requests"] < 1:
+            raise CommandError("--clients and --requests must be at least 1.")
+        try:
+            user = get_user_model().objects.get(username=options["user"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"User {options['user']!r} does not exist.")
+
+        try:
+            results = run_throughput(
+                user,
+                scenarios=options["scenarios"] or THROUGHPUT_SCENARIOS,
+                modes=options["modes"] or THROUGHPUT_MODES,
+                clients=options["clients"],
+                requests=options["requests"],
+            )
+        except BenchmarkSetupError as exc:
+            raise CommandError(str(exc))
+        for name, by_mode in results.items():
+            for mode, result in by_mode.items():
+                row = result.as_dict()
+                self.stdout.write(
+                    f"{name:<16} {mode:<4} {row['requests_per_s']:8.1f} req/s  "
+                    f"p50={row['p50_ms']:8.2f} ms  p95={row['p95_ms']:8.2f} ms  "
+                    f"clients={row['clients']}"
+                )
@@ -0,0 +1,59 @@
+import json
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from billing.ingestion import FORMATS, ON_CONFLICT_CHOICES, import_barrels
+from billing.models import Provider
+
+
+class Command(BaseCommand):
+    help = "Bulk load barrels for one provider from a CSV or NDJSON file ('-' for stdin)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV/NDJSON file, or '-' to read stdin.")
+        parser.add_argument("--provider", type=int, required=True, help="Provider id.")
+        parser.add_argument(
+            "--format",
+            choices=FORMATS,
+            help="Input format (default: from the file extension, csv for stdin).",
+        )
+        parser.add_argument("--on-conflict", choices=ON_CONFLICT_CHOICES, default="ignore")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not Provider.objects.filter(id=options["provider"]).exists():
+            raise CommandError(f"Provider {options['provider']} does not exist.")
+
+        path = options["path"]
+        fmt = options["format"]
+        if fmt is None:
+            fmt = "ndjson" if Path(path).suffix.lower() in (".ndjson", ".jsonl") else "csv"
+
+        if path == "-":
+            result = self._load(sys.stdin, fmt, options)
+        else:
+            try:
+                with open(path, encoding="utf-8-sig", newline="") as lines:
+                    result = self._load(lines, fmt, options)
+            except OSError as exc:
+                raise CommandError(str(exc))
+
+        for rejection in result.rejected:
+            self.stdout.write(f"Row {rejection['row']} rejected: {json.dumps(rejection['errors'])}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {result.created}, updated {result.updated}, "
+                f"skipped {result.skipped}, rejected {result.rejected_count}."
+            )
+        )
+
+    def _load(self, lines, fmt, options):
+        return import_barrels(
+            lines,
+            provider_id=options["provider"],
+            fmt=fmt,
+            on_conflict=options["on_conflict"],
+            chunk_size=options["chunk_size"],
+        )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from billing.api.idempotency import purge_expired
+
+
+class Command(BaseCommand):
+    help = "Delete stored Idempotency-Key responses that are no longer replayed"
+
+    def handle(self, *args, **options):
+        deleted = purge_expired()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} idempotency keys."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from billing.jobs import purge_output
+
+
+class Command(BaseCommand):
+    help = "Delete job output files (invoice exports) older than JOB_OUTPUT_TTL"
+
+    def handle(self, *args, **options):
+        deleted = purge_output()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} job output files."))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from billing.models import ProviderLitersSummary
+
+
+class Command(BaseCommand):
+    help = "Rebuild (or check) the per-provider liters ledger from barrel rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--provider",
+            type=int,
+            action="append",
+            dest="provider_ids",
+            help="Only process this provider id (can be repeated).",
+        )
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only compare the ledger with a live aggregate; exit non-zero on mismatch.",
+        )
+
+    def handle(self, *args, **options):
+        provider_ids = options["provider_ids"]
+
+        mismatches = ProviderLitersSummary.find_inconsistencies(provider_ids)
+        for mismatch in mismatches:
+            self.stdout.write(
+                f"Provider {mismatch['provider_id']}: "
+                f"stored={mismatch['stored']} expected={mismatch['expected']}"
+            )
+
+        if options["check"]:
+            if mismatches:
+                raise CommandError(f"{len(mismatches)} provider ledger(s) out of sync.")
+            self.stdout.write(self.style.SUCCESS("Liters ledger is consistent."))
+            return
+
+        written = ProviderLitersSummary.rebuild(provider_ids)
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt liters ledger for {written} provider(s).")
+        )
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from billing.reports import refresh_rollup
+
+
+class Command(BaseCommand):
+    help = "Precompute the monthly billing report for completed months"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--provider",
+            type=int,
+            action="append",
+            dest="provider_ids",
+            help="Only process this provider id (can be repeated).",
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Recompute every completed month, not only missing or stale ones.",
+        )
+
+    def handle(self, *args, **options):
+        written = refresh_rollup(options["provider_ids"], full=options["full"])
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {written} provider month(s)."))
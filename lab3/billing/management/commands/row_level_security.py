@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from billing.scoping import ROW_LEVEL_SECURITY_TABLES
+
+
+class Command(BaseCommand):
+    help = (
+        "Turn PostgreSQL row-level security on or off for the provider-scoped tables, "
+        "or show whether it is on"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=["enable", "disable", "status"])
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        if connection.vendor != "postgresql":
+            raise CommandError("Row-level security needs PostgreSQL.")
+
+        with connection.cursor() as cursor:
+            if options["action"] != "status":
+                # FORCE: the application's role usually owns these tables,
+                # and owners bypass row-level security otherwise.
+                clause = (
+                    "ENABLE ROW LEVEL SECURITY, FORCE ROW LEVEL SECURITY"
+                    if options["action"] == "enable"
+                    else "NO FORCE ROW LEVEL SECURITY, DISABLE ROW LEVEL SECURITY"
+                )
+                for table in ROW_LEVEL_SECURITY_TABLES:
+                    cursor.execute(f"ALTER TABLE {connection.ops.quote_name(table)} {clause}")
+            cursor.execute(
+                "SELECT relname, relrowsecurity AND relforcerowsecurity FROM pg_class "
+                "WHERE relname = ANY(%s) AND relkind = 'r' ORDER BY relname",
+                [list(ROW_LEVEL_SECURITY_TABLES)],
+            )
+            for table, enabled in cursor.fetchall():
+                self.stdout.write(f"{table:<22} {'on' if enabled else 'off'}")
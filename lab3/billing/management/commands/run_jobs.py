@@ -0,0 +1,98 @@
+import multiprocessing
+import signal
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connections
+
+from billing.jobs import claim, execute, heartbeat, requeue_stale, worker_id
+
+POOLS = ("thread", "process")
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (bulk billing, exports, rollup refreshes)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4, help="Jobs run at the same time.")
+        parser.add_argument(
+            "--pool",
+            choices=POOLS,
+            default="thread",
+            help="Run jobs on threads (default) or on separate processes.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait before looking for new jobs when the queue is empty.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once no job is due instead of waiting for more.",
+        )
+
+    def handle(self, *args, **options):
+        workers = options["workers"]
+        if workers < 1:
+            raise CommandError("--workers must be at least 1.")
+        poll_interval = options["poll_interval"]
+        worker = worker_id()
+
+        stop = threading.Event()
+        previous_handlers = {}
+        if threading.current_thread() is threading.main_thread():
+            # Finish the running jobs on SIGTERM/Ctrl-C, claim no new ones.
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                previous_handlers[signum] = signal.signal(signum, lambda *args: stop.set())
+
+        if options["pool"] == "process":
+            # Fresh interpreters: forked children would share this process's
+            # database connection.
+            connections.close_all()
+            executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=django.setup,
+            )
+        else:
+            executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+
+        counts = {}
+        running = set()
+        try:
+            while not stop.is_set():
+                close_old_connections()
+                heartbeat(worker)
+                requeue_stale()
+                while len(running) < workers:
+                    job = claim(worker)
+                    if job is None:
+                        break
+                    running.add(executor.submit(execute, job.pk))
+
+                if not running:
+                    if options["once"]:
+                        break
+                    stop.wait(poll_interval)
+                    continue
+                done, running = wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self._report(future.result(), counts)
+            for future in wait(running).done:
+                self._report(future.result(), counts)
+        finally:
+            executor.shutdown(wait=True)
+            for signum, previous in previous_handlers.items():
+                signal.signal(signum, previous)
+
+        summary = ", ".join(f"{status} {count}" for status, count in sorted(counts.items()))
+        self.stdout.write(self.style.SUCCESS(f"Ran jobs: {summary or 'none'}."))
+
+    def _report(self, outcome, counts):
+        job_id, kind, status = outcome
+        counts[status] = counts.get(status, 0) + 1
+        self.stdout.write(f"Job {job_id} ({kind}): {status}")
@@ -0,0 +1,166 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from billing.models import Barrel, Invoice, InvoiceLine, Provider, ProviderLitersSummary
+
+OIL_TYPES = ("Olive", "Sunflower", "Rapeseed", "Corn")
+FIRST_ISSUE_DATE = date(2024, 1, 1)
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed load-test volumes (providers x barrels x invoices x lines) with bulk_create. "
+        "Each provider gets a user '<tag>-<n>' sharing --password."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--providers", type=int, default=10)
+        parser.add_argument("--barrels", type=int, default=1000, help="Barrels per provider.")
+        parser.add_argument("--invoices", type=int, default=100, help="Invoices per provider.")
+        parser.add_argument(
+            "--lines",
+            type=int,
+            default=5,
+            help="Lines per invoice; each line bills one of the provider's barrels.",
+        )
+        parser.add_argument("--tag", default="load", help="Prefix of every generated name.")
+        parser.add_argument("--password", default="load1234")
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Delete providers and users seeded earlier with the same --tag first.",
+        )
+        parser.add_argument(
+            "--providers-per-transaction",
+            type=int,
+            default=10,
+            help="Providers written per transaction; bounds memory for large runs.",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        for name in ("providers", "barrels", "providers_per_transaction", "batch_size"):
+            if options[name] < 1:
+                raise CommandError(f"--{name.replace('_', '-')} must be at least 1.")
+        for name in ("invoices", "lines"):
+            if options[name] < 0:
+                raise CommandError(f"--{name} must not be negative.")
+        if options["invoices"] * options["lines"] > options["barrels"]:
+            raise CommandError(
+                "--invoices x --lines must not exceed --barrels: every line bills its own barrel."
+            )
+
+        tag = options["tag"]
+        if options["reset"]:
+            self._reset(tag)
+        elif Provider.objects.filter(tax_id__startswith=f"{tag}-").exists():
+            raise CommandError(f"Data tagged '{tag}' already exists; pass --reset or another --tag.")
+
+        password_hash = make_password(options["password"])
+        step = options["providers_per_transaction"]
+        for start in range(0, options["providers"], step):
+            indexes = range(start, min(start + step, options["providers"]))
+            self._seed_providers(indexes, tag, password_hash, options)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Seeded {options['providers']} provider(s) with {options['barrels']} barrel(s), "
+                f"{options['invoices']} invoice(s) and {options['invoices'] * options['lines']} "
+                f"line(s) each."
+            )
+        )
+
+    def _reset(self, tag):
+        providers = Provider.objects.filter(tax_id__startswith=f"{tag}-")
+        with transaction.atomic():
+            get_user_model().objects.filter(provider__in=providers).delete()
+            # Lines protect their barrels, so they go before the cascade.
+            InvoiceLine.objects.filter(invoice__provider__in=providers).delete()
+            deleted = providers.delete()[1].get(Provider._meta.label, 0)
+        self.stdout.write(f"Deleted {deleted} provider(s) tagged '{tag}'.")
+
+    @transaction.atomic
+    def _seed_providers(self, indexes, tag, password_hash, options):
+        batch_size = options["batch_size"]
+        providers = Provider.objects.bulk_create(
+            Provider(
+                name=f"{tag} provider {index}",
+                address=f"{index} Load Test Ave",
+                tax_id=f"{tag}-{index:06d}",
+            )
+            for index in indexes
+        )
+
+        barrels = Barrel.objects.bulk_create(
+            (
+                Barrel(
+                    provider=provider,
+                    number=f"B-{number:07d}",
+                    oil_type=OIL_TYPES[number % len(OIL_TYPES)],
+                    liters=50 + number % 200,
+                    billed=number < options["invoices"] * options["lines"],
+                )
+                for provider in providers
+                for number in range(options["barrels"])
+            ),
+            batch_size=batch_size,
+        )
+        barrels_by_provider = {}
+        for barrel in barrels:
+            barrels_by_provider.setdefault(barrel.provider_id, []).append(barrel)
+
+        invoices = Invoice.objects.bulk_create(
+            (
+                Invoice(
+                    provider=provider,
+                    invoice_no=f"{tag.upper()}-{index:06d}-{number:06d}",
+                    issued_on=FIRST_ISSUE_DATE + timedelta(days=number % 365),
+                )
+                for provider, index in zip(providers, indexes)
+                for number in range(options["invoices"])
+            ),
+            batch_size=batch_size,
+        )
+
+        lines_per_invoice = options["lines"]
+        InvoiceLine.objects.bulk_create(
+            (
+                InvoiceLine(
+                    invoice=invoice,
+                    barrel=barrel,
+                    liters=barrel.liters,
+                    unit_price=Decimal("1.00") + Decimal(barrel_index % 300) / 100,
+                    description=f"{barrel.oil_type} barrel {barrel.number}",
+                )
+                for invoice_number, invoice in enumerate(invoices)
+                for barrel_index, barrel in enumerate(
+                    self._barrels_for_invoice(
+                        barrels_by_provider[invoice.provider_id],
+                        invoice_number % options["invoices"],
+                        lines_per_invoice,
+                    )
+                )
+            ),
+            batch_size=batch_size,
+        )
+
+        get_user_model().objects.bulk_create(
+            get_user_model()(
+                username=f"{tag}-{index}", password=password_hash, provider=provider
+            )
+            for provider, index in zip(providers, indexes)
+        )
+
+        # Barrels were written with bulk_create, which skips Barrel.save.
+        ProviderLitersSummary.rebuild([provider.id for provider in providers])
+
+    @staticmethod
+    def _barrels_for_invoice(barrels, invoice_number, lines_per_invoice):
+        # The first invoices x lines barrels were created billed, in order.
+        start = invoice_number * lines_per_invoice
+        return barrels[start:start + lines_per_invoice]
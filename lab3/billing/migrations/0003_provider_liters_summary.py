@@ -0,0 +1,55 @@
+# Generated by Django 5.1.6 on 2026-10-16
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+
+
+def populate_liters_summary(apps, schema_editor):
+    Provider = apps.get_model("billing", "Provider")
+    ProviderLitersSummary = apps.get_model("billing", "ProviderLitersSummary")
+
+    rows = Provider.objects.annotate(
+        live_billed_liters=Coalesce(Sum("barrels__liters", filter=Q(barrels__billed=True)), 0),
+        live_liters_to_bill=Coalesce(Sum("barrels__liters", filter=Q(barrels__billed=False)), 0),
+        live_billed_barrels=Count("barrels", filter=Q(barrels__billed=True)),
+        live_barrels_to_bill=Count("barrels", filter=Q(barrels__billed=False)),
+    ).values(
+        "id",
+        "live_billed_liters",
+        "live_liters_to_bill",
+        "live_billed_barrels",
+        "live_barrels_to_bill",
+    )
+    ProviderLitersSummary.objects.bulk_create(
+        ProviderLitersSummary(
+            provider_id=row["id"],
+            billed_liters=row["live_billed_liters"],
+            liters_to_bill=row["live_liters_to_bill"],
+            billed_barrels=row["live_billed_barrels"],
+            barrels_to_bill=row["live_barrels_to_bill"],
+        )
+        for row in rows
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0002_invoice_provider'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProviderLitersSummary',
+            fields=[
+                ('provider', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='liters_summary', serialize=False, to='billing.provider')),
+                ('billed_liters', models.BigIntegerField(default=0)),
+                ('liters_to_bill', models.BigIntegerField(default=0)),
+                ('billed_barrels', models.IntegerField(default=0)),
+                ('barrels_to_bill', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(populate_liters_summary, migrations.RunPython.noop),
+    ]
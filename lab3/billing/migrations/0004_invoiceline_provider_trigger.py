@@ -0,0 +1,91 @@
+# Generated by Django 5.1.6 on 2026-10-16
+
+from django.db import migrations
+
+# Invoice lines may only bill barrels of the invoice's own provider. The rule
+# spans three tables, so it cannot be a CHECK constraint; these triggers
+# reject inserts/updates that would break it.
+CREATE_TRIGGERS_SQL = """
+CREATE OR REPLACE FUNCTION billing_invoiceline_provider_check() RETURNS trigger AS $$
+BEGIN
+    IF (SELECT provider_id FROM billing_invoice WHERE id = NEW.invoice_id)
+       IS DISTINCT FROM (SELECT provider_id FROM billing_barrel WHERE id = NEW.barrel_id) THEN
+        RAISE EXCEPTION 'barrel provider must match invoice provider'
+            USING ERRCODE = 'check_violation';
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER billing_invoiceline_provider_check
+    BEFORE INSERT OR UPDATE OF invoice_id, barrel_id ON billing_invoiceline
+    FOR EACH ROW EXECUTE FUNCTION billing_invoiceline_provider_check();
+
+CREATE OR REPLACE FUNCTION billing_invoice_provider_check() RETURNS trigger AS $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM billing_invoiceline line
+        JOIN billing_barrel barrel ON barrel.id = line.barrel_id
+        WHERE line.invoice_id = NEW.id AND barrel.provider_id <> NEW.provider_id
+    ) THEN
+        RAISE EXCEPTION 'barrel provider must match invoice provider'
+            USING ERRCODE = 'check_violation';
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER billing_invoice_provider_check
+    BEFORE UPDATE OF provider_id ON billing_invoice
+    FOR EACH ROW EXECUTE FUNCTION billing_invoice_provider_check();
+
+CREATE OR REPLACE FUNCTION billing_barrel_provider_check() RETURNS trigger AS $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM billing_invoiceline line
+        JOIN billing_invoice invoice ON invoice.id = line.invoice_id
+        WHERE line.barrel_id = NEW.id AND invoice.provider_id <> NEW.provider_id
+    ) THEN
+        RAISE EXCEPTION 'barrel provider must match invoice provider'
+            USING ERRCODE = 'check_violation';
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER billing_barrel_provider_check
+    BEFORE UPDATE OF provider_id ON billing_barrel
+    FOR EACH ROW EXECUTE FUNCTION billing_barrel_provider_check();
+"""
+
+DROP_TRIGGERS_SQL = """
+DROP TRIGGER IF EXISTS billing_barrel_provider_check ON billing_barrel;
+DROP FUNCTION IF EXISTS billing_barrel_provider_check();
+DROP TRIGGER IF EXISTS billing_invoice_provider_check ON billing_invoice;
+DROP FUNCTION IF EXISTS billing_invoice_provider_check();
+DROP TRIGGER IF EXISTS billing_invoiceline_provider_check ON billing_invoiceline;
+DROP FUNCTION IF EXISTS billing_invoiceline_provider_check();
+"""
+
+
+def create_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(CREATE_TRIGGERS_SQL)
+
+
+def drop_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(DROP_TRIGGERS_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("billing", "0003_provider_liters_summary"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_triggers, drop_triggers),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-16 20:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0004_invoiceline_provider_trigger'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='invoiceline',
+            constraint=models.UniqueConstraint(fields=('barrel',), name='billing_invoiceline_unique_barrel'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.1.6 on 2026-10-16 20:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# InvoiceFilter.invoice_no uses icontains, which PostgreSQL runs as
+# UPPER(invoice_no) LIKE UPPER('%...%'); a trigram GIN index on the same
+# expression lets that search use an index instead of a sequential scan.
+CREATE_TRGM_INDEX_SQL = """
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS billing_inv_no_trgm_idx
+    ON billing_invoice USING gin (UPPER(invoice_no) gin_trgm_ops);
+"""
+
+DROP_TRGM_INDEX_SQL = """
+DROP INDEX IF EXISTS billing_inv_no_trgm_idx;
+"""
+
+
+def create_trgm_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(CREATE_TRGM_INDEX_SQL)
+
+
+def drop_trgm_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(DROP_TRGM_INDEX_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0005_invoiceline_unique_barrel'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='barrel',
+            name='provider',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='barrels', to='billing.provider'),
+        ),
+        migrations.AlterField(
+            model_name='invoice',
+            name='provider',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='invoices', to='billing.provider'),
+        ),
+        migrations.AddIndex(
+            model_name='barrel',
+            index=models.Index(condition=models.Q(('billed', False)), fields=['provider'], name='billing_barrel_unbilled_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['provider', '-issued_on', '-id'], name='billing_inv_prov_issued_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['-issued_on', '-id'], name='billing_inv_issued_idx'),
+        ),
+        migrations.RunPython(create_trgm_index, drop_trgm_index),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.6 on 2026-10-16 22:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0007_provider_change_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BillingRollupMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('stale', models.BooleanField(default=False)),
+                ('refreshed_at', models.DateTimeField(blank=True, null=True)),
+                ('provider', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='rollup_months', to='billing.provider')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BillingRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('oil_type', models.CharField(max_length=128)),
+                ('invoices', models.PositiveIntegerField()),
+                ('lines', models.PositiveIntegerField()),
+                ('liters', models.BigIntegerField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('period', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='rows', to='billing.billingrollupmonth')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='billingrollupmonth',
+            constraint=models.UniqueConstraint(fields=('provider', 'month'), name='billing_rollup_month_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='billingrollup',
+            constraint=models.UniqueConstraint(fields=('period', 'oil_type'), name='billing_rollup_unique'),
+        ),
+    ]
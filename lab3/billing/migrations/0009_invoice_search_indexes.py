@@ -0,0 +1,42 @@
+# Generated by Django 5.1.6 on 2026-10-16 21:10
+
+from django.db import migrations, models
+
+# InvoiceFilter.invoice_no_prefix uses istartswith, which PostgreSQL runs as
+# UPPER(invoice_no) LIKE UPPER('...%'). Outside the C locale a btree index
+# only serves LIKE with a pattern_ops operator class.
+CREATE_PREFIX_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS billing_inv_no_prefix_idx
+    ON billing_invoice (UPPER(invoice_no) text_pattern_ops);
+"""
+
+DROP_PREFIX_INDEX_SQL = """
+DROP INDEX IF EXISTS billing_inv_no_prefix_idx;
+"""
+
+
+def create_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(CREATE_PREFIX_INDEX_SQL)
+
+
+def drop_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(DROP_PREFIX_INDEX_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0008_billing_rollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='barrel',
+            index=models.Index(fields=['number'], name='billing_barrel_number_idx'),
+        ),
+        migrations.RunPython(create_prefix_index, drop_prefix_index),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.1.6 on 2026-10-16 23:55
+
+from django.db import migrations
+
+# Row-level security policies matching ProviderScopedQuerySet.for_user
+# (billing.scoping). They are inert until `manage.py row_level_security
+# enable` turns row-level security on for these tables. An empty or unset
+# app.provider_id lets every row through, so commands, job workers and
+# superuser requests are unaffected.
+CREATE_POLICIES_SQL = """
+CREATE OR REPLACE FUNCTION billing_all_providers_visible() RETURNS boolean AS $$
+    SELECT COALESCE(current_setting('app.provider_id', true), '') = ''
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION billing_provider_visible(provider bigint) RETURNS boolean AS $$
+    SELECT billing_all_providers_visible()
+        OR provider = current_setting('app.provider_id', true)::bigint
+$$ LANGUAGE sql STABLE;
+
+CREATE POLICY billing_provider_scope ON billing_provider
+    USING (billing_provider_visible(id));
+CREATE POLICY billing_barrel_scope ON billing_barrel
+    USING (billing_provider_visible(provider_id));
+CREATE POLICY billing_invoice_scope ON billing_invoice
+    USING (billing_provider_visible(provider_id));
+-- The invoice lookup is itself filtered by billing_invoice_scope.
+CREATE POLICY billing_invoiceline_scope ON billing_invoiceline
+    USING (
+        billing_all_providers_visible()
+        OR EXISTS (SELECT 1 FROM billing_invoice invoice WHERE invoice.id = invoice_id)
+    );
+"""
+
+DROP_POLICIES_SQL = """
+ALTER TABLE billing_provider NO FORCE ROW LEVEL SECURITY, DISABLE ROW LEVEL SECURITY;
+ALTER TABLE billing_barrel NO FORCE ROW LEVEL SECURITY, DISABLE ROW LEVEL SECURITY;
+ALTER TABLE billing_invoice NO FORCE ROW LEVEL SECURITY, DISABLE ROW LEVEL SECURITY;
+ALTER TABLE billing_invoiceline NO FORCE ROW LEVEL SECURITY, DISABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS billing_invoiceline_scope ON billing_invoiceline;
+DROP POLICY IF EXISTS billing_invoice_scope ON billing_invoice;
+DROP POLICY IF EXISTS billing_barrel_scope ON billing_barrel;
+DROP POLICY IF EXISTS billing_provider_scope ON billing_provider;
+DROP FUNCTION IF EXISTS billing_provider_visible(bigint);
+DROP FUNCTION IF EXISTS billing_all_providers_visible();
+"""
+
+
+def create_policies(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(CREATE_POLICIES_SQL)
+
+
+def drop_policies(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(DROP_POLICIES_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0010_job'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_policies, drop_policies),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.6 on 2026-10-17 00:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0011_row_level_security_policies'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReplicaPin',
+            fields=[
+                ('user_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('pinned_until', models.DateTimeField()),
+            ],
+        ),
+    ]
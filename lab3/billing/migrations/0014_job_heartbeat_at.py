@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-17 00:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0013_idempotentresponse'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        # Jobs running during the upgrade keep the timeout they had.
+        migrations.RunSQL(
+            "UPDATE billing_job SET heartbeat_at = started_at WHERE status = 'running'",
+            migrations.RunSQL.noop,
+        ),
+    ]
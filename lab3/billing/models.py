@@ -2,14 +2,40 @@ from __future__ import annotations
 
 from decimal import Decimal
 
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator
 from django.db import models, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .scoping import ProviderScopedQuerySet
+from .signals import billing_changed, notify_billing_changed
+
+
+class BulkBillingError(ValueError):
+    """Raised by ``Invoice.add_lines_for_barrels`` with one error per item."""
+
+    def __init__(self, errors: list[str | None]):
+        super().__init__("one or more lines could not be billed")
+        self.errors = errors
+
+
+CHANGE_STATE_FIELDS = ("change_version", "changed_at")
 
 
 class Provider(models.Model):
     name = models.CharField(max_length=255)
     address = models.TextField()
     tax_id = models.CharField(max_length=64)
+    # Bumped in the writing transaction whenever any of this provider's
+    # barrels, invoices or lines change; drives ETag / Last-Modified.
+    change_version = models.PositiveBigIntegerField(default=1, editable=False)
+    changed_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    objects = ProviderScopedQuerySet.as_manager()
+    provider_scope_field = "id"
 
     def __str__(self) -> str:
         return f"{self.name} ({self.tax_id})"
@@ -17,41 +43,124 @@ class Provider(models.Model):
     def has_barrels_to_bill(self) -> bool:
         return self.barrels.filter(billed=False).exists()
 
+    def save(self, *args, **kwargs):
+        # An in-memory instance may hold a stale change_version; writing it
+        # back would let the post-save bump re-issue an old version.
+        if not self._state.adding and not args and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in CHANGE_STATE_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def bump_change_versions(cls, provider_ids) -> None:
+        # QuerySet.update: no signals, and a no-op for deleted providers.
+        cls.objects.filter(id__in=provider_ids).update(
+            change_version=F("change_version") + 1,
+            changed_at=timezone.now(),
+        )
+
 
 class Barrel(models.Model):
+    # Indexed through unique_together, which leads with provider.
     provider = models.ForeignKey(
-        Provider, related_name="barrels", on_delete=models.CASCADE
+        Provider, related_name="barrels", on_delete=models.CASCADE, db_index=False
     )
     number = models.CharField(max_length=64)
     oil_type = models.CharField(max_length=128)
     liters = models.PositiveIntegerField(validators=[MinValueValidator(1)])
     billed = models.BooleanField(default=False)
 
+    objects = ProviderScopedQuerySet.as_manager()
+    provider_scope_field = "provider"
+
     class Meta:
         unique_together = ("provider", "number")
+        indexes = [
+            # Unbilled barrels are the small, hot subset (billing, has_barrels_to_bill);
+            # billed ones are most of a provider's barrels and use unique_together.
+            models.Index(
+                fields=["provider"],
+                condition=Q(billed=False),
+                name="billing_barrel_unbilled_idx",
+            ),
+            # InvoiceFilter.barrel_number, across providers.
+            models.Index(fields=["number"], name="billing_barrel_number_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"Barrel {self.number} ({self.oil_type})"
 
+    def _locked_ledger_state(self) -> dict | None:
+        return (
+            Barrel.objects.select_for_update()
+            .filter(pk=self.pk)
+            .values("provider_id", "liters", "billed")
+            .first()
+        )
+
+    def save(self, *args, **kwargs):
+        # Keep ProviderLitersSummary in step with every barrel write that goes
+        # through the model (API, admin, add_line_for_barrel).
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding and self.pk is not None:
+                previous = self._locked_ledger_state()
+            super().save(*args, **kwargs)
+
+            current = {
+                "provider_id": self.provider_id,
+                "liters": self.liters,
+                "billed": self.billed,
+            }
+            update_fields = kwargs.get("update_fields")
+            if previous is not None and update_fields is not None:
+                saved = {"provider_id" if f == "provider" else f for f in update_fields}
+                current = {
+                    key: value if key in saved else previous[key]
+                    for key, value in current.items()
+                }
+            ProviderLitersSummary.record_barrel_change(previous, current)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            previous = self._locked_ledger_state()
+            result = super().delete(*args, **kwargs)
+            ProviderLitersSummary.record_barrel_change(previous, None)
+        return result
+
 
 class Invoice(models.Model):
+    # Indexed through billing_inv_prov_issued_idx.
     provider = models.ForeignKey(
-        Provider, related_name="invoices", on_delete=models.CASCADE
+        Provider, related_name="invoices", on_delete=models.CASCADE, db_index=False
     )
     invoice_no = models.CharField(max_length=64, unique=True)
     issued_on = models.DateField()
 
+    objects = ProviderScopedQuerySet.as_manager()
+    provider_scope_field = "provider"
+
+    class Meta:
+        # Match the API ordering (-issued_on, -id), scoped and unscoped.
+        # invoice_no also has a pg_trgm index (migration 0006) for icontains and
+        # a text_pattern_ops index (migration 0009) for prefix search.
+        indexes = [
+            models.Index(
+                fields=["provider", "-issued_on", "-id"],
+                name="billing_inv_prov_issued_idx",
+            ),
+            models.Index(fields=["-issued_on", "-id"], name="billing_inv_issued_idx"),
+        ]
+
     def __str__(self) -> str:
         return self.invoice_no
 
-    @transaction.atomic
-    def add_line_for_barrel(
-        self,
-        barrel: Barrel,
-        liters: int,
-        unit_price_per_liter: Decimal,
-        description: str,
-    ) -> "InvoiceLine":
+    def _check_line_for_barrel(
+        self, barrel: Barrel, liters: int, unit_price_per_liter: Decimal
+    ) -> None:
         if liters <= 0:
             raise ValueError("liters must be > 0")
         if unit_price_per_liter <= 0:
@@ -61,20 +170,103 @@ class Invoice(models.Model):
         if barrel.liters != liters:
             raise ValueError("liters must equal barrel.liters to bill the full barrel")
 
-        if barrel.provider != self.provider:
+        # Also enforced in the database by the billing_invoiceline_provider_check
+        # trigger; checked here first to report a clean validation error.
+        if barrel.provider_id != self.provider_id:
             raise ValueError("barrel provider must match invoice provider")
 
+    @transaction.atomic
+    def add_line_for_barrel(
+        self,
+        barrel: Barrel,
+        liters: int,
+        unit_price_per_liter: Decimal,
+        description: str,
+    ) -> "InvoiceLine":
+        # Re-read the barrel under a row lock so two concurrent calls cannot
+        # both see it unbilled; the passed-in instance may be stale.
+        locked_barrel = Barrel.objects.select_for_update().get(pk=barrel.pk)
+        if locked_barrel.billed:
+            raise ValueError("barrel is already billed")
+        self._check_line_for_barrel(locked_barrel, liters, unit_price_per_liter)
+
         new_line = InvoiceLine.objects.create(
             invoice=self,
-            barrel=barrel,
+            barrel=locked_barrel,
             liters=liters,
             unit_price=unit_price_per_liter,
             description=description,
         )
+        locked_barrel.billed = True
+        locked_barrel.save(update_fields=["billed"])
         barrel.billed = True
-        barrel.save(update_fields=["billed"])
         return new_line
 
+    @transaction.atomic
+    def add_lines_for_barrels(self, items: list[dict]) -> list["InvoiceLine"]:
+        """Bill several barrels with a constant number of queries.
+
+        Each item is a dict with ``barrel_id``, ``liters``,
+        ``unit_price_per_liter`` and ``description``. The same rules as
+        ``add_line_for_barrel`` apply, and a barrel cannot be billed twice.
+        Either every line is created or none is: on any failure
+        ``BulkBillingError`` is raised with one message (or ``None``) per item.
+        """
+        barrel_ids = [item["barrel_id"] for item in items]
+        barrels = {
+            barrel.id: barrel
+            for barrel in Barrel.objects.select_for_update()
+            .filter(id__in=barrel_ids)
+            .order_by("id")
+        }
+
+        errors: list[str | None] = []
+        seen_ids: set[int] = set()
+        for item in items:
+            barrel = barrels.get(item["barrel_id"])
+            try:
+                if barrel is None:
+                    raise ValueError("barrel does not exist")
+                if barrel.id in seen_ids:
+                    raise ValueError("barrel appears more than once in the batch")
+                if barrel.billed:
+                    raise ValueError("barrel is already billed")
+                self._check_line_for_barrel(
+                    barrel, item["liters"], item["unit_price_per_liter"]
+                )
+            except ValueError as exc:
+                errors.append(str(exc))
+            else:
+                errors.append(None)
+            seen_ids.add(item["barrel_id"])
+
+        if any(errors):
+            raise BulkBillingError(errors)
+
+        new_lines = InvoiceLine.objects.bulk_create(
+            InvoiceLine(
+                invoice=self,
+                barrel_id=item["barrel_id"],
+                liters=item["liters"],
+                unit_price=item["unit_price_per_liter"],
+                description=item["description"],
+            )
+            for item in items
+        )
+        # A single UPDATE bypasses Barrel.save, so the ledger is moved here.
+        Barrel.objects.filter(id__in=barrel_ids).update(billed=True)
+        # Provider row before the ledger row, as on every write path.
+        notify_billing_changed(provider_ids=[self.provider_id], invoice_ids=[self.pk])
+        total_liters = sum(item["liters"] for item in items)
+        ProviderLitersSummary.apply_delta(
+            self.provider_id,
+            billed_liters=total_liters,
+            liters_to_bill=-total_liters,
+            billed_barrels=len(items),
+            barrels_to_bill=-len(items),
+        )
+        return new_lines
+
 
 class InvoiceLine(models.Model):
     invoice = models.ForeignKey(Invoice, related_name="lines", on_delete=models.CASCADE)
@@ -87,5 +279,281 @@ class InvoiceLine(models.Model):
         max_digits=12, decimal_places=2, validators=[MinValueValidator(Decimal("0.01"))]
     )
 
+    class Meta:
+        constraints = [
+            # A barrel is billed in full, so it can appear on at most one line.
+            models.UniqueConstraint(fields=["barrel"], name="billing_invoiceline_unique_barrel"),
+        ]
+
     def __str__(self) -> str:
         return f"Line {self.id} ({self.liters} L @ {self.unit_price})"
+
+
+class ProviderLitersSummary(models.Model):
+    """Denormalized per-provider barrel totals.
+
+    Updated in the same transaction as the barrel write that changes them, so
+    provider reads do not have to aggregate the whole barrel history.
+    """
+
+    provider = models.OneToOneField(
+        Provider,
+        related_name="liters_summary",
+        on_delete=models.CASCADE,
+        primary_key=True,
+    )
+    billed_liters = models.BigIntegerField(default=0)
+    liters_to_bill = models.BigIntegerField(default=0)
+    billed_barrels = models.IntegerField(default=0)
+    barrels_to_bill = models.IntegerField(default=0)
+
+    TOTAL_FIELDS = ("billed_liters", "liters_to_bill", "billed_barrels", "barrels_to_bill")
+
+    def __str__(self) -> str:
+        return f"Liters summary for provider {self.provider_id}"
+
+    @staticmethod
+    def _barrel_totals(state: dict | None, sign: int) -> dict:
+        if state is None:
+            return {}
+        if state["billed"]:
+            return {"billed_liters": sign * state["liters"], "billed_barrels": sign}
+        return {"liters_to_bill": sign * state["liters"], "barrels_to_bill": sign}
+
+    @classmethod
+    def apply_delta(cls, provider_id: int, **deltas: int) -> None:
+        deltas = {field: value for field, value in deltas.items() if value}
+        if not deltas:
+            return
+        cls.objects.get_or_create(provider_id=provider_id)
+        cls.objects.filter(provider_id=provider_id).update(
+            **{field: F(field) + value for field, value in deltas.items()}
+        )
+
+    @classmethod
+    def record_barrel_change(cls, previous: dict | None, current: dict | None) -> None:
+        """Apply the difference between two barrel states to the ledger.
+
+        Each state is a dict with ``provider_id``, ``liters`` and ``billed``;
+        ``None`` stands for a barrel that does not exist (create / delete).
+        """
+        per_provider: dict[int, dict[str, int]] = {}
+        for state, sign in ((previous, -1), (current, 1)):
+            if state is None:
+                continue
+            totals = per_provider.setdefault(state["provider_id"], {})
+            for field, value in cls._barrel_totals(state, sign).items():
+                totals[field] = totals.get(field, 0) + value
+
+        for provider_id, totals in per_provider.items():
+            cls.apply_delta(provider_id, **totals)
+
+    @classmethod
+    def live_totals(cls, provider_ids=None) -> dict[int, dict[str, int]]:
+        """Aggregate the totals straight from ``Barrel`` rows."""
+        providers = Provider.objects.all()
+        if provider_ids is not None:
+            providers = providers.filter(id__in=provider_ids)
+        rows = providers.annotate(
+            live_billed_liters=Coalesce(Sum("barrels__liters", filter=Q(barrels__billed=True)), 0),
+            live_liters_to_bill=Coalesce(Sum("barrels__liters", filter=Q(barrels__billed=False)), 0),
+            live_billed_barrels=Count("barrels", filter=Q(barrels__billed=True)),
+            live_barrels_to_bill=Count("barrels", filter=Q(barrels__billed=False)),
+        ).values("id", *(f"live_{field}" for field in cls.TOTAL_FIELDS))
+        return {
+            row["id"]: {field: row[f"live_{field}"] for field in cls.TOTAL_FIELDS}
+            for row in rows
+        }
+
+    @classmethod
+    @transaction.atomic
+    def rebuild(cls, provider_ids=None) -> int:
+        """Recompute ledger rows from a live aggregate. Returns rows written."""
+        summaries = [
+            cls(provider_id=provider_id, **totals)
+            for provider_id, totals in cls.live_totals(provider_ids).items()
+        ]
+        cls.objects.bulk_create(
+            summaries,
+            update_conflicts=True,
+            unique_fields=["provider"],
+            update_fields=list(cls.TOTAL_FIELDS),
+        )
+        notify_billing_changed(provider_ids=[summary.provider_id for summary in summaries])
+        return len(summaries)
+
+    @classmethod
+    def find_inconsistencies(cls, provider_ids=None) -> list[dict]:
+        """Compare the ledger against a live aggregate.
+
+        Returns one entry per provider whose stored totals differ, with the
+        ``expected`` (live) and ``stored`` values. A missing ledger row counts
+        as all zeros.
+        """
+        stored_rows = cls.objects.all()
+        if provider_ids is not None:
+            stored_rows = stored_rows.filter(provider_id__in=provider_ids)
+        stored = {
+            row["provider_id"]: {field: row[field] for field in cls.TOTAL_FIELDS}
+            for row in stored_rows.values("provider_id", *cls.TOTAL_FIELDS)
+        }
+        zeros = dict.fromkeys(cls.TOTAL_FIELDS, 0)
+
+        mismatches = []
+        for provider_id, expected in cls.live_totals(provider_ids).items():
+            actual = stored.get(provider_id, zeros)
+            if actual != expected:
+                mismatches.append(
+                    {"provider_id": provider_id, "expected": expected, "stored": actual}
+                )
+        return mismatches
+
+
+class BillingRollupMonth(models.Model):
+    """One provider-month covered by the precomputed billing report.
+
+    Written by ``billing.reports.refresh_rollup`` for completed months.
+    ``stale`` is set when a write touches an invoice issued in that month;
+    stale and missing months are computed live from invoice lines.
+    """
+
+    # Indexed through billing_rollup_month_unique, which leads with provider.
+    provider = models.ForeignKey(
+        Provider, related_name="rollup_months", on_delete=models.CASCADE, db_index=False
+    )
+    month = models.DateField()
+    stale = models.BooleanField(default=False)
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["provider", "month"], name="billing_rollup_month_unique"
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"Rollup {self.month:%Y-%m} for provider {self.provider_id}"
+
+
+class BillingRollup(models.Model):
+    """Billed totals of one provider-month and oil type."""
+
+    # Indexed through billing_rollup_unique, which leads with period.
+    period = models.ForeignKey(
+        BillingRollupMonth, related_name="rows", on_delete=models.CASCADE, db_index=False
+    )
+    oil_type = models.CharField(max_length=128)
+    invoices = models.PositiveIntegerField()
+    lines = models.PositiveIntegerField()
+    liters = models.BigIntegerField()
+    amount = models.DecimalField(max_digits=20, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["period", "oil_type"], name="billing_rollup_unique"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.period} / {self.oil_type}"
+
+
+class Job(models.Model):
+    """A unit of background work, queued by ``billing.jobs.enqueue``.
+
+    Run by ``manage.py run_jobs`` workers; ``kind`` selects the handler and
+    ``payload`` holds its arguments. ``result`` and ``error`` are whatever the
+    handler returned or failed with.
+    """
+
+    class Status(models.TextChoices):
+        QUEUED = "queued"
+        RUNNING = "running"
+        SUCCEEDED = "succeeded"
+        FAILED = "failed"
+
+    kind = models.CharField(max_length=64)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    worker = models.CharField(max_length=128, blank=True)
+    # Indexed through billing_job_creator_idx, which leads with created_by.
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name="jobs",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        db_index=False,
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Bumped by the running worker's run_jobs loop; see requeue_stale.
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The workers' claim query: due queued jobs, oldest first.
+            models.Index(
+                fields=["run_after", "id"],
+                condition=Q(status="queued"),
+                name="billing_job_queued_idx",
+            ),
+            # GET /api/jobs/ for one user, newest first.
+            models.Index(fields=["created_by", "-id"], name="billing_job_creator_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"Job {self.pk} ({self.kind}, {self.status})"
+
+
+class IdempotentResponse(models.Model):
+    """The outcome of a request sent with an ``Idempotency-Key`` (``billing.api.idempotency``).
+
+    Inserted when the request starts, with no ``status`` while it runs, and
+    filled in once it succeeds. Rows live in the database so that a retry
+    reaching any worker finds them. Past ``expires_at`` a row is ignored and
+    may be deleted.
+    """
+
+    # sha256 of the user, path and key.
+    key = models.CharField(max_length=64, primary_key=True)
+    fingerprint = models.CharField(max_length=64)
+    status = models.PositiveSmallIntegerField(null=True, blank=True)
+    data = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self) -> str:
+        return self.key
+
+
+class ReplicaPin(models.Model):
+    """A user who wrote recently and reads from the primary until ``pinned_until``.
+
+    Kept in the database so that every worker sees the pin (``billing.replicas``).
+    One row per user; it is overwritten by the user's next write.
+    """
+
+    user_id = models.BigIntegerField(primary_key=True)
+    pinned_until = models.DateTimeField()
+
+    def __str__(self) -> str:
+        return f"User {self.user_id} until {self.pinned_until}"
+
+
+def bump_provider_change_versions(sender, provider_ids, on_commit=False, **kwargs):
+    # Only the in-transaction send: the version must change atomically with
+    # the data it describes. Writers send it before moving the
+    # ProviderLitersSummary ledger (model saves do so from post_save), so
+    # every path locks the provider row first and concurrent writes for one
+    # provider cannot deadlock on the two rows.
+    if provider_ids and not on_commit:
+        Provider.bump_change_versions(provider_ids)
+
+
+billing_changed.connect(bump_provider_change_versions, dispatch_uid="bump_provider_change_versions")
@@ -0,0 +1,185 @@
+"""Read-replica routing.
+
+``settings.DATABASE_REPLICAS`` lists database aliases that replicate
+``default``. Reads go to a replica only inside ``replica_reads(user)``,
+which the list/retrieve actions of the read-only API paths enter (see
+``billing.api.replicas``), or ``areplica_reads`` in the async views. Everything else stays on the primary:
+- writes and ``select_for_update``;
+- every read made while the primary connection is inside
+  ``transaction.atomic`` (``add_line_for_barrel`` and the other billing
+  paths);
+- every read of a user who wrote recently.
+
+``ReplicaPinMiddleware`` notes when a request writes. The requesting user
+then reads from the primary for ``REPLICA_PIN_SECONDS`` (read-your-writes).
+Pins are ``ReplicaPin`` rows on the primary, so a write served by one worker
+pins the user on every worker. Checking the pin costs each replica-routed
+request one primary-key lookup on the primary. Each replica-routed request
+uses one replica throughout.
+"""
+
+import random
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+
+from .models import ReplicaPin
+
+_replica = ContextVar("billing_read_replica", default=None)
+_request_writes = ContextVar("billing_request_writes", default=None)
+
+
+def replicas() -> list[str]:
+    return list(getattr(settings, "DATABASE_REPLICAS", ()))
+
+
+def pin_to_primary(user_id) -> None:
+    until = timezone.now() + timedelta(seconds=settings.REPLICA_PIN_SECONDS)
+    ReplicaPin.objects.using(DEFAULT_DB_ALIAS).bulk_create(
+        [ReplicaPin(user_id=user_id, pinned_until=until)],
+        update_conflicts=True,
+        unique_fields=["user_id"],
+        update_fields=["pinned_until"],
+    )
+
+
+def _pins(user_id):
+    return ReplicaPin.objects.using(DEFAULT_DB_ALIAS).filter(
+        user_id=user_id, pinned_until__gt=timezone.now()
+    )
+
+
+def is_pinned(user_id) -> bool:
+    return _pins(user_id).exists()
+
+
+async def ais_pinned(user_id) -> bool:
+    return await _pins(user_id).aexists()
+
+
+def current_replica() -> str | None:
+    """The replica reads are routed to right now, or None for the primary."""
+    return _replica.get()
+
+
+@contextmanager
+def _reads_from(alias):
+    token = _replica.set(alias)
+    try:
+        yield alias
+    finally:
+        _replica.reset(token)
+
+
+@contextmanager
+def replica_reads(user):
+    """Route reads inside the block to one replica, if ``user`` may use one."""
+    aliases = replicas()
+    alias = None
+    if aliases and not (user.is_authenticated and is_pinned(user.pk)):
+        alias = random.choice(aliases)
+    with _reads_from(alias):
+        yield alias
+
+
+@asynccontextmanager
+async def areplica_reads(user):
+    """``replica_reads`` for code on the event loop."""
+    aliases = replicas()
+    alias = None
+    if aliases and not (user.is_authenticated and await ais_pinned(user.pk)):
+        alias = random.choice(aliases)
+    with _reads_from(alias):
+        yield alias
+
+
+@contextmanager
+def primary_reads():
+    """Route reads inside the block to the primary, e.g. to fill shared caches."""
+    with _reads_from(None):
+        yield
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = _replica.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        writes = _request_writes.get()
+        if writes is not None:
+            writes.wrote = True
+        # Explicit: for None Django would write back to the instance's
+        # database, which is a replica for rows read inside replica_reads.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema through replication.
+        if db in replicas():
+            return False
+        return None
+
+
+class _RequestWrites:
+    wrote = False
+
+
+class ReplicaPinMiddleware:
+    """Pin a user to the primary after a request of theirs wrote to it."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self._acall(request)
+        if not replicas():
+            return self.get_response(request)
+        writes = _RequestWrites()
+        token = _request_writes.set(writes)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_writes.reset(token)
+        self._pin(request, writes)
+        return response
+
+    async def _acall(self, request):
+        if not replicas():
+            return await self.get_response(request)
+        writes = _RequestWrites()
+        token = _request_writes.set(writes)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_writes.reset(token)
+        await sync_to_async(self._pin)(request, writes)
+        return response
+
+    def _pin(self, request, writes):
+        if not writes.wrote:
+            return
+        # DRF sets request.user on the underlying HttpRequest once the JWT
+        # is authenticated.
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            pin_to_primary(user.pk)
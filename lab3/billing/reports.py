@@ -0,0 +1,246 @@
+"""Date-bucketed billing report: liters and revenue per provider and oil type.
+
+Live figures come from one ``GROUP BY`` over invoice lines, bucketed with
+``TruncMonth`` / ``TruncWeek`` on ``Invoice.issued_on``. Completed months can
+also be precomputed into ``BillingRollup`` by ``refresh_rollup`` (the
+``refresh_billing_rollup`` command); monthly reports then read those months
+from the rollup and only compute the rest live.
+
+A write to an invoice or its lines marks the invoice's month stale when that
+month is already in the past, and stale months are computed live until the
+next refresh. Changing ``oil_type`` on an already billed barrel is not
+tracked; run ``refresh_billing_rollup --full`` after such corrections.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, Exists, F, OuterRef, Q, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.db.models.signals import pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import BillingRollup, BillingRollupMonth, Invoice, InvoiceLine
+from .signals import billing_changed
+
+PERIODS = {"month": TruncMonth, "week": TruncWeek}
+AMOUNT_FIELD = DecimalField(max_digits=20, decimal_places=2)
+TOTAL_FIELDS = ("invoices", "lines", "liters", "amount")
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def next_month(month: date) -> date:
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _line_totals(lines, period: str):
+    """The single grouped query behind every live report row."""
+    return (
+        lines.annotate(period_start=PERIODS[period]("invoice__issued_on"))
+        .values("invoice__provider_id", "period_start", "barrel__oil_type")
+        # ``amount`` first: once ``liters`` is annotated, F("liters") means the sum.
+        .annotate(amount=Sum(F("liters") * F("unit_price"), output_field=AMOUNT_FIELD))
+        .annotate(
+            invoices=Count("invoice", distinct=True),
+            lines=Count("id"),
+            liters=Sum("liters"),
+        )
+        .order_by()
+    )
+
+
+def _row(provider_id, period_start, oil_type, totals) -> dict:
+    return {
+        "provider": provider_id,
+        "period_start": period_start,
+        "oil_type": oil_type,
+        **{field: totals[field] for field in TOTAL_FIELDS},
+    }
+
+
+def _covered_months(providers, start: date | None, end: date | None):
+    """Fresh rollup months that lie entirely inside ``[start, end]``."""
+    months = BillingRollupMonth.objects.filter(provider__in=providers, stale=False)
+    if start is not None:
+        # A month starting before ``start`` is only partly in the range.
+        first = start if start.day == 1 else next_month(start)
+        months = months.filter(month__gte=first)
+    if end is not None:
+        months = months.filter(month__lt=month_start(end + timedelta(days=1)))
+    return months
+
+
+def billing_report(
+    providers,
+    *,
+    period: str = "month",
+    start: date | None = None,
+    end: date | None = None,
+    use_rollup: bool = True,
+) -> list[dict]:
+    """Rows of ``provider``, ``period_start``, ``oil_type`` and the totals.
+
+    ``providers`` is a Provider queryset that scopes the report. ``start``
+    and ``end`` bound ``Invoice.issued_on`` (inclusive). Rows are ordered by
+    provider, period and oil type.
+    """
+    if period not in PERIODS:
+        raise ValueError(f"period must be one of: {', '.join(PERIODS)}")
+
+    lines = InvoiceLine.objects.filter(invoice__provider__in=providers)
+    if start is not None:
+        lines = lines.filter(invoice__issued_on__gte=start)
+    if end is not None:
+        lines = lines.filter(invoice__issued_on__lte=end)
+
+    rows = []
+    if period == "month" and use_rollup:
+        covered = _covered_months(providers, start, end)
+        rolled = BillingRollup.objects.filter(period__in=covered).values(
+            "period__provider_id", "period__month", "oil_type", *TOTAL_FIELDS
+        )
+        rows.extend(
+            _row(item["period__provider_id"], item["period__month"], item["oil_type"], item)
+            for item in rolled
+        )
+        lines = (
+            lines.alias(issued_month=TruncMonth("invoice__issued_on"))
+            .alias(
+                rolled_up=Exists(
+                    covered.filter(
+                        provider_id=OuterRef("invoice__provider_id"),
+                        month=OuterRef("issued_month"),
+                    )
+                )
+            )
+            .filter(rolled_up=False)
+        )
+
+    rows.extend(
+        _row(item["invoice__provider_id"], item["period_start"], item["barrel__oil_type"], item)
+        for item in _line_totals(lines, period)
+    )
+    rows.sort(key=lambda row: (row["provider"], row["period_start"], row["oil_type"]))
+    return rows
+
+
+def refresh_rollup(provider_ids=None, *, full: bool = False, today: date | None = None) -> int:
+    """Roll up completed months that are missing or stale. Returns months written.
+
+    ``full`` recomputes every completed month. Months are claimed (marked
+    fresh) in the same transaction that recomputes them; a concurrent write
+    to one of them blocks on that row and marks it stale again afterwards.
+    """
+    current_month = month_start(today or timezone.localdate())
+    invoices = Invoice.objects.filter(issued_on__lt=current_month)
+    months = BillingRollupMonth.objects.all()
+    if provider_ids is not None:
+        invoices = invoices.filter(provider_id__in=provider_ids)
+        months = months.filter(provider_id__in=provider_ids)
+
+    pending = set(
+        invoices.annotate(month=TruncMonth("issued_on"))
+        .values_list("provider_id", "month")
+        .distinct()
+    )
+    # Stale months may have lost all their invoices; they still need rewriting.
+    pending.update(months.filter(stale=True).values_list("provider_id", "month"))
+    if not full:
+        pending.difference_update(months.filter(stale=False).values_list("provider_id", "month"))
+    if not pending:
+        return 0
+
+    months_by_provider = defaultdict(set)
+    for provider_id, month in pending:
+        months_by_provider[provider_id].add(month)
+    for provider_id, provider_months in months_by_provider.items():
+        _refresh_provider_months(provider_id, sorted(provider_months))
+    return len(pending)
+
+
+@transaction.atomic
+def _refresh_provider_months(provider_id: int, months: list[date]) -> None:
+    now = timezone.now()
+    BillingRollupMonth.objects.bulk_create(
+        [
+            BillingRollupMonth(provider_id=provider_id, month=month, stale=False, refreshed_at=now)
+            for month in months
+        ],
+        update_conflicts=True,
+        unique_fields=["provider", "month"],
+        update_fields=["stale", "refreshed_at"],
+    )
+    periods = dict(
+        BillingRollupMonth.objects.select_for_update()
+        .filter(provider_id=provider_id, month__in=months)
+        .values_list("month", "id")
+    )
+    BillingRollup.objects.filter(period_id__in=periods.values()).delete()
+
+    in_months = Q()
+    for month in months:
+        in_months |= Q(invoice__issued_on__gte=month, invoice__issued_on__lt=next_month(month))
+    totals = _line_totals(
+        InvoiceLine.objects.filter(in_months, invoice__provider_id=provider_id), "month"
+    )
+    BillingRollup.objects.bulk_create(
+        BillingRollup(
+            period_id=periods[item["period_start"]],
+            oil_type=item["barrel__oil_type"],
+            **{field: item[field] for field in TOTAL_FIELDS},
+        )
+        for item in totals
+    )
+
+
+def mark_stale(provider_months) -> None:
+    """Flag ``(provider_id, month)`` pairs so reports compute them live."""
+    BillingRollupMonth.objects.bulk_create(
+        [
+            BillingRollupMonth(provider_id=provider_id, month=month, stale=True)
+            for provider_id, month in set(provider_months)
+        ],
+        update_conflicts=True,
+        unique_fields=["provider", "month"],
+        update_fields=["stale"],
+    )
+
+
+@receiver(billing_changed)
+def mark_changed_months_stale(sender, invoice_ids, on_commit=False, **kwargs):
+    # Only the in-transaction send, so the flag commits with the write.
+    if not invoice_ids or on_commit:
+        return
+    current_month = month_start(timezone.localdate())
+    changed = list(
+        Invoice.objects.filter(id__in=invoice_ids, issued_on__lt=current_month)
+        .annotate(month=TruncMonth("issued_on"))
+        .values_list("provider_id", "month")
+    )
+    if changed:
+        mark_stale(changed)
+
+
+@receiver(pre_save, sender=Invoice)
+def mark_previous_month_stale(sender, instance, raw=False, **kwargs):
+    # billing_changed only reports where an invoice is now; a changed
+    # issue date or provider also changes the month it moved out of.
+    if raw or instance.pk is None:
+        return
+    previous = Invoice.objects.filter(pk=instance.pk).values("provider_id", "issued_on").first()
+    if previous is None:
+        return
+    if (previous["provider_id"], month_start(previous["issued_on"])) == (
+        instance.provider_id,
+        month_start(instance.issued_on),
+    ):
+        return
+    if previous["issued_on"] < month_start(timezone.localdate()):
+        mark_stale([(previous["provider_id"], month_start(previous["issued_on"]))])
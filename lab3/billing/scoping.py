@@ -0,0 +1,121 @@
+"""Provider (tenant) scoping.
+
+API reads are limited to the requester's provider. Superusers see every row,
+users linked to a provider see that provider's rows, and other users see
+nothing. ``ProviderScopedQuerySet.for_user`` is the one place that rule
+lives. Each model names the field that holds its provider
+(``provider_scope_field``). The rule is a plain ``filter``, so it composes
+with a view's ``select_related``, ``prefetch_related`` and annotations. It
+is served by the indexes that lead with ``provider``.
+
+PostgreSQL can enforce the same rule with row-level security. Migration
+0011 adds policies to the provider, barrel, invoice and invoice line tables.
+``manage.py row_level_security enable`` switches them on. With
+``POSTGRES_ROW_LEVEL_SECURITY`` set, ``row_level_security(user)`` stores the
+requester's provider in the ``app.provider_id`` session variable of each
+connection the request uses, and clears it afterwards. This is a second
+line of defence for the DRF viewsets, not a guarantee. The policies let
+every row through while the variable is empty, as for superusers, commands
+and job workers, and so for any connection the scope was not applied to.
+The ``/api/async/`` views do not set it, and a streamed export reads its
+rows after the request's scope has ended.
+"""
+
+from __future__ import annotations
+
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import DatabaseError, connections, models
+
+# Tables with policies from migration 0011.
+ROW_LEVEL_SECURITY_TABLES = (
+    "billing_provider",
+    "billing_barrel",
+    "billing_invoice",
+    "billing_invoiceline",
+)
+SET_PROVIDER_SQL = "SELECT set_config('app.provider_id', %s, false)"
+# No provider has this id: anonymous users and users without a provider see
+# no rows.
+NO_PROVIDER = "0"
+
+
+class ProviderScopedQuerySet(models.QuerySet):
+    def for_provider(self, provider_id):
+        return self.filter(**{self.model.provider_scope_field: provider_id})
+
+    def for_user(self, user):
+        """The rows ``user`` may see through the API."""
+        if user.is_superuser:
+            return self.all()
+        if user.provider_id is None:
+            return self.without_provider(user)
+        return self.for_provider(user.provider_id)
+
+    def without_provider(self, user):
+        """The rows a user linked to no provider may see: none by default."""
+        return self.none()
+
+
+def provider_setting(user) -> str:
+    """Value of ``app.provider_id`` for ``user``; empty lets every row through."""
+    if not user.is_authenticated:
+        return NO_PROVIDER
+    if user.is_superuser:
+        return ""
+    if user.provider_id is None:
+        return NO_PROVIDER
+    return str(user.provider_id)
+
+
+class _ProviderVariable:
+    """``execute_wrapper`` that sets ``app.provider_id`` before a connection's first query.
+
+    A ``set_config`` made inside a transaction is undone if the transaction
+    rolls back. So inside ``transaction.atomic`` the variable is set again
+    before every query, until one runs outside a transaction.
+    """
+
+    def __init__(self, value: str):
+        self.value = value
+        self.touched = {}
+        self.committed = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        connection = context["connection"]
+        if connection.alias not in self.committed:
+            execute(SET_PROVIDER_SQL, [self.value], False, context)
+            self.touched[connection.alias] = connection
+            if not connection.in_atomic_block:
+                self.committed.add(connection.alias)
+        return execute(sql, params, many, context)
+
+    def clear(self) -> None:
+        for connection in self.touched.values():
+            if connection.connection is None:
+                continue
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(SET_PROVIDER_SQL, [""])
+            except DatabaseError:
+                # Never hand the next request a connection still scoped to
+                # this provider.
+                connection.close()
+
+
+@contextmanager
+def row_level_security(user):
+    """Run the block's PostgreSQL queries under ``user``'s row-level security scope."""
+    if not settings.POSTGRES_ROW_LEVEL_SECURITY:
+        yield
+        return
+    variable = _ProviderVariable(provider_setting(user))
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                if connection.vendor == "postgresql":
+                    stack.enter_context(connection.execute_wrapper(variable))
+            yield
+    finally:
+        variable.clear()
@@ -0,0 +1,64 @@
+"""``billing_changed``: one signal for "provider/invoice data was written".
+
+Row-level writes are picked up from ``post_save``/``post_delete``; bulk paths
+that bypass model signals (``bulk_create``, ``QuerySet.update``) call
+``notify_billing_changed`` themselves. Consumers such as the response cache
+subscribe to ``billing_changed`` instead of to every model signal.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+# Sent with ``provider_ids`` and ``invoice_ids`` (frozensets) and
+# ``on_commit``: False for the send made right at the write, True for the
+# repeat sent once the surrounding transaction commits.
+billing_changed = Signal()
+
+
+def notify_billing_changed(provider_ids=(), invoice_ids=()) -> None:
+    provider_ids = frozenset(provider_ids)
+    invoice_ids = frozenset(invoice_ids)
+
+    def send(on_commit):
+        billing_changed.send(
+            sender=None,
+            provider_ids=provider_ids,
+            invoice_ids=invoice_ids,
+            on_commit=on_commit,
+        )
+
+    send(on_commit=False)
+    # Send again after commit: a concurrent read may have cached the
+    # pre-commit rows between the write and the commit.
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: send(on_commit=True))
+
+
+@receiver([post_save, post_delete], sender="billing.Provider")
+def provider_changed(sender, instance, **kwargs):
+    notify_billing_changed(provider_ids=[instance.pk])
+
+
+@receiver([post_save, post_delete], sender="billing.Barrel")
+def barrel_changed(sender, instance, **kwargs):
+    notify_billing_changed(provider_ids=[instance.provider_id])
+
+
+@receiver([post_save, post_delete], sender="billing.Invoice")
+def invoice_changed(sender, instance, **kwargs):
+    notify_billing_changed(provider_ids=[instance.provider_id], invoice_ids=[instance.pk])
+
+
+@receiver([post_save, post_delete], sender="billing.InvoiceLine")
+def invoice_line_changed(sender, instance, **kwargs):
+    invoice_field = sender._meta.get_field("invoice")
+    if invoice_field.is_cached(instance):
+        provider_ids = [instance.invoice.provider_id]
+    else:
+        provider_ids = list(
+            invoice_field.related_model.objects.filter(pk=instance.invoice_id).values_list(
+                "provider_id", flat=True
+            )
+        )
+    notify_billing_changed(provider_ids=provider_ids, invoice_ids=[instance.invoice_id])
@@ -0,0 +1,112 @@
+from datetime import date
+from decimal import Decimal
+from urllib.parse import urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from billing.models import Barrel, Invoice, Provider
+
+User = get_user_model()
+
+
+class AsyncViewTests(TestCase):
+    """The async read views must answer exactly like the DRF list/detail actions."""
+
+    def setUp(self):
+        caches["responses"].clear()
+        self.provider = Provider.objects.create(
+            name="Acme Oils", address="Main St 1", tax_id="TAX-12345"
+        )
+        self.other = Provider.objects.create(
+            name="Other Oils", address="Side St 2", tax_id="TAX-67890"
+        )
+        self.user = User.objects.create_user(
+            username="regular_user", password="strongpass123", provider=self.provider
+        )
+        for index in range(3):
+            invoice = Invoice.objects.create(
+                provider=self.provider, invoice_no=f"INV-{index}", issued_on=date(2024, 5, index + 1)
+            )
+            barrel = Barrel.objects.create(
+                provider=self.provider, number=f"BAR-{index}", oil_type="Olive", liters=10
+            )
+            invoice.add_line_for_barrel(
+                barrel=barrel,
+                liters=10,
+                unit_price_per_liter=Decimal("1.50"),
+                description="Line",
+            )
+        self.foreign_invoice = Invoice.objects.create(
+            provider=self.other, invoice_no="INV-OTHER", issued_on=date(2024, 5, 1)
+        )
+        self.headers = {"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+
+    async def assert_same_as_drf(self, name, args=(), params=None):
+        sync_response = await self.async_client.get(
+            reverse(name, args=args), params or {}, headers=self.headers
+        )
+        async_response = await self.async_client.get(
+            reverse(f"async-{name}", args=args), params or {}, headers=self.headers
+        )
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        expected, actual = sync_response.json(), async_response.json()
+        if isinstance(expected, dict) and "results" in expected:
+            for link in ("next", "previous"):
+                # Same cursor, different route.
+                self.assertEqual(
+                    actual[link] and urlsplit(actual[link]).query,
+                    expected[link] and urlsplit(expected[link]).query,
+                )
+                expected.pop(link), actual.pop(link)
+        self.assertEqual(actual, expected)
+        return async_response
+
+    async def test_lists_match_the_viewsets(self):
+        await self.assert_same_as_drf("invoice-list")
+        await self.assert_same_as_drf("invoice-list", params={"page_size": 2})
+        await self.assert_same_as_drf("invoice-list", params={"ordering": "total_amount"})
+        await self.assert_same_as_drf("invoice-list", params={"invoice_no": "INV-1"})
+        await self.assert_same_as_drf("provider-list")
+        await self.assert_same_as_drf("barrel-list")
+
+    async def test_details_match_the_viewsets(self):
+        invoice = await Invoice.objects.filter(provider=self.provider).afirst()
+        barrel = await Barrel.objects.afirst()
+        await self.assert_same_as_drf("invoice-detail", args=[invoice.pk])
+        await self.assert_same_as_drf("provider-detail", args=[self.provider.pk])
+        await self.assert_same_as_drf("barrel-detail", args=[barrel.pk])
+
+    async def test_cursor_links_page_through_the_async_route(self):
+        url = reverse("async-invoice-list") + "?page_size=2"
+        seen = []
+        while url:
+            response = await self.async_client.get(url, headers=self.headers)
+            seen.extend(item["invoice_no"] for item in response.json()["results"])
+            url = response.json()["next"]
+        self.assertEqual(seen, ["INV-2", "INV-1", "INV-0"])
+
+    async def test_other_providers_and_bad_input_are_rejected_like_drf(self):
+        await self.assert_same_as_drf("invoice-detail", args=[self.foreign_invoice.pk])
+        await self.assert_same_as_drf("invoice-list", params={"cursor": "bogus"})
+        await self.assert_same_as_drf("invoice-list", params={"issued_on_after": "not-a-date"})
+
+    async def test_requires_a_valid_token(self):
+        response = await self.async_client.get(reverse("async-invoice-list"))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response["WWW-Authenticate"], 'Bearer realm="api"')
+
+        response = await self.async_client.get(
+            reverse("async-invoice-list"), headers={"Authorization": "Bearer nope"}
+        )
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()["code"], "token_not_valid")
+
+    async def test_writes_are_not_served(self):
+        response = await self.async_client.post(
+            reverse("async-invoice-list"), {}, headers=self.headers
+        )
+        self.assertEqual(response.status_code, 405)
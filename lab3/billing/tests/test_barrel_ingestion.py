@@ -0,0 +1,127 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from billing import ingestion
+from billing.models import Barrel, Provider, ProviderLitersSummary
+
+User = get_user_model()
+
+
+class BarrelIngestionTests(APITestCase):
+    def setUp(self):
+        self.provider = Provider.objects.create(
+            name="Acme Oils", address="Main St 1", tax_id="TAX-12345"
+        )
+        self.user = User.objects.create_user(
+            username="regular_user", password="strongpass123", provider=self.provider
+        )
+        self.url = reverse("barrel-bulk")
+        Barrel.objects.create(
+            provider=self.provider, number="BAR-001", oil_type="Olive", liters=100
+        )
+        Barrel.objects.create(
+            provider=self.provider, number="BAR-002", oil_type="Olive", liters=100, billed=True
+        )
+
+    def post(self, body, content_type, **params):
+        self.client.force_authenticate(user=self.user)
+        url = self.url
+        if params:
+            url += "?" + "&".join(f"{key}={value}" for key, value in params.items())
+        return self.client.generic("POST", url, body, content_type=content_type)
+
+    def test_csv_upload_creates_new_barrels_and_reports_rejections(self):
+        body = (
+            "number,oil_type,liters,billed\n"
+            "BAR-001,Sunflower,50,\n"
+            "BAR-100,Olive,20,\n"
+            "BAR-101,Olive,-5,\n"
+            "BAR-102,,30,no\n"
+            "BAR-100,Olive,25,\n"
+            "BAR-103,Sunflower,40,yes\n"
+        )
+
+        response = self.post(body, "text/csv")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual(response.data["skipped"], 1)
+        self.assertEqual(response.data["rejected_count"], 3)
+        self.assertEqual([item["row"] for item in response.data["rejected"]], [3, 4, 5])
+        self.assertIn("liters", response.data["rejected"][0]["errors"])
+        self.assertEqual(Barrel.objects.get(number="BAR-001").oil_type, "Olive")
+        self.assertTrue(Barrel.objects.get(number="BAR-103").billed)
+        self.assertEqual(ProviderLitersSummary.find_inconsistencies(), [])
+
+    def test_ndjson_upload_updates_unbilled_barrels_on_conflict(self):
+        body = "\n".join(
+            [
+                json.dumps({"number": "BAR-001", "oil_type": "Sunflower", "liters": 80}),
+                json.dumps({"number": "BAR-002", "oil_type": "Sunflower", "liters": 80}),
+                "not json",
+                json.dumps({"number": "BAR-200", "oil_type": "Olive", "liters": 10}),
+            ]
+        )
+
+        response = self.post(body, "application/x-ndjson", on_conflict="update")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data["created"], response.data["updated"]), (1, 1))
+        self.assertEqual([item["row"] for item in response.data["rejected"]], [2, 3])
+        barrel = Barrel.objects.get(number="BAR-001")
+        self.assertEqual((barrel.oil_type, barrel.liters), ("Sunflower", 80))
+        self.assertEqual(Barrel.objects.get(number="BAR-002").liters, 100)
+        self.assertEqual(ProviderLitersSummary.find_inconsistencies(), [])
+
+    def test_barrels_inserted_concurrently_are_not_counted_twice(self):
+        lock_existing = ingestion._lock_existing
+        calls = []
+
+        def racing_lock_existing(provider_id, numbers):
+            existing = lock_existing(provider_id, numbers)
+            if not calls:
+                # Committed by another writer between the SELECT and the insert.
+                Barrel.objects.create(
+                    provider=self.provider, number="BAR-300", oil_type="Olive", liters=7
+                )
+            calls.append(numbers)
+            return existing
+
+        body = "number,oil_type,liters\nBAR-300,Olive,30\nBAR-301,Olive,31\n"
+        with mock.patch.object(ingestion, "_lock_existing", racing_lock_existing):
+            response = self.post(body, "text/csv")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data["created"], response.data["skipped"]), (1, 1))
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(Barrel.objects.get(number="BAR-300").liters, 7)
+        self.assertEqual(ProviderLitersSummary.find_inconsistencies(), [])
+
+    def test_unsupported_content_type_is_rejected(self):
+        response = self.post("{}", "application/xml")
+
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+    def test_load_barrels_command_streams_file_in_chunks(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "barrels.csv"
+            rows = [f"BAR-C{index},Olive,{index + 1}" for index in range(25)]
+            path.write_text("number,oil_type,liters\n" + "\n".join(rows) + "\n")
+
+            out = StringIO()
+            call_command(
+                "load_barrels", str(path), provider=self.provider.id, chunk_size=10, stdout=out
+            )
+
+        self.assertIn("Created 25", out.getvalue())
+        self.assertEqual(Barrel.objects.filter(number__startswith="BAR-C").count(), 25)
+        self.assertEqual(ProviderLitersSummary.find_inconsistencies(), [])
@@ -0,0 +1,143 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase
+
+from billing.benchmark import find_regressions, percentile
+from billing.models import Barrel, Invoice, InvoiceLine, Provider, ProviderLitersSummary
+
+User = get_user_model()
+
+
+class SeedVolumeCommandTests(TestCase):
+    def test_seeds_requested_volumes_with_consistent_ledger(self):
+        call_command(
+            "seed_volume",
+            providers=3,
+            barrels=12,
+            invoices=4,
+            lines=2,
+            providers_per_transaction=2,
+            stdout=StringIO(),
+        )
+
+        providers = Provider.objects.filter(tax_id__startswith="load-")
+        self.assertEqual(providers.count(), 3)
+        self.assertEqual(Barrel.objects.filter(provider__in=providers).count(), 36)
+        self.assertEqual(Invoice.objects.filter(provider__in=providers).count(), 12)
+        self.assertEqual(InvoiceLine.objects.filter(invoice__provider__in=providers).count(), 24)
+        self.assertEqual(
+            Barrel.objects.filter(provider__in=providers, billed=True).count(), 24
+        )
+        self.assertFalse(
+            InvoiceLine.objects.exclude(barrel__provider_id=F("invoice__provider_id"))
+            .filter(invoice__provider__in=providers)
+            .exists()
+        )
+        self.assertEqual(ProviderLitersSummary.find_inconsistencies(), [])
+        self.assertTrue(User.objects.get(username="load-0").check_password("load1234"))
+
+    def test_refuses_to_seed_the_same_tag_twice_without_reset(self):
+        options = {"providers": 1, "barrels": 2, "invoices": 1, "lines": 1, "stdout": StringIO()}
+        call_command("seed_volume", **options)
+        with self.assertRaises(CommandError):
+            call_command("seed_volume", **options)
+
+        call_command("seed_volume", reset=True, **options)
+        self.assertEqual(Provider.objects.filter(tax_id__startswith="load-").count(), 1)
+
+    def test_rejects_more_lines_than_barrels(self):
+        with self.assertRaises(CommandError):
+            call_command("seed_volume", barrels=3, invoices=2, lines=2, stdout=StringIO())
+
+
+class BenchmarkCommandTests(TestCase):
+    def setUp(self):
+        call_command(
+            "seed_volume", providers=2, barrels=20, invoices=3, lines=2, stdout=StringIO()
+        )
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.baseline = Path(directory.name) / "baseline.json"
+
+    def benchmark(self, **options):
+        call_command(
+            "benchmark_api",
+            user="load-0",
+            requests=3,
+            warmup=1,
+            baseline=str(self.baseline),
+            stdout=StringIO(),
+            **options,
+        )
+
+    def test_writes_baseline_and_leaves_data_unchanged(self):
+        self.benchmark(write_baseline=True)
+
+        data = json.loads(self.baseline.read_text())
+        self.assertEqual(set(data["scenarios"]["invoice-list"]), {
+            "requests", "p50_ms", "p95_ms", "p99_ms", "max_queries", "avg_queries",
+        })
+        self.assertEqual(data["scenarios"]["invoice-add-line"]["requests"], 3)
+        # The add-line scenario is rolled back.
+        self.assertEqual(Barrel.objects.filter(billed=True).count(), 12)
+        self.assertFalse(Invoice.objects.filter(invoice_no__startswith="BENCH-").exists())
+
+    def test_fails_when_queries_regress(self):
+        self.benchmark(write_baseline=True, scenario=["invoice-list"])
+        data = json.loads(self.baseline.read_text())
+        data["scenarios"]["invoice-list"]["max_queries"] -= 1
+        self.baseline.write_text(json.dumps(data))
+
+        with self.assertRaises(CommandError):
+            self.benchmark(scenario=["invoice-list"])
+
+
+class ThroughputCommandTests(TransactionTestCase):
+    # Concurrent clients use their own connections, so the seeded rows must
+    # be committed rather than held in a test transaction.
+
+    def test_runs_both_stacks_with_concurrent_clients(self):
+        call_command("seed_volume", providers=1, barrels=4, invoices=2, lines=1, stdout=StringIO())
+        out = StringIO()
+        call_command(
+            "benchmark_throughput",
+            user="load-0",
+            clients=2,
+            requests=4,
+            scenario=["invoice-list", "provider-detail"],
+            stdout=out,
+        )
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(
+            [line.split()[:2] for line in lines],
+            [
+                ["invoice-list", "wsgi"],
+                ["invoice-list", "asgi"],
+                ["provider-detail", "wsgi"],
+                ["provider-detail", "asgi"],
+            ],
+        )
+        self.assertTrue(all("clients=2" in line for line in lines))
+
+
+class RegressionCheckTests(TestCase):
+    def scenario(self, p95_ms, max_queries=2):
+        return {"scenarios": {"invoice-list": {"p95_ms": p95_ms, "max_queries": max_queries}}}
+
+    def test_latency_growth_beyond_threshold_and_floor_is_reported(self):
+        self.assertEqual(find_regressions(self.scenario(12.0), self.scenario(10.0)), [])
+        self.assertEqual(find_regressions(self.scenario(1.5), self.scenario(0.5)), [])
+        self.assertEqual(len(find_regressions(self.scenario(13.0), self.scenario(10.0))), 1)
+
+    def test_percentile_uses_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile([7.0], 99), 7.0)
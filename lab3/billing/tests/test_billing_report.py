@@ -0,0 +1,191 @@
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from billing.models import Barrel, BillingRollup, BillingRollupMonth, Invoice, Provider
+from billing.reports import billing_report, refresh_rollup
+
+User = get_user_model()
+
+
+class BillingReportTests(APITestCase):
+    def setUp(self):
+        caches["responses"].clear()
+        self.provider = Provider.objects.create(
+            name="Acme Oils", address="Main St 1", tax_id="TAX-12345"
+        )
+        self.other = Provider.objects.create(
+            name="Other Oils", address="Side St 2", tax_id="TAX-67890"
+        )
+        self.user = User.objects.create_user(
+            username="regular_user", password="strongpass123", provider=self.provider
+        )
+        self.superuser = User.objects.create_superuser(
+            username="admin", password="adminpass123", email="admin@example.com"
+        )
+
+        self.invoice_jan = self.make_invoice(
+            self.provider, "INV-1", date(2024, 1, 3), [("Olive", 100, "1.25"), ("Corn", 40, "2.10")]
+        )
+        self.make_invoice(self.provider, "INV-2", date(2024, 1, 29), [("Olive", 10, "3.00")])
+        self.make_invoice(self.provider, "INV-3", date(2024, 2, 14), [("Olive", 20, "1.00")])
+        self.make_invoice(self.other, "INV-4", date(2024, 1, 10), [("Olive", 5, "2.00")])
+
+    def make_invoice(self, provider, invoice_no, issued_on, lines):
+        invoice = Invoice.objects.create(
+            provider=provider, invoice_no=invoice_no, issued_on=issued_on
+        )
+        for index, (oil_type, liters, unit_price) in enumerate(lines):
+            barrel = Barrel.objects.create(
+                provider=provider, number=f"{invoice_no}-{index}", oil_type=oil_type, liters=liters
+            )
+            invoice.add_line_for_barrel(
+                barrel=barrel,
+                liters=liters,
+                unit_price_per_liter=Decimal(unit_price),
+                description="Line",
+            )
+        return invoice
+
+    def summary(self, rows, provider):
+        return [
+            (row["period_start"], row["oil_type"], row["invoices"], row["liters"], row["amount"])
+            for row in rows
+            if row["provider"] == provider.pk
+        ]
+
+    def test_monthly_report_groups_by_month_and_oil_type(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse("billing-report"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            self.summary(response.data, self.provider),
+            [
+                ("2024-01-01", "Corn", 1, 40, "84.00"),
+                ("2024-01-01", "Olive", 2, 110, "155.00"),
+                ("2024-02-01", "Olive", 1, 20, "20.00"),
+            ],
+        )
+
+    def test_weekly_report_buckets_by_iso_week(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse("billing-report"), {"period": "week"})
+
+        self.assertEqual(
+            [(row["period_start"], row["oil_type"]) for row in response.data],
+            [
+                ("2024-01-01", "Corn"),
+                ("2024-01-01", "Olive"),
+                ("2024-01-29", "Olive"),
+                ("2024-02-12", "Olive"),
+            ],
+        )
+
+    def test_report_is_scoped_like_the_provider_endpoint(self):
+        self.client.force_authenticate(user=self.user)
+        own = self.client.get(reverse("billing-report"))
+        foreign = self.client.get(reverse("billing-report"), {"provider": self.other.pk})
+        self.assertEqual({row["provider"] for row in own.data}, {self.provider.pk})
+        self.assertEqual(foreign.data, [])
+
+        self.client.force_authenticate(user=self.superuser)
+        everything = self.client.get(reverse("billing-report"))
+        filtered = self.client.get(reverse("billing-report"), {"provider": self.other.pk})
+        self.assertEqual(
+            {row["provider"] for row in everything.data}, {self.provider.pk, self.other.pk}
+        )
+        self.assertEqual({row["provider"] for row in filtered.data}, {self.other.pk})
+
+    def test_invalid_parameters_are_rejected(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(
+            reverse("billing-report"),
+            {"issued_on_after": "2024-02-01", "issued_on_before": "2024-01-01"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(reverse("billing-report"), {"period": "day"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rollup_matches_the_live_report(self):
+        providers = Provider.objects.all()
+        live = billing_report(providers, use_rollup=False)
+
+        self.assertEqual(refresh_rollup(), 3)
+        self.assertEqual(BillingRollup.objects.count(), 4)
+        self.assertEqual(billing_report(providers), live)
+        # Nothing left to do until something changes.
+        self.assertEqual(refresh_rollup(), 0)
+
+    def test_partial_months_in_the_range_are_computed_live(self):
+        refresh_rollup()
+        # Corrupt the rollup so reads from it are detectable.
+        BillingRollup.objects.update(liters=0)
+
+        rows = billing_report(
+            Provider.objects.filter(pk=self.provider.pk),
+            start=date(2024, 1, 15),
+            end=date(2024, 2, 29),
+        )
+        self.assertEqual(
+            [(row["period_start"], row["liters"]) for row in rows],
+            [(date(2024, 1, 1), 10), (date(2024, 2, 1), 0)],
+        )
+
+    def test_writes_mark_past_months_stale(self):
+        refresh_rollup()
+        barrel = Barrel.objects.create(
+            provider=self.provider, number="LATE", oil_type="Olive", liters=7
+        )
+        self.invoice_jan.add_line_for_barrel(
+            barrel=barrel, liters=7, unit_price_per_liter=Decimal("1.00"), description="Late"
+        )
+
+        january = BillingRollupMonth.objects.get(provider=self.provider, month=date(2024, 1, 1))
+        self.assertTrue(january.stale)
+        olive = [
+            row
+            for row in billing_report(Provider.objects.filter(pk=self.provider.pk))
+            if row["oil_type"] == "Olive" and row["period_start"] == date(2024, 1, 1)
+        ]
+        self.assertEqual(olive[0]["liters"], 117)
+
+        self.assertEqual(refresh_rollup(), 1)
+        self.assertEqual(
+            billing_report(Provider.objects.all()),
+            billing_report(Provider.objects.all(), use_rollup=False),
+        )
+
+    def test_moving_an_invoice_marks_both_months_stale(self):
+        refresh_rollup()
+        self.invoice_jan.issued_on = date(2024, 2, 2)
+        self.invoice_jan.save()
+
+        self.assertEqual(
+            set(
+                BillingRollupMonth.objects.filter(provider=self.provider, stale=True).values_list(
+                    "month", flat=True
+                )
+            ),
+            {date(2024, 1, 1), date(2024, 2, 1)},
+        )
+        self.assertEqual(
+            billing_report(Provider.objects.all()),
+            billing_report(Provider.objects.all(), use_rollup=False),
+        )
+
+    def test_refresh_command_limits_to_provider(self):
+        call_command("refresh_billing_rollup", "--provider", str(self.other.pk), stdout=StringIO())
+
+        self.assertEqual(
+            list(BillingRollupMonth.objects.filter(stale=False).values_list("provider_id", "month")),
+            [(self.other.pk, date(2024, 1, 1))],
+        )
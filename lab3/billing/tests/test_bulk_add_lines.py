@@ -0,0 +1,106 @@
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from billing.models import Barrel, Invoice, InvoiceLine, Provider, ProviderLitersSummary
+
+User = get_user_model()
+
+
+class BulkAddLinesTests(APITestCase):
+    def setUp(self):
+        self.provider_a = Provider.objects.create(
+            name="Acme Oils", address="Main St 1", tax_id="TAX-12345"
+        )
+        self.provider_b = Provider.objects.create(
+            name="Industrias Don Pepe", address="Sesame St 1", tax_id="TAX-78787"
+        )
+        self.invoice = Invoice.objects.create(
+            provider=self.provider_a, invoice_no="INV-001", issued_on=date(2024, 10, 10)
+        )
+        self.user_a = User.objects.create_user(
+            username="regular_user", password="strongpass123", provider=self.provider_a
+        )
+        self.client.force_authenticate(user=self.user_a)
+        self.url = reverse("invoice-add-lines", args=[self.invoice.pk])
+
+    def create_barrels(self, count, provider=None, prefix="BAR"):
+        return [
+            Barrel.objects.create(
+                provider=provider or self.provider_a,
+                number=f"{prefix}-{index}",
+                oil_type="Olive",
+                liters=10 + index,
+            )
+            for index in range(count)
+        ]
+
+    def payload(self, barrels):
+        return {
+            "lines": [
+                {
+                    "barrel": barrel.id,
+                    "liters": barrel.liters,
+                    "unit_price": "2.50",
+                    "description": f"Barrel {barrel.number}",
+                }
+                for barrel in barrels
+            ]
+        }
+
+    def test_bulk_add_lines_bills_every_barrel(self):
+        barrels = self.create_barrels(3)
+
+        response = self.client.post(self.url, self.payload(barrels), format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([line["barrel_id"] for line in response.data], [b.id for b in barrels])
+        self.assertEqual(InvoiceLine.objects.filter(invoice=self.invoice).count(), 3)
+        self.assertFalse(Barrel.objects.filter(provider=self.provider_a, billed=False).exists())
+        self.assertEqual(ProviderLitersSummary.find_inconsistencies(), [])
+
+    def test_bulk_add_lines_query_count_is_constant(self):
+        small_batch = self.create_barrels(2, prefix="SMALL")
+        large_batch = self.create_barrels(20, prefix="LARGE")
+
+        with CaptureQueriesContext(connection) as small:
+            response = self.client.post(self.url, self.payload(small_batch), format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.post(self.url, self.payload(large_batch), format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_bulk_add_lines_reports_per_item_errors_and_writes_nothing(self):
+        good, wrong_liters = self.create_barrels(2)
+        (foreign,) = self.create_barrels(1, provider=self.provider_b)
+        payload = self.payload([good, wrong_liters, foreign, good])
+        payload["lines"][1]["liters"] = 1
+
+        response = self.client.post(self.url, payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = response.data["lines"]
+        self.assertEqual(errors[0], {})
+        self.assertIn("liters must equal barrel.liters", errors[1]["detail"])
+        self.assertIn("barrel provider must match invoice provider", errors[2]["detail"])
+        self.assertIn("more than once", errors[3]["detail"])
+        self.assertEqual(InvoiceLine.objects.count(), 0)
+        self.assertFalse(Barrel.objects.filter(billed=True).exists())
+
+    def test_bulk_add_lines_rejects_already_billed_barrel(self):
+        barrels = self.create_barrels(1)
+        self.client.post(self.url, self.payload(barrels), format="json")
+
+        response = self.client.post(self.url, self.payload(barrels), format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("already billed", response.data["lines"][0]["detail"])
+        self.assertEqual(InvoiceLine.objects.count(), 1)
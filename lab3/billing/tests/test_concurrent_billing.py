@@ -0,0 +1,170 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from billing.api.idempotency import purge_expired
+from billing.models import Barrel, IdempotentResponse, Invoice, InvoiceLine, Provider
+
+User = get_user_model()
+
+
+class ConcurrentBillingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.provider = Provider.objects.create(
+            name="Acme Oils", address="Main St 1", tax_id="TAX-12345"
+        )
+        self.invoice = Invoice.objects.create(
+            provider=self.provider, invoice_no="INV-001", issued_on=date(2024, 10, 10)
+        )
+        self.barrel = Barrel.objects.create(
+            provider=self.provider, number="BAR-001", oil_type="Olive", liters=50
+        )
+        self.user = User.objects.create_user(
+            username="regular_user", password="strongpass123", provider=self.provider
+        )
+        self.url = reverse("invoice-add-line", args=[self.invoice.pk])
+        self.payload = {
+            "barrel": self.barrel.id,
+            "liters": 50,
+            "unit_price": "2.00",
+            "description": "Olive barrel",
+        }
+
+    def test_stale_barrel_instance_cannot_be_billed_twice(self):
+        stale_copy = Barrel.objects.get(pk=self.barrel.pk)
+        self.invoice.add_line_for_barrel(
+            barrel=self.barrel,
+            liters=50,
+            unit_price_per_liter=Decimal("2.00"),
+            description="First",
+        )
+
+        self.assertFalse(stale_copy.billed)
+        with self.assertRaisesMessage(ValueError, "barrel is already billed"):
+            self.invoice.add_line_for_barrel(
+                barrel=stale_copy,
+                liters=50,
+                unit_price_per_liter=Decimal("2.00"),
+                description="Second",
+            )
+        self.assertEqual(InvoiceLine.objects.filter(barrel=self.barrel).count(), 1)
+
+    def test_database_allows_one_line_per_barrel(self):
+        InvoiceLine.objects.create(
+            invoice=self.invoice,
+            barrel=self.barrel,
+            liters=50,
+            unit_price=Decimal("2.00"),
+            description="First",
+        )
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            InvoiceLine.objects.create(
+                invoice=self.invoice,
+                barrel=self.barrel,
+                liters=50,
+                unit_price=Decimal("2.00"),
+                description="Second",
+            )
+
+    def test_retry_with_idempotency_key_replays_original_response(self):
+        self.client.force_authenticate(user=self.user)
+
+        first = self.client.post(
+            self.url, self.payload, format="json", HTTP_IDEMPOTENCY_KEY="retry-1"
+        )
+        retry = self.client.post(
+            self.url, self.payload, format="json", HTTP_IDEMPOTENCY_KEY="retry-1"
+        )
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(InvoiceLine.objects.count(), 1)
+
+    def test_idempotency_keys_are_shared_between_workers(self):
+        self.client.force_authenticate(user=self.user)
+        first = self.client.post(
+            self.url, self.payload, format="json", HTTP_IDEMPOTENCY_KEY="retry-1"
+        )
+        # Another worker: nothing in this process's caches.
+        cache.clear()
+        caches["responses"].clear()
+
+        retry = self.client.post(
+            self.url, self.payload, format="json", HTTP_IDEMPOTENCY_KEY="retry-1"
+        )
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+
+        stored = IdempotentResponse.objects.get()
+        stored.status = None
+        stored.save()
+        response = self.client.post(
+            self.url, self.payload, format="json", HTTP_IDEMPOTENCY_KEY="retry-1"
+        )
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        with mock.patch(
+            "billing.api.idempotency.timezone.now",
+            return_value=timezone.now() + timedelta(days=2),
+        ):
+            self.assertEqual(purge_expired(), 1)
+
+    def test_retry_during_a_slow_first_call_does_not_bill_twice(self):
+        self.client.force_authenticate(user=self.user)
+        add_line = Invoice.add_line_for_barrel
+        retries = []
+
+        def slow_add_line(*args, **kwargs):
+            retries.append(None)
+            if len(retries) == 1:
+                # The client retries while the first call is still billing.
+                later = timezone.now() + timedelta(minutes=10)
+                with mock.patch("billing.api.idempotency.timezone.now", return_value=later):
+                    retries[0] = self.client.post(
+                        self.url, self.payload, format="json", HTTP_IDEMPOTENCY_KEY="slow-1"
+                    )
+            return add_line(*args, **kwargs)
+
+        with mock.patch.object(
+            Invoice, "add_line_for_barrel", autospec=True, side_effect=slow_add_line
+        ):
+            first = self.client.post(
+                self.url, self.payload, format="json", HTTP_IDEMPOTENCY_KEY="slow-1"
+            )
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retries[0].status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(len(retries), 1)
+        self.assertEqual(InvoiceLine.objects.count(), 1)
+
+    def test_retry_without_idempotency_key_is_rejected(self):
+        self.client.force_authenticate(user=self.user)
+
+        self.client.post(self.url, self.payload, format="json")
+        response = self.client.post(self.url, self.payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("already billed", response.data["detail"])
+
+    def test_idempotency_key_reused_with_different_body(self):
+        self.client.force_authenticate(user=self.user)
+        self.client.post(self.url, self.payload, format="json", HTTP_IDEMPOTENCY_KEY="key-1")
+
+        payload = {**self.payload, "description": "Something else"}
+        response = self.client.post(
+            self.url, payload, format="json", HTTP_IDEMPOTENCY_KEY="key-1"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
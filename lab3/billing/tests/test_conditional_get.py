@@ -0,0 +1,141 @@
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db.models import F
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from billing.models import Barrel, Invoice, Provider
+
+User = get_user_model()
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        caches["responses"].clear()
+        self.provider_a = Provider.objects.create(
+            name="Acme Oils", address="Main St 1", tax_id="TAX-12345"
+        )
+        self.provider_b = Provider.objects.create(
+            name="Industrias Don Pepe", address="Sesame St 1", tax_id="TAX-78787"
+        )
+        self.invoice = Invoice.objects.create(
+            provider=self.provider_a, invoice_no="INV-001", issued_on=date(2024, 10, 10)
+        )
+        self.user_a = User.objects.create_user(
+            username="user_a", password="strongpass123", provider=self.provider_a
+        )
+        self.user_b = User.objects.create_user(
+            username="user_b", password="strongpass123", provider=self.provider_b
+        )
+        self.superuser = User.objects.create_superuser(
+            username="admin", password="adminpass123", email="admin@example.com"
+        )
+        self.invoice_list_url = reverse("invoice-list")
+
+    def test_unchanged_list_is_answered_with_304_from_one_query(self):
+        self.client.force_authenticate(user=self.user_a)
+        first = self.client.get(self.invoice_list_url)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertIn("Last-Modified", first)
+
+        # The provider's change state, nothing else.
+        with self.assertNumQueries(1):
+            second = self.client.get(self.invoice_list_url, HTTP_IF_NONE_MATCH=first["ETag"])
+
+        self.assertEqual(second.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(second["ETag"], first["ETag"])
+        self.assertEqual(second.content, b"")
+
+    def test_if_modified_since_is_honoured(self):
+        self.client.force_authenticate(user=self.user_a)
+        first = self.client.get(self.invoice_list_url)
+
+        response = self.client.get(
+            self.invoice_list_url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"]
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_write_to_own_provider_changes_the_etag(self):
+        self.client.force_authenticate(user=self.user_a)
+        etag = self.client.get(self.invoice_list_url)["ETag"]
+
+        Barrel.objects.create(
+            provider=self.provider_a, number="BAR-001", oil_type="Olive", liters=50
+        )
+        response = self.client.get(self.invoice_list_url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_write_to_other_provider_keeps_the_etag(self):
+        self.client.force_authenticate(user=self.user_a)
+        etag = self.client.get(self.invoice_list_url)["ETag"]
+
+        Barrel.objects.create(
+            provider=self.provider_b, number="BAR-001", oil_type="Olive", liters=50
+        )
+        response = self.client.get(self.invoice_list_url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_changes_from_other_processes_change_the_etag(self):
+        self.client.force_authenticate(user=self.user_a)
+        etag = self.client.get(self.invoice_list_url)["ETag"]
+
+        # As committed by a job worker: no signal reaches this process.
+        Provider.objects.filter(pk=self.provider_a.pk).update(
+            change_version=F("change_version") + 1
+        )
+        response = self.client.get(self.invoice_list_url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_provider_save_does_not_reissue_an_old_version(self):
+        self.client.force_authenticate(user=self.user_a)
+        stale = Provider.objects.get(pk=self.provider_a.pk)
+        Barrel.objects.create(
+            provider=self.provider_a, number="BAR-001", oil_type="Olive", liters=50
+        )
+        etag = self.client.get(self.invoice_list_url)["ETag"]
+
+        stale.name = "Acme Oils Ltd"
+        stale.save()
+        response = self.client.get(self.invoice_list_url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_etag_is_scoped_to_the_requester(self):
+        self.client.force_authenticate(user=self.user_a)
+        etag_a = self.client.get(self.invoice_list_url)["ETag"]
+
+        self.client.force_authenticate(user=self.superuser)
+        response = self.client.get(self.invoice_list_url, HTTP_IF_NONE_MATCH=etag_a)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag_a)
+
+    def test_superuser_etag_changes_when_a_provider_is_replaced(self):
+        self.client.force_authenticate(user=self.superuser)
+        url = reverse("provider-list")
+        etag = self.client.get(url)["ETag"]
+
+        self.user_b.delete()
+        self.provider_b.delete()
+        Provider.objects.create(name="Newcomer", address="Elm St 2", tax_id="TAX-99999")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        names = [item["name"] for item in response.data["results"]]
+        self.assertIn("Newcomer", names)
+        self.assertNotIn("Industrias Don Pepe", names)
+
+    def test_not_found_detail_has_no_validators(self):
+        self.client.force_authenticate(user=self.user_b)
+        response = self.client.get(reverse("invoice-detail", args=[self.invoice.pk]))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn("ETag", response)
@@ -0,0 +1,105 @@
+import csv
+import io
+import json
+from datetime import date
+from decimal import Decimal
+from itertools import groupby
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from billing.models import Barrel, Invoice, Provider
+
+User = get_user_model()
+
+
+class InvoiceExportTests(APITestCase):
+    def setUp(self):
+        self.provider_a = Provider.objects.create(
+            name="Acme Oils", address="Main St 1", tax_id="TAX-12345"
+        )
+        self.provider_b = Provider.objects.create(
+            name="Industrias Don Pepe", address="Sesame St 1", tax_id="TAX-78787"
+        )
+        self.invoice_old = Invoice.objects.create(
+            provider=self.provider_a, invoice_no="INV-001", issued_on=date(2024, 1, 10)
+        )
+        self.invoice_new = Invoice.objects.create(
+            provider=self.provider_a, invoice_no="INV-002", issued_on=date(2024, 3, 10)
+        )
+        self.invoice_empty = Invoice.objects.create(
+            provider=self.provider_a, invoice_no="INV-003", issued_on=date(2024, 2, 10)
+        )
+        Invoice.objects.create(
+            provider=self.provider_b, invoice_no="INV-B01", issued_on=date(2024, 2, 10)
+        )
+        for index, invoice in enumerate([self.invoice_old, self.invoice_new, self.invoice_new]):
+            barrel = Barrel.objects.create(
+                provider=self.provider_a, number=f"BAR-{index}", oil_type="Olive", liters=10
+            )
+            invoice.add_line_for_barrel(
+                barrel=barrel,
+                liters=10,
+                unit_price_per_liter=Decimal("2.50"),
+                description=f"Line {index}",
+            )
+        self.user_a = User.objects.create_user(
+            username="regular_user", password="strongpass123", provider=self.provider_a
+        )
+        self.client.force_authenticate(user=self.user_a)
+        self.url = reverse("invoice-export")
+
+    def read(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b"".join(response.streaming_content).decode("utf-8")
+
+    def test_csv_export_has_one_row_per_line(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response["Content-Type"], "text/csv")
+        rows = list(csv.DictReader(io.StringIO(self.read(response))))
+        self.assertEqual(
+            [(row["invoice_no"], row["description"]) for row in rows],
+            [
+                ("INV-002", "Line 1"),
+                ("INV-002", "Line 2"),
+                ("INV-003", ""),
+                ("INV-001", "Line 0"),
+            ],
+        )
+        self.assertEqual(rows[0]["unit_price"], "2.50")
+
+    def test_ndjson_export_matches_serializer_and_honours_filters(self):
+        response = self.client.get(
+            self.url,
+            {"export_format": "ndjson", "issued_on_after": "2024-02-01"},
+        )
+
+        exported = [json.loads(line) for line in self.read(response).splitlines()]
+        detail = self.client.get(reverse("invoice-detail", args=[self.invoice_new.pk]))
+        self.assertEqual([row["invoice_no"] for row in exported], ["INV-002", "INV-003"])
+        self.assertEqual(exported[0], json.loads(json.dumps(detail.data)))
+
+    def test_lines_of_an_invoice_moved_mid_export_do_not_shift_the_rest(self):
+        def racing_groupby(*args, **kwargs):
+            groups = groupby(*args, **kwargs)
+            first = next(groups)  # The line query has run; the invoice query has not.
+            Invoice.objects.filter(pk=self.invoice_new.pk).update(issued_on=date(2023, 1, 1))
+            yield first
+            yield from groups
+
+        with mock.patch("billing.api.exports.groupby", racing_groupby):
+            rows = list(csv.DictReader(io.StringIO(self.read(self.client.get(self.url)))))
+
+        self.assertEqual(
+            [(row["invoice_no"], row["description"]) for row in rows],
+            [("INV-003", ""), ("INV-001", "Line 0"), ("INV-002", "")],
+        )
+
+    def test_unknown_export_format_is_rejected(self):
+        response = self.client.get(self.url, {"export_format": "xml"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
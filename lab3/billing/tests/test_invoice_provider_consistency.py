@@ -0,0 +1,105 @@
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from billing.models import Barrel, Invoice, InvoiceLine, Provider
+
+User = get_user_model()
+
+
+class InvoiceProviderConsistencyTests(APITestCase):
+    def setUp(self):
+        self.provider_a = Provider.objects.create(
+            name="Acme Oils", address="Main St 1", tax_id="TAX-12345"
+        )
+        self.provider_b = Provider.objects.create(
+            name="Industrias Don Pepe", address="Sesame St 1", tax_id="TAX-78787"
+        )
+        self.invoice_a = Invoice.objects.create(
+            provider=self.provider_a, invoice_no="INV-001", issued_on=date(2024, 10, 10)
+        )
+        self.barrel_a = Barrel.objects.create(
+            provider=self.provider_a, number="BAR-A", oil_type="Olive", liters=10
+        )
+        self.barrel_b = Barrel.objects.create(
+            provider=self.provider_b, number="BAR-B", oil_type="Olive", liters=10
+        )
+        self.user_a = User.objects.create_user(
+            username="regular_user", password="strongpass123", provider=self.provider_a
+        )
+
+    def test_database_rejects_line_for_other_provider_barrel(self):
+        if connection.vendor != "postgresql":
+            self.skipTest("Provider consistency trigger is PostgreSQL-only.")
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            InvoiceLine.objects.create(
+                invoice=self.invoice_a,
+                barrel=self.barrel_b,
+                liters=10,
+                unit_price=Decimal("1.00"),
+                description="Cross-provider line",
+            )
+
+        self.invoice_a.add_line_for_barrel(
+            barrel=self.barrel_a,
+            liters=10,
+            unit_price_per_liter=Decimal("1.00"),
+            description="Same-provider line",
+        )
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Invoice.objects.filter(pk=self.invoice_a.pk).update(provider=self.provider_b)
+
+    def test_invoice_list_query_count_does_not_grow_with_lines(self):
+        for index in range(5):
+            barrel = Barrel.objects.create(
+                provider=self.provider_a, number=f"BAR-{index}", oil_type="Olive", liters=10
+            )
+            self.invoice_a.add_line_for_barrel(
+                barrel=barrel,
+                liters=10,
+                unit_price_per_liter=Decimal("1.00"),
+                description=f"Line {index}",
+            )
+        self.client.force_authenticate(user=self.user_a)
+
+        # Invoices, their prefetched lines and the change version for the ETag.
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("invoice-list"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"][0]["lines"]), 5)
+
+    def test_audit_command_reports_violations(self):
+        call_command("audit_invoice_providers", stdout=StringIO())
+
+        if connection.vendor != "postgresql":
+            self.skipTest("Provider consistency trigger is PostgreSQL-only.")
+        with connection.cursor() as cursor:
+            # Flush deferred FK checks so the table can be altered in this transaction.
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+            cursor.execute(
+                "ALTER TABLE billing_invoiceline DISABLE TRIGGER billing_invoiceline_provider_check"
+            )
+            InvoiceLine.objects.create(
+                invoice=self.invoice_a,
+                barrel=self.barrel_b,
+                liters=10,
+                unit_price=Decimal("1.00"),
+                description="Cross-provider line",
+            )
+            cursor.execute(
+                "ALTER TABLE billing_invoiceline ENABLE TRIGGER billing_invoiceline_provider_check"
+            )
+
+        out = StringIO()
+        with self.assertRaises(CommandError):
+            call_command("audit_invoice_providers", stdout=out)
+        self.assertIn(f"bills barrel {self.barrel_b.id}", out.getvalue())
@@ -0,0 +1,80 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from billing.models import Barrel, Invoice, Provider
+
+User = get_user_model()
+
+
+class InvoiceSearchTests(APITestCase):
+    def setUp(self):
+        caches["responses"].clear()
+        self.provider = Provider.objects.create(
+            name="Acme Oils", address="Main St 1", tax_id="TAX-12345"
+        )
+        self.other = Provider.objects.create(
+            name="Other Oils", address="Side St 2", tax_id="TAX-67890"
+        )
+        self.user = User.objects.create_user(
+            username="regular_user", password="strongpass123", provider=self.provider
+        )
+        self.admin = User.objects.create_superuser(
+            username="admin", password="strongpass123", email="admin@example.com"
+        )
+        self.client.force_authenticate(user=self.user)
+
+        # (invoice_no, provider, [(barrel number, oil type)])
+        for invoice_no, provider, barrels in [
+            ("INV-100", self.provider, [("BAR-1", "Olive"), ("BAR-2", "Olive")]),
+            ("INV-101", self.provider, [("BAR-3", "Sunflower")]),
+            ("XINV-100", self.provider, []),
+            ("INV-102", self.other, [("BAR-1", "Sunflower")]),
+        ]:
+            invoice = Invoice.objects.create(
+                provider=provider, invoice_no=invoice_no, issued_on=date(2024, 5, 1)
+            )
+            for number, oil_type in barrels:
+                barrel = Barrel.objects.create(
+                    provider=provider, number=number, oil_type=oil_type, liters=10
+                )
+                invoice.add_line_for_barrel(
+                    barrel=barrel,
+                    liters=10,
+                    unit_price_per_liter=Decimal("1.00"),
+                    description="Line",
+                )
+
+    def search(self, **params):
+        response = self.client.get(reverse("invoice-list"), params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(item["invoice_no"] for item in response.data["results"])
+
+    def test_invoice_no_modes(self):
+        self.assertEqual(self.search(invoice_no="inv-10"), ["INV-100", "INV-101", "XINV-100"])
+        self.assertEqual(self.search(invoice_no_prefix="inv-10"), ["INV-100", "INV-101"])
+        self.assertEqual(self.search(invoice_no_exact="INV-100"), ["INV-100"])
+        self.assertEqual(self.search(invoice_no_exact="inv-100"), [])
+        if connection.vendor != "postgresql":
+            # Substring fallback without pg_trgm.
+            self.assertEqual(self.search(invoice_no_similar="xinv"), ["XINV-100"])
+
+    def test_barrel_number_and_oil_type_list_each_invoice_once(self):
+        self.assertEqual(self.search(barrel_number="BAR-1"), ["INV-100"])
+        self.assertEqual(self.search(oil_type="Olive"), ["INV-100"])
+        self.assertEqual(self.search(oil_type="Sunflower"), ["INV-101"])
+        self.assertEqual(self.search(oil_type="Olive", invoice_no_prefix="INV-101"), [])
+
+    def test_provider_filter(self):
+        self.client.force_authenticate(user=self.admin)
+        self.assertEqual(self.search(provider=self.other.pk), ["INV-102"])
+        self.assertEqual(self.search(barrel_number="BAR-1"), ["INV-100", "INV-102"])
+
+        # Scoping still applies to regular users.
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.search(provider=self.other.pk), [])
@@ -0,0 +1,104 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from billing.models import Barrel, Invoice, Provider
+
+User = get_user_model()
+
+
+class InvoiceTotalsTests(APITestCase):
+    def setUp(self):
+        caches["responses"].clear()
+        self.provider = Provider.objects.create(
+            name="Acme Oils", address="Main St 1", tax_id="TAX-12345"
+        )
+        self.user = User.objects.create_user(
+            username="regular_user", password="strongpass123", provider=self.provider
+        )
+        self.client.force_authenticate(user=self.user)
+
+        # (liters, unit price) of each line, per invoice.
+        self.invoices = {}
+        for invoice_no, lines in [
+            ("INV-A", [(100, "1.25"), (40, "2.10")]),
+            ("INV-B", [(10, "3.00")]),
+            ("INV-C", [(10, "3.00")]),
+            ("INV-D", []),
+        ]:
+            invoice = Invoice.objects.create(
+                provider=self.provider, invoice_no=invoice_no, issued_on=date(2024, 5, 1)
+            )
+            for index, (liters, unit_price) in enumerate(lines):
+                barrel = Barrel.objects.create(
+                    provider=self.provider,
+                    number=f"{invoice_no}-{index}",
+                    oil_type="Olive",
+                    liters=liters,
+                )
+                invoice.add_line_for_barrel(
+                    barrel=barrel,
+                    liters=liters,
+                    unit_price_per_liter=Decimal(unit_price),
+                    description="Line",
+                )
+            self.invoices[invoice_no] = invoice
+
+    def totals(self, response):
+        return {
+            item["invoice_no"]: (item["total_liters"], item["total_amount"])
+            for item in response.data["results"]
+        }
+
+    def test_list_and_detail_expose_totals(self):
+        response = self.client.get(reverse("invoice-list"))
+        self.assertEqual(
+            self.totals(response),
+            {
+                "INV-A": (140, "209.00"),
+                "INV-B": (10, "30.00"),
+                "INV-C": (10, "30.00"),
+                "INV-D": (0, "0.00"),
+            },
+        )
+
+        detail = self.client.get(reverse("invoice-detail", args=[self.invoices["INV-A"].pk]))
+        self.assertEqual(
+            (detail.data["total_liters"], detail.data["total_amount"]), (140, "209.00")
+        )
+
+    def test_created_invoice_reports_zero_totals(self):
+        response = self.client.post(
+            reverse("invoice-list"),
+            {"invoice_no": "INV-NEW", "issued_on": "2024-06-01"},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            (response.data["total_liters"], response.data["total_amount"]), (0, "0.00")
+        )
+
+    def test_filter_on_total_amount_range(self):
+        response = self.client.get(
+            reverse("invoice-list"), {"total_amount_min": "1", "total_amount_max": "100"}
+        )
+
+        self.assertEqual(set(self.totals(response)), {"INV-B", "INV-C"})
+
+    def test_ordering_on_totals_pages_through_ties(self):
+        url = reverse("invoice-list") + "?ordering=-total_amount&page_size=1"
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(item["invoice_no"] for item in response.data["results"])
+            url = response.data["next"]
+
+        # Ties (INV-B / INV-C) are broken by id in the ordering's direction.
+        self.assertEqual(seen, ["INV-A", "INV-C", "INV-B", "INV-D"])
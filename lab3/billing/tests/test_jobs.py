@@ -0,0 +1,376 @@
+import io
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from billing import jobs
+from billing.models import Barrel, BillingRollupMonth, Invoice, Job, Provider
+from users import throttling
+
+User = get_user_model()
+
+
+@override_settings(JOB_MAX_ATTEMPTS=2, JOB_RETRY_DELAY=0, JOB_TIMEOUT=60)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.calls = []
+        patcher = mock.patch.dict(jobs.HANDLERS, {"echo": self.echo, "flaky": self.flaky})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def echo(self, job):
+        self.calls.append(job.pk)
+        return job.payload
+
+    def flaky(self, job):
+        self.calls.append(job.pk)
+        if job.payload.get("permanent"):
+            raise jobs.JobError({"detail": "bad input"})
+        raise OperationalError("deadlock detected")
+
+    def test_jobs_are_claimed_oldest_first_and_record_their_result(self):
+        first = jobs.enqueue("echo", {"n": 1})
+        second = jobs.enqueue("echo", {"n": 2})
+        later = jobs.enqueue("echo", {"n": 3})
+        Job.objects.filter(pk=later.pk).update(run_after=timezone.now() + timedelta(hours=1))
+
+        claimed = [jobs.claim("w1"), jobs.claim("w1"), jobs.claim("w1")]
+        self.assertEqual([job and job.pk for job in claimed], [first.pk, second.pk, None])
+        self.assertEqual(claimed[0].status, Job.Status.RUNNING)
+        self.assertEqual(claimed[0].attempts, 1)
+
+        job = jobs.run(claimed[0])
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.SUCCEEDED)
+        self.assertEqual(job.result, {"n": 1})
+        self.assertIsNotNone(job.finished_at)
+
+    def test_unknown_kinds_are_refused(self):
+        with self.assertRaises(ValueError):
+            jobs.enqueue("nope")
+
+    def test_failures_are_retried_until_max_attempts(self):
+        job = jobs.enqueue("flaky")
+
+        with self.assertLogs("billing.jobs", "ERROR"):
+            jobs.run(jobs.claim("w1"))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.QUEUED)
+        self.assertIn("deadlock", job.error)
+
+        with self.assertLogs("billing.jobs", "ERROR"):
+            jobs.run(jobs.claim("w1"))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(self.calls, [job.pk, job.pk])
+
+    def test_job_errors_fail_without_retry(self):
+        job = jobs.enqueue("flaky", {"permanent": True})
+
+        jobs.run(jobs.claim("w1"))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertEqual(job.error, {"detail": "bad input"})
+        self.assertEqual(job.attempts, 1)
+
+    def silence(self, job):
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(minutes=5))
+
+    def test_jobs_of_dead_workers_are_requeued(self):
+        job = jobs.enqueue("echo")
+        jobs.claim("w1")
+        self.silence(job)
+
+        self.assertEqual(jobs.requeue_stale(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.QUEUED)
+
+        # Out of attempts: failed instead.
+        jobs.claim("w2")
+        self.silence(job)
+        jobs.requeue_stale()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.FAILED)
+
+    def test_long_jobs_of_live_workers_are_not_requeued(self):
+        job = jobs.enqueue("echo")
+        jobs.claim("w1")
+        Job.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(hours=5))
+        self.silence(job)
+
+        self.assertEqual(jobs.heartbeat("w1"), 1)
+        self.assertEqual(jobs.requeue_stale(), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.RUNNING)
+
+    def test_a_restarted_worker_does_not_keep_its_predecessors_jobs(self):
+        dead, restarted = jobs.worker_id(), jobs.worker_id()
+        self.assertNotEqual(dead, restarted)
+        job = jobs.enqueue("echo")
+        jobs.claim(dead)
+        self.silence(job)
+
+        self.assertEqual(jobs.heartbeat(restarted), 0)
+        self.assertEqual(jobs.requeue_stale(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.QUEUED)
+
+    def test_a_requeued_run_does_not_overwrite_the_new_attempt(self):
+        job = jobs.enqueue("echo", {"n": 1})
+        first = jobs.claim("w1")
+        self.silence(job)
+        jobs.requeue_stale()
+        second = jobs.claim("w2")
+
+        with self.assertLogs("billing.jobs", "WARNING"):
+            jobs.run(first)
+        self.assertEqual(first.status, Job.Status.RUNNING)
+        self.assertEqual(first.worker, "w2")
+
+        jobs.run(second)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.Status.SUCCEEDED, 2))
+
+    def test_old_output_files_are_purged(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+            JOB_OUTPUT_DIR=directory, JOB_OUTPUT_TTL=3600
+        ):
+            old = jobs.output_dir() / "job-1.csv"
+            partial = jobs.output_dir() / "job-2.csv.1.part"
+            recent = jobs.output_dir() / "job-3.csv"
+            for path in (old, partial, recent):
+                path.write_text("invoice_id\n")
+            two_hours_ago = time.time() - 7200
+            for path in (old, partial):
+                os.utime(path, (two_hours_ago, two_hours_ago))
+
+            output = io.StringIO()
+            call_command("purge_job_output", stdout=output)
+
+            self.assertIn("Deleted 2 job output files.", output.getvalue())
+            self.assertEqual(list(jobs.output_dir().iterdir()), [recent])
+
+
+class JobApiTests(APITestCase):
+    def setUp(self):
+        caches["responses"].clear()
+        output_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(output_dir.cleanup)
+        settings_override = override_settings(JOB_OUTPUT_DIR=output_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.provider = Provider.objects.create(
+            name="Acme Oils", address="Main St 1", tax_id="TAX-12345"
+        )
+        self.other = Provider.objects.create(
+            name="Other Oils", address="Side St 2", tax_id="TAX-67890"
+        )
+        self.user = User.objects.create_user(
+            username="regular_user", password="strongpass123", provider=self.provider
+        )
+        self.other_user = User.objects.create_user(
+            username="other_user", password="strongpass123", provider=self.other
+        )
+        self.admin = User.objects.create_superuser(
+            username="admin", password="strongpass123", email="admin@example.com"
+        )
+        self.invoice = Invoice.objects.create(
+            provider=self.provider, invoice_no="INV-001", issued_on=date(2024, 5, 1)
+        )
+        self.barrels = [
+            Barrel.objects.create(
+                provider=self.provider, number=f"BAR-{index}", oil_type="Olive", liters=10
+            )
+            for index in range(2)
+        ]
+        self.client.force_authenticate(user=self.user)
+
+    def run_queued(self):
+        while (job := jobs.claim("test")) is not None:
+            jobs.run(job)
+
+    def job(self, response):
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response["Location"], f"http://testserver/api/jobs/{response.data['id']}/")
+        return self.client.get(reverse("job-detail", args=[response.data["id"]])).data
+
+    def add_lines(self, barrels, prefer="respond-async"):
+        return self.client.post(
+            reverse("invoice-add-lines", args=[self.invoice.pk]),
+            {
+                "lines": [
+                    {"barrel": barrel.pk, "liters": 10, "unit_price": "1.50", "description": "L"}
+                    for barrel in barrels
+                ]
+            },
+            format="json",
+            headers={"Prefer": prefer} if prefer else {},
+        )
+
+    def test_add_lines_in_the_background(self):
+        response = self.add_lines(self.barrels)
+        self.assertEqual(self.job(response)["status"], Job.Status.QUEUED)
+        self.assertFalse(self.invoice.lines.exists())
+
+        self.run_queued()
+
+        job = self.job(response)
+        self.assertEqual(job["status"], Job.Status.SUCCEEDED)
+        self.assertEqual(
+            [line["barrel_id"] for line in job["result"]["lines"]],
+            [barrel.pk for barrel in self.barrels],
+        )
+        self.assertEqual(self.invoice.lines.count(), 2)
+
+    def test_background_billing_errors_match_the_synchronous_response(self):
+        self.invoice.add_line_for_barrel(
+            barrel=self.barrels[0],
+            liters=10,
+            unit_price_per_liter=Decimal("1.50"),
+            description="L",
+        )
+        synchronous = self.add_lines([self.barrels[0]], prefer=None)
+
+        response = self.add_lines([self.barrels[0]])
+        self.run_queued()
+
+        job = self.job(response)
+        self.assertEqual(job["status"], Job.Status.FAILED)
+        self.assertEqual(job["attempts"], 1)
+        self.assertEqual(job["error"], synchronous.json())
+
+    def test_invalid_requests_are_rejected_before_queueing(self):
+        response = self.client.post(
+            reverse("invoice-add-lines", args=[self.invoice.pk]),
+            {"lines": []},
+            format="json",
+            headers={"Prefer": "respond-async"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(
+            reverse("invoice-export"),
+            {"issued_on_after": "not-a-date"},
+            headers={"Prefer": "respond-async"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Job.objects.exists())
+
+    def test_export_in_the_background_matches_the_streamed_export(self):
+        Invoice.objects.create(
+            provider=self.other, invoice_no="INV-OTHER", issued_on=date(2024, 5, 1)
+        )
+        self.invoice.add_line_for_barrel(
+            barrel=self.barrels[0],
+            liters=10,
+            unit_price_per_liter=Decimal("1.50"),
+            description="L",
+        )
+        for export_format in ["csv", "ndjson"]:
+            params = {"export_format": export_format, "invoice_no": "INV"}
+            streamed = self.client.get(reverse("invoice-export"), params)
+            response = self.client.get(
+                reverse("invoice-export"), params, headers={"Prefer": "respond-async"}
+            )
+            self.run_queued()
+
+            job = self.job(response)
+            self.assertEqual(job["status"], Job.Status.SUCCEEDED)
+            download = self.client.get(reverse("job-download", args=[job["id"]]))
+            self.assertEqual(download.status_code, status.HTTP_200_OK)
+            self.assertEqual(download["Content-Type"], streamed["Content-Type"])
+            self.assertEqual(
+                b"".join(download.streaming_content), b"".join(streamed.streaming_content)
+            )
+
+    def test_jobs_are_visible_to_their_creator_only(self):
+        job_id = self.add_lines(self.barrels).data["id"]
+
+        self.client.force_authenticate(user=self.other_user)
+        self.assertEqual(self.client.get(reverse("job-list")).data["results"], [])
+        response = self.client.get(reverse("job-detail", args=[job_id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(reverse("job-list"), {"kind": "add_lines"})
+        self.assertEqual([job["id"] for job in response.data["results"]], [job_id])
+
+    def test_jobs_are_visible_with_tokens_from_the_token_endpoint(self):
+        throttling.reset()
+        token = self.client.post(
+            reverse("token_obtain_pair"),
+            {"username": "regular_user", "password": "strongpass123"},
+            format="json",
+        ).data["access"]
+        self.client.force_authenticate(user=None)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        job = self.job(self.add_lines(self.barrels))
+        self.assertEqual(job["status"], Job.Status.QUEUED)
+        response = self.client.get(reverse("job-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item["id"] for item in response.data["results"]], [job["id"]])
+
+    def test_download_needs_a_finished_export(self):
+        job_id = self.add_lines(self.barrels).data["id"]
+        self.run_queued()
+
+        response = self.client.get(reverse("job-download", args=[job_id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_rollup_refresh_is_queued_by_superusers(self):
+        url = reverse("billing-report-refresh")
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.post(url, {"provider": self.provider.pk}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(
+            Job.objects.get().payload, {"provider_ids": [self.provider.pk], "full": False}
+        )
+
+
+class RunJobsCommandTests(TransactionTestCase):
+    def setUp(self):
+        self.provider = Provider.objects.create(
+            name="Acme Oils", address="Main St 1", tax_id="TAX-12345"
+        )
+        invoice = Invoice.objects.create(
+            provider=self.provider, invoice_no="INV-001", issued_on=date(2024, 5, 1)
+        )
+        barrel = Barrel.objects.create(
+            provider=self.provider, number="BAR-1", oil_type="Olive", liters=10
+        )
+        invoice.add_line_for_barrel(
+            barrel=barrel, liters=10, unit_price_per_liter=Decimal("1.50"), description="L"
+        )
+
+    def test_drains_the_queue(self):
+        for _ in range(3):
+            jobs.enqueue("refresh_rollup", {"provider_ids": [self.provider.pk], "full": True})
+
+        output = io.StringIO()
+        # One worker: the SQLite test database does not take concurrent writers.
+        call_command("run_jobs", "--once", "--workers", "1", stdout=output)
+
+        self.assertIn("Ran jobs: succeeded 3.", output.getvalue())
+
+        self.assertEqual(
+            list(Job.objects.values_list("status", flat=True).distinct()),
+            [Job.Status.SUCCEEDED],
+        )
+        self.assertTrue(BillingRollupMonth.objects.filter(provider=self.provider).exists())
@@ -0,0 +1,133 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from billing.models import Barrel, Invoice, Provider, ProviderLitersSummary
+
+User = get_user_model()
+
+
+class ProviderLitersSummaryTests(APITestCase):
+    def setUp(self):
+        self.provider = Provider.objects.create(
+            name="Acme Oils",
+            address="Main St 1",
+            tax_id="TAX-12345",
+        )
+        self.user = User.objects.create_user(
+            username="regular_user", password="strongpass123", provider=self.provider
+        )
+        self.invoice = Invoice.objects.create(
+            provider=self.provider, invoice_no="INV-001", issued_on="2024-10-10"
+        )
+
+    def summary(self):
+        return ProviderLitersSummary.objects.get(provider=self.provider)
+
+    def assertSummary(self, billed_liters, liters_to_bill, billed_barrels, barrels_to_bill):
+        summary = self.summary()
+        self.assertEqual(
+            (
+                summary.billed_liters,
+                summary.liters_to_bill,
+                summary.billed_barrels,
+                summary.barrels_to_bill,
+            ),
+            (billed_liters, liters_to_bill, billed_barrels, barrels_to_bill),
+        )
+        self.assertEqual(ProviderLitersSummary.find_inconsistencies(), [])
+
+    def test_barrel_endpoint_writes_keep_summary_in_sync(self):
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.post(
+            reverse("barrel-list"),
+            {"number": "BAR-001", "oil_type": "Olive", "liters": 100},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertSummary(0, 100, 0, 1)
+
+        url = reverse("barrel-detail", args=[response.data["id"]])
+        response = self.client.patch(url, {"liters": 70}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertSummary(0, 70, 0, 1)
+
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertSummary(0, 0, 0, 0)
+
+    def test_add_line_for_barrel_moves_liters_to_billed(self):
+        barrel = Barrel.objects.create(
+            provider=self.provider, number="BAR-001", oil_type="Olive", liters=100
+        )
+        Barrel.objects.create(
+            provider=self.provider, number="BAR-002", oil_type="Olive", liters=30
+        )
+        self.assertSummary(0, 130, 0, 2)
+
+        self.invoice.add_line_for_barrel(
+            barrel=barrel,
+            liters=100,
+            unit_price_per_liter=Decimal("2.00"),
+            description="Olive barrel",
+        )
+        self.assertSummary(100, 30, 1, 1)
+
+    def test_provider_detail_reads_summary(self):
+        Barrel.objects.create(
+            provider=self.provider, number="BAR-001", oil_type="Olive", liters=100, billed=True
+        )
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(reverse("provider-detail", args=[self.provider.pk]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["billed_liters"], 100)
+        self.assertEqual(response.data["liters_to_bill"], 0)
+
+    def test_admin_bulk_delete_keeps_summary_in_sync(self):
+        barrels = [
+            Barrel.objects.create(
+                provider=self.provider, number=f"BAR-{index}", oil_type="Olive", liters=10
+            )
+            for index in range(3)
+        ]
+        admin = User.objects.create_superuser(username="admin", password="strongpass123")
+        self.client.force_login(admin)
+
+        response = self.client.post(
+            reverse("admin:billing_barrel_changelist"),
+            {
+                "action": "delete_selected",
+                "_selected_action": [barrel.pk for barrel in barrels[:2]],
+                "post": "yes",
+            },
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertEqual(Barrel.objects.count(), 1)
+        self.assertSummary(0, 10, 0, 1)
+
+    def test_rebuild_command_repairs_drift(self):
+        Barrel.objects.create(
+            provider=self.provider, number="BAR-001", oil_type="Olive", liters=100
+        )
+        # Queryset updates bypass Barrel.save and leave the ledger stale.
+        Barrel.objects.filter(provider=self.provider).update(billed=True)
+
+        mismatches = ProviderLitersSummary.find_inconsistencies()
+        self.assertEqual(len(mismatches), 1)
+        self.assertEqual(mismatches[0]["provider_id"], self.provider.id)
+
+        with self.assertRaises(CommandError):
+            call_command("rebuild_liters_summary", "--check", stdout=StringIO())
+
+        call_command("rebuild_liters_summary", stdout=StringIO())
+        self.assertSummary(100, 0, 1, 0)
+        call_command("rebuild_liters_summary", "--check", stdout=StringIO())
@@ -0,0 +1,136 @@
+import json
+from base64 import urlsafe_b64encode
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from billing.models import Barrel, Invoice, Provider
+
+User = get_user_model()
+
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        caches["responses"].clear()
+        self.provider = Provider.objects.create(
+            name="Acme Oils",
+            address="Main St 1",
+            tax_id="TAX-12345",
+        )
+        self.user = User.objects.create_user(
+            username="regular_user", password="strongpass123", provider=self.provider
+        )
+        self.client.force_authenticate(user=self.user)
+
+        # Several invoices share an issue date so the id tie-breaker matters.
+        start = date(2024, 1, 1)
+        Invoice.objects.bulk_create(
+            Invoice(
+                provider=self.provider,
+                invoice_no=f"INV-{index:03d}",
+                issued_on=start + timedelta(days=index // 4),
+            )
+            for index in range(11)
+        )
+        self.expected_invoice_ids = list(
+            Invoice.objects.filter(provider=self.provider)
+            .order_by("-issued_on", "-id")
+            .values_list("id", flat=True)
+        )
+
+    def walk(self, url, link):
+        ids = []
+        pages = 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(item["id"] for item in response.data["results"])
+            url = response.data[link]
+            pages += 1
+        return ids, pages
+
+    def test_invoice_pages_follow_issued_on_then_id(self):
+        url = reverse("invoice-list") + "?page_size=3"
+
+        ids, pages = self.walk(url, "next")
+
+        self.assertEqual(ids, self.expected_invoice_ids)
+        self.assertEqual(pages, 4)
+
+    def test_previous_link_walks_back_to_first_page(self):
+        url = reverse("invoice-list") + "?page_size=3"
+        for _ in range(3):
+            response = self.client.get(url)
+            url = response.data["next"]
+        last_page_ids = [item["id"] for item in self.client.get(url).data["results"]]
+        self.assertEqual(last_page_ids, self.expected_invoice_ids[9:])
+
+        response = self.client.get(url)
+        ids, pages = self.walk(response.data["previous"], "previous")
+
+        # Each page is returned in forward order while walking backwards.
+        expected_pages = [self.expected_invoice_ids[i:i + 3] for i in (6, 3, 0)]
+        self.assertEqual(ids, [item for page in expected_pages for item in page])
+        self.assertEqual(pages, 3)
+
+    def test_deep_page_query_count_is_constant(self):
+        Barrel.objects.bulk_create(
+            Barrel(provider=self.provider, number=f"BAR-{index}", oil_type="Olive", liters=10)
+            for index in range(12)
+        )
+        url = reverse("barrel-list") + "?page_size=2"
+        # Each page also loads the provider's change version for the ETag.
+        with self.assertNumQueries(2):
+            first = self.client.get(url)
+
+        for _ in range(4):
+            url = first.data["next"]
+            with self.assertNumQueries(2):
+                first = self.client.get(url)
+        self.assertEqual(len(first.data["results"]), 2)
+
+    def test_invalid_cursor_returns_not_found(self):
+        response = self.client.get(reverse("invoice-list") + "?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        # Well-formed cursor whose position does not fit the ordering fields.
+        bad_position = "eyJwIjogWyJhYmMiLCAiMSJdfQ=="
+        response = self.client.get(reverse("invoice-list") + f"?cursor={bad_position}")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def cursor(self, position):
+        return urlsafe_b64encode(json.dumps({"p": position}).encode()).decode()
+
+    def test_cursor_past_deleted_rows_returns_an_empty_page(self):
+        for number in ("BAR-1", "BAR-2"):
+            Barrel.objects.create(
+                provider=self.provider, number=number, oil_type="Olive", liters=10
+            )
+        next_url = self.client.get(reverse("barrel-list"), {"page_size": 1}).data["next"]
+        Barrel.objects.filter(number="BAR-2").delete()
+
+        response = self.client.get(next_url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"], [])
+        self.assertIsNone(response.data["next"])
+        self.assertIsNone(response.data["previous"])
+
+        Barrel.objects.all().delete()
+        for name in ("barrel-list", "user-list"):
+            response = self.client.get(reverse(name), {"cursor": self.cursor([True])})
+            self.assertEqual(response.status_code, status.HTTP_200_OK, name)
+
+    def test_cursor_positions_must_be_scalars(self):
+        for name, position in [
+            ("provider-list", [[1]]),
+            ("barrel-list", [{"a": 1}]),
+            ("user-list", [[1]]),
+            ("invoice-list", [["x"], 1]),
+        ]:
+            response = self.client.get(reverse(name), {"cursor": self.cursor(position)})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, name)
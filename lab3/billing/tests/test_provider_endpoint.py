@@ -58,7 +58,7 @@ class ProviderEndpointTests(APITestCase):
         response = self.client.get(self.provider_list_url)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        provider_names = [provider["name"] for provider in response.data]
+        provider_names = [provider["name"] for provider in response.data["results"]]
         self.assertIn(self.provider_a.name, provider_names)
         self.assertIn(self.provider_b.name, provider_names)
 
@@ -68,11 +68,11 @@ class ProviderEndpointTests(APITestCase):
         response = self.client.get(self.provider_list_url)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        provider_names = [provider["name"] for provider in response.data]
+        provider_names = [provider["name"] for provider in response.data["results"]]
 
         self.assertIn(self.provider_a.name, provider_names)
         self.assertNotIn(self.provider_b.name, provider_names)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data["results"]), 1)
 
         url = reverse("provider-detail", args=[self.provider_a.pk])
         response = self.client.get(url)
@@ -127,11 +127,11 @@ class ProviderEndpointTests(APITestCase):
         response = self.client.get(self.provider_list_url)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertIn("name", response.data[0])
-        self.assertIn("tax_id", response.data[0])
-        self.assertEqual(response.data[0]["name"], self.provider_a.name)
-        self.assertEqual(response.data[0]["tax_id"], self.provider_a.tax_id)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertIn("name", response.data["results"][0])
+        self.assertIn("tax_id", response.data["results"][0])
+        self.assertEqual(response.data["results"][0]["name"], self.provider_a.name)
+        self.assertEqual(response.data["results"][0]["tax_id"], self.provider_a.tax_id)
 
     def test_cross_add_barrel_to_invoice(self):
         self.client.force_authenticate(user=self.user_a)
@@ -161,9 +161,9 @@ class ProviderEndpointTests(APITestCase):
         response = self.client.get(self.invoice_list_url)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertIn("invoice_no", response.data[0])
-        self.assertEqual(response.data[0]["invoice_no"], self.invoice_a.invoice_no)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertIn("invoice_no", response.data["results"][0])
+        self.assertEqual(response.data["results"][0]["invoice_no"], self.invoice_a.invoice_no)
 
         url = reverse("invoice-detail", args=[self.invoice_b.pk])
         response = self.client.get(url)
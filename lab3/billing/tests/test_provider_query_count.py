@@ -0,0 +1,83 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from billing.models import Barrel, Provider
+
+User = get_user_model()
+
+
+class ProviderQueryCountTests(APITestCase):
+    def setUp(self):
+        caches["responses"].clear()
+        self.superuser = User.objects.create_superuser(
+            username="admin", password="adminpass123", email="admin@example.com"
+        )
+        self.provider_list_url = reverse("provider-list")
+
+    def create_provider_with_barrels(self, index):
+        provider = Provider.objects.create(
+            name=f"Provider {index}",
+            address=f"Street {index}",
+            tax_id=f"TAX-{index}",
+        )
+        Barrel.objects.create(
+            provider=provider,
+            number=f"BAR-{index}-1",
+            oil_type="Olive",
+            liters=100,
+            billed=True,
+        )
+        Barrel.objects.create(
+            provider=provider,
+            number=f"BAR-{index}-2",
+            oil_type="Olive",
+            liters=40,
+            billed=False,
+        )
+        Barrel.objects.create(
+            provider=provider,
+            number=f"BAR-{index}-3",
+            oil_type="Sunflower",
+            liters=15,
+            billed=False,
+        )
+        return provider
+
+    def test_provider_list_query_count_does_not_grow_with_providers(self):
+        self.client.force_authenticate(user=self.superuser)
+
+        for index in range(2):
+            self.create_provider_with_barrels(index)
+        # The list query plus the change-version lookup behind the ETag.
+        with self.assertNumQueries(2):
+            response = self.client.get(self.provider_list_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), Provider.objects.count())
+
+        for index in range(2, 10):
+            self.create_provider_with_barrels(index)
+        # The list query plus the change-version lookup behind the ETag.
+        with self.assertNumQueries(2):
+            response = self.client.get(self.provider_list_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), Provider.objects.count())
+
+    def test_provider_list_annotated_totals(self):
+        self.client.force_authenticate(user=self.superuser)
+        provider = self.create_provider_with_barrels(1)
+        empty_provider = Provider.objects.create(
+            name="Empty", address="Nowhere", tax_id="TAX-EMPTY"
+        )
+
+        response = self.client.get(self.provider_list_url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        totals = {
+            item["id"]: (item["billed_liters"], item["liters_to_bill"])
+            for item in response.data["results"]
+        }
+        self.assertEqual(totals[provider.id], (100, 55))
+        self.assertEqual(totals[empty_provider.id], (0, 0))
@@ -0,0 +1,110 @@
+from datetime import date, timedelta
+
+from django.db import connection
+from django.test import TestCase
+
+from billing.api.filters import InvoiceFilter
+from billing.models import Barrel, Invoice, Provider
+
+
+class QueryPlanTestCase(TestCase):
+    """Base class for asserting which index PostgreSQL picks for a queryset.
+
+    Test tables are tiny, so sequential scans are disabled for the EXPLAIN:
+    the assertion is that an index *can* serve the query shape, and which one
+    the planner prefers among the candidates.
+    """
+
+    def setUp(self):
+        if connection.vendor != "postgresql":
+            self.skipTest("Query plan assertions need PostgreSQL.")
+
+    def explain(self, queryset):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            try:
+                return queryset.explain()
+            finally:
+                cursor.execute("RESET enable_seqscan")
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = self.explain(queryset)
+        self.assertIn(index_name, plan, f"{index_name} not used by plan:\n{plan}")
+
+
+class BillingQueryPlanTests(QueryPlanTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.providers = Provider.objects.bulk_create(
+            Provider(name=f"Provider {index}", address="Street", tax_id=f"TAX-{index}")
+            for index in range(20)
+        )
+        Barrel.objects.bulk_create(
+            Barrel(
+                provider=provider,
+                number=f"BAR-{index}",
+                oil_type="Olive",
+                liters=10,
+                billed=index % 10 != 0,
+            )
+            for provider in cls.providers
+            for index in range(50)
+        )
+        start = date(2020, 1, 1)
+        Invoice.objects.bulk_create(
+            Invoice(
+                provider=provider,
+                invoice_no=f"INV-{provider.id}-{index:04d}",
+                issued_on=start + timedelta(days=index),
+            )
+            for provider in cls.providers
+            for index in range(50)
+        )
+        cls.provider = cls.providers[0]
+
+    def test_unbilled_barrels_per_provider_use_partial_index(self):
+        queryset = Barrel.objects.filter(provider_id=self.provider.id, billed=False)
+
+        self.assertUsesIndex(queryset, "billing_barrel_unbilled_idx")
+
+    def test_billed_barrels_per_provider_use_provider_number_index(self):
+        queryset = Barrel.objects.filter(provider_id=self.provider.id, billed=True)
+
+        self.assertUsesIndex(queryset, "billing_barrel_provider_id_number")
+
+    def test_provider_invoice_page_uses_ordering_index(self):
+        queryset = Invoice.objects.filter(provider_id=self.provider.id).order_by(
+            "-issued_on", "-id"
+        )[:51]
+
+        self.assertUsesIndex(queryset, "billing_inv_prov_issued_idx")
+
+    def test_unscoped_invoice_page_uses_ordering_index(self):
+        queryset = Invoice.objects.order_by("-issued_on", "-id")[:51]
+
+        self.assertUsesIndex(queryset, "billing_inv_issued_idx")
+
+    def test_invoice_no_icontains_uses_trigram_index(self):
+        queryset = InvoiceFilter({"invoice_no": "0042"}, queryset=Invoice.objects.all()).qs
+
+        self.assertUsesIndex(queryset, "billing_inv_no_trgm_idx")
+
+    def test_invoice_no_prefix_uses_pattern_ops_index(self):
+        queryset = InvoiceFilter(
+            {"invoice_no_prefix": "inv-1-00"}, queryset=Invoice.objects.all()
+        ).qs
+
+        self.assertUsesIndex(queryset, "billing_inv_no_prefix_idx")
+
+    def test_invoice_no_similar_uses_trigram_index(self):
+        queryset = InvoiceFilter(
+            {"invoice_no_similar": "INV-1-0042"}, queryset=Invoice.objects.all()
+        ).qs
+
+        self.assertUsesIndex(queryset, "billing_inv_no_trgm_idx")
+
+    def test_barrel_number_filter_uses_number_index(self):
+        queryset = InvoiceFilter({"barrel_number": "BAR-7"}, queryset=Invoice.objects.all()).qs
+
+        self.assertUsesIndex(queryset, "billing_barrel_number_idx")
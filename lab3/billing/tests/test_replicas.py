@@ -0,0 +1,199 @@
+from datetime import date, timedelta
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from billing.models import Barrel, Invoice, Provider, ReplicaPin
+from billing.replicas import (
+    ReplicaRouter,
+    is_pinned,
+    pin_to_primary,
+    primary_reads,
+    replica_reads,
+)
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=["replica1", "replica2"], REPLICA_PIN_SECONDS=5)
+class ReplicaRouterTests(TransactionTestCase):
+    def setUp(self):
+        caches["responses"].clear()
+        self.router = ReplicaRouter()
+        self.user = mock.Mock(pk=7, is_authenticated=True)
+
+    def test_reads_use_a_replica_only_inside_replica_reads(self):
+        self.assertIsNone(self.router.db_for_read(Invoice))
+        with replica_reads(self.user) as alias:
+            self.assertIn(alias, {"replica1", "replica2"})
+            self.assertEqual(self.router.db_for_read(Invoice), alias)
+            with primary_reads():
+                self.assertIsNone(self.router.db_for_read(Invoice))
+        self.assertIsNone(self.router.db_for_read(Invoice))
+
+    def test_pinned_users_read_from_the_primary(self):
+        pin_to_primary(self.user.pk)
+
+        self.assertTrue(is_pinned(self.user.pk))
+        with replica_reads(self.user) as alias:
+            self.assertIsNone(alias)
+            self.assertIsNone(self.router.db_for_read(Invoice))
+        with replica_reads(AnonymousUser()) as alias:
+            self.assertIsNotNone(alias)
+
+    def test_pins_are_shared_and_expire(self):
+        pin_to_primary(self.user.pk)
+        # Another worker sees the pin: it is a row on the primary.
+        self.assertTrue(ReplicaPin.objects.filter(user_id=self.user.pk).exists())
+
+        later = timezone.now() + timedelta(seconds=6)
+        with mock.patch("billing.replicas.timezone.now", return_value=later):
+            self.assertFalse(is_pinned(self.user.pk))
+            pin_to_primary(self.user.pk)
+            self.assertTrue(is_pinned(self.user.pk))
+        self.assertEqual(ReplicaPin.objects.count(), 1)
+
+    def test_writes_and_migrations_stay_on_the_primary(self):
+        with replica_reads(self.user):
+            self.assertEqual(self.router.db_for_write(Invoice), DEFAULT_DB_ALIAS)
+        self.assertFalse(self.router.allow_migrate("replica1", "billing"))
+        self.assertIsNone(self.router.allow_migrate(DEFAULT_DB_ALIAS, "billing"))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas_configured(self):
+        with replica_reads(self.user) as alias:
+            self.assertIsNone(alias)
+
+
+class ReplicaRoutingRequestTests(TransactionTestCase):
+    """End to end, with ``default`` standing in as the only replica.
+
+    The router answers None for the primary and the alias for a replica, so
+    the recorded answers show where each read would have gone.
+    """
+
+    def setUp(self):
+        caches["responses"].clear()
+        self.provider = Provider.objects.create(
+            name="Acme Oils", address="Main St 1", tax_id="TAX-12345"
+        )
+        self.invoice = Invoice.objects.create(
+            provider=self.provider, invoice_no="INV-001", issued_on=date(2024, 10, 10)
+        )
+        self.barrel = Barrel.objects.create(
+            provider=self.provider, number="BAR-001", oil_type="Olive", liters=50
+        )
+        self.user = User.objects.create_user(
+            username="regular_user", password="strongpass123", provider=self.provider
+        )
+        self.other_user = User.objects.create_user(
+            username="other_user", password="strongpass123", provider=self.provider
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        self.routed = []
+        original = ReplicaRouter.db_for_read
+
+        def record(router, model, **hints):
+            alias = original(router, model, **hints)
+            self.routed.append(alias)
+            return alias
+
+        patcher = mock.patch.object(ReplicaRouter, "db_for_read", record)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def reads(self, callable_):
+        self.routed.clear()
+        response = callable_()
+        return response, set(self.routed)
+
+    @override_settings(DATABASE_REPLICAS=[DEFAULT_DB_ALIAS])
+    def test_list_and_retrieve_read_from_the_replica(self):
+        for url in [
+            reverse("invoice-list"),
+            reverse("invoice-detail", args=[self.invoice.pk]),
+            reverse("provider-list"),
+            reverse("barrel-list"),
+            reverse("user-list"),
+            reverse("billing-report"),
+        ]:
+            response, routed = self.reads(lambda: self.client.get(url))
+            self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+            self.assertIn(DEFAULT_DB_ALIAS, routed, url)
+
+    @override_settings(DATABASE_REPLICAS=[DEFAULT_DB_ALIAS])
+    def test_writer_is_pinned_to_the_primary(self):
+        response, routed = self.reads(
+            lambda: self.client.post(
+                reverse("invoice-add-line", args=[self.invoice.pk]),
+                {
+                    "barrel": self.barrel.pk,
+                    "liters": 50,
+                    "unit_price": "2.00",
+                    "description": "Olive barrel",
+                },
+                format="json",
+            )
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(routed, {None})
+        self.assertTrue(is_pinned(self.user.pk))
+
+        _, routed = self.reads(lambda: self.client.get(reverse("invoice-list")))
+        self.assertEqual(routed, {None})
+
+        # Other users are not affected by the pin.
+        self.client.force_authenticate(user=self.other_user)
+        _, routed = self.reads(lambda: self.client.get(reverse("invoice-list")))
+        self.assertIn(DEFAULT_DB_ALIAS, routed)
+
+    @override_settings(DATABASE_REPLICAS=[DEFAULT_DB_ALIAS])
+    def test_reads_inside_atomic_blocks_use_the_primary(self):
+        with replica_reads(self.user):
+            with transaction.atomic():
+                Invoice.objects.get(pk=self.invoice.pk)
+            self.assertEqual(self.routed, [None])
+            Invoice.objects.get(pk=self.invoice.pk)
+        self.assertEqual(self.routed, [None, DEFAULT_DB_ALIAS])
+
+    @override_settings(DATABASE_REPLICAS=[DEFAULT_DB_ALIAS])
+    async def test_async_reads_check_the_pin_off_the_event_loop(self):
+        await sync_to_async(pin_to_primary)(self.user.pk)
+        url = reverse("async-provider-list")
+
+        self.routed.clear()
+        headers = {"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+        response = await self.async_client.get(url, headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(self.routed), {None})
+
+        self.routed.clear()
+        headers = {"Authorization": f"Bearer {AccessToken.for_user(self.other_user)}"}
+        response = await self.async_client.get(url, headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(DEFAULT_DB_ALIAS, self.routed)
+
+    @override_settings(DATABASE_REPLICAS=[DEFAULT_DB_ALIAS])
+    async def test_async_stack_pins_the_writer(self):
+        response = await self.async_client.post(
+            reverse("barrel-list"),
+            {"number": "BAR-002", "oil_type": "Olive", "liters": 20},
+            content_type="application/json",
+            headers={"Authorization": f"Bearer {AccessToken.for_user(self.user)}"},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(await sync_to_async(is_pinned)(self.user.pk))
@@ -0,0 +1,118 @@
+import re
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from billing.api import instrumentation
+from billing.models import Barrel, Invoice, Provider
+
+User = get_user_model()
+
+
+class RequestMetricsTests(APITestCase):
+    def setUp(self):
+        caches["responses"].clear()
+        instrumentation.reset()
+        self.provider = Provider.objects.create(
+            name="Acme Oils", address="Main St 1", tax_id="TAX-12345"
+        )
+        self.invoice = Invoice.objects.create(
+            provider=self.provider, invoice_no="INV-001", issued_on=date(2024, 10, 10)
+        )
+        self.barrel = Barrel.objects.create(
+            provider=self.provider, number="BAR-001", oil_type="Olive", liters=50
+        )
+        self.user = User.objects.create_user(
+            username="regular_user", password="strongpass123", provider=self.provider
+        )
+        self.superuser = User.objects.create_superuser(
+            username="admin", password="adminpass123", email="admin@example.com"
+        )
+
+    def test_server_timing_reports_the_queries_of_the_request(self):
+        self.client.force_authenticate(user=self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("invoice-list"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        timing = response["Server-Timing"]
+        self.assertIn(f'db;desc="{len(queries)} queries"', timing)
+        self.assertIn("serializer;dur=", timing)
+        self.assertIn("total;dur=", timing)
+
+    @override_settings(SERVER_TIMING=False)
+    def test_server_timing_header_can_be_disabled(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse("invoice-list"))
+
+        self.assertNotIn("Server-Timing", response)
+
+    def test_requests_are_aggregated_per_view_action(self):
+        self.client.force_authenticate(user=self.user)
+        self.client.get(reverse("invoice-list"))
+        self.client.get(reverse("invoice-list"))
+        self.client.post(
+            reverse("invoice-add-line", args=[self.invoice.pk]),
+            {
+                "barrel": self.barrel.pk,
+                "liters": 50,
+                "unit_price": "2.00",
+                "description": "Olive barrel",
+            },
+            format="json",
+        )
+
+        stats = instrumentation.stats()
+        self.assertEqual(stats["InvoiceViewSet.list"]["count"], 2)
+        self.assertEqual(stats["InvoiceViewSet.add_line"]["count"], 1)
+        self.assertGreater(stats["InvoiceViewSet.add_line"]["avg_queries"], 0)
+        self.assertEqual(sum(stats["InvoiceViewSet.list"]["latency_ms_buckets"].values()), 2)
+
+    async def test_queries_are_counted_under_asgi(self):
+        headers = {"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+        for name in ["invoice-list", "async-invoice-list"]:
+            with self.subTest(name=name):
+                response = await self.async_client.get(reverse(name), headers=headers)
+
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                queries = int(re.search(r'db;desc="(\d+) queries"', response["Server-Timing"])[1])
+                self.assertGreater(queries, 0)
+
+        stats = instrumentation.stats()
+        self.assertGreater(stats["InvoiceViewSet.list"]["avg_queries"], 0)
+
+    def test_metrics_endpoint_is_superuser_only(self):
+        self.client.force_authenticate(user=self.user)
+        self.client.get(reverse("barrel-list"))
+        response = self.client.get(reverse("request-metrics"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.superuser)
+        response = self.client.get(reverse("request-metrics"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["BarrelViewSet.list"]["count"], 1)
+        self.assertIn("avg_serializer_ms", response.data["BarrelViewSet.list"])
+
+    def test_database_stats_report_connection_reuse_settings(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse("db-stats"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.superuser)
+        response = self.client.get(reverse("db-stats"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        default = response.data["default"]
+        self.assertEqual(default["vendor"], connection.vendor)
+        self.assertEqual(default["conn_max_age"], connection.settings_dict["CONN_MAX_AGE"])
+        # Unpooled here; with POSTGRES_POOL=1 this holds psycopg_pool's counters.
+        self.assertIsNone(default["pool"])
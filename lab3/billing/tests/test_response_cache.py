@@ -0,0 +1,142 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from billing.models import Barrel, Invoice, Provider
+
+User = get_user_model()
+
+
+class ResponseCacheTests(APITestCase):
+    def setUp(self):
+        caches["responses"].clear()
+        self.provider_a = Provider.objects.create(
+            name="Acme Oils", address="Main St 1", tax_id="TAX-12345"
+        )
+        self.provider_b = Provider.objects.create(
+            name="Industrias Don Pepe", address="Sesame St 1", tax_id="TAX-78787"
+        )
+        self.invoice = Invoice.objects.create(
+            provider=self.provider_a, invoice_no="INV-001", issued_on=date(2024, 10, 10)
+        )
+        self.barrel = Barrel.objects.create(
+            provider=self.provider_a, number="BAR-001", oil_type="Olive", liters=50
+        )
+        self.user_a = User.objects.create_user(
+            username="user_a", password="strongpass123", provider=self.provider_a
+        )
+        self.user_b = User.objects.create_user(
+            username="user_b", password="strongpass123", provider=self.provider_b
+        )
+        self.superuser = User.objects.create_superuser(
+            username="admin", password="adminpass123", email="admin@example.com"
+        )
+        self.provider_url = reverse("provider-detail", args=[self.provider_a.pk])
+        self.invoice_url = reverse("invoice-detail", args=[self.invoice.pk])
+
+    def test_second_read_is_served_from_cache(self):
+        self.client.force_authenticate(user=self.user_a)
+
+        first = self.client.get(self.invoice_url)
+        # Only the provider's change state, for the ETag.
+        with self.assertNumQueries(1):
+            second = self.client.get(self.invoice_url)
+
+        self.assertEqual(first["X-Cache"], "MISS")
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(second.data, first.data)
+
+    def test_barrel_write_invalidates_provider_detail(self):
+        self.client.force_authenticate(user=self.user_a)
+        self.assertEqual(self.client.get(self.provider_url).data["liters_to_bill"], 50)
+
+        self.client.post(
+            reverse("barrel-list"),
+            {"number": "BAR-002", "oil_type": "Olive", "liters": 25},
+            format="json",
+        )
+        response = self.client.get(self.provider_url)
+
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["liters_to_bill"], 75)
+
+    def test_writes_from_other_processes_invalidate(self):
+        self.client.force_authenticate(user=self.user_a)
+        self.client.get(self.invoice_url)
+
+        # As written by a job worker: this process gets no signal.
+        Invoice.objects.filter(pk=self.invoice.pk).update(invoice_no="INV-001-B")
+        Provider.bump_change_versions([self.provider_a.pk])
+        response = self.client.get(self.invoice_url)
+
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["invoice_no"], "INV-001-B")
+
+    def test_add_line_invalidates_invoice_and_provider(self):
+        self.client.force_authenticate(user=self.user_a)
+        self.client.get(self.invoice_url)
+        self.client.get(self.provider_url)
+
+        self.invoice.add_line_for_barrel(
+            barrel=self.barrel,
+            liters=50,
+            unit_price_per_liter=Decimal("2.00"),
+            description="Olive barrel",
+        )
+
+        invoice_response = self.client.get(self.invoice_url)
+        provider_response = self.client.get(self.provider_url)
+        self.assertEqual(invoice_response["X-Cache"], "MISS")
+        self.assertEqual(len(invoice_response.data["lines"]), 1)
+        self.assertEqual(provider_response.data["billed_liters"], 50)
+
+    def test_bulk_add_lines_invalidates_invoice(self):
+        self.client.force_authenticate(user=self.user_a)
+        self.client.get(self.invoice_url)
+
+        self.client.post(
+            reverse("invoice-add-lines", args=[self.invoice.pk]),
+            {
+                "lines": [
+                    {
+                        "barrel": self.barrel.id,
+                        "liters": 50,
+                        "unit_price": "2.00",
+                        "description": "Olive barrel",
+                    }
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(len(self.client.get(self.invoice_url).data["lines"]), 1)
+
+    def test_cached_object_is_not_served_to_other_provider(self):
+        self.client.force_authenticate(user=self.superuser)
+        self.client.get(self.invoice_url)
+
+        self.client.force_authenticate(user=self.user_b)
+        response = self.client.get(self.invoice_url)
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_stats_endpoint_reports_hits_and_misses_to_superusers(self):
+        self.client.force_authenticate(user=self.user_a)
+        self.client.get(self.provider_url)
+        self.client.get(self.provider_url)
+        self.assertEqual(
+            self.client.get(reverse("cache-stats")).status_code, status.HTTP_403_FORBIDDEN
+        )
+
+        self.client.force_authenticate(user=self.superuser)
+        response = self.client.get(reverse("cache-stats"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["provider"]["hits"], 1)
+        self.assertEqual(response.data["provider"]["misses"], 1)
+        self.assertEqual(response.data["provider"]["hit_ratio"], 0.5)
@@ -0,0 +1,97 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from billing.api.renderers import FastJSONRenderer
+from billing.api.rows import BarrelRowSerializer, InvoiceRowSerializer, ProviderRowSerializer
+from billing.api.serializers import BarrelSerializer, InvoiceSerializer, ProviderSerializer
+from billing.api.views import BarrelViewSet, InvoiceViewSet, ProviderViewSet
+from billing.models import Barrel, Invoice, Provider
+
+User = get_user_model()
+
+
+class RowSerializerCompatibilityTests(APITestCase):
+    """The list fast path must render exactly what the ModelSerializers render."""
+
+    def setUp(self):
+        caches["responses"].clear()
+        self.provider = Provider.objects.create(
+            name="Aceites Núñez", address="Calle Mayor 1\nSevilla", tax_id="TAX-12345"
+        )
+        self.superuser = User.objects.create_superuser(
+            username="admin", password="adminpass123", email="admin@example.com"
+        )
+        for index, issued_on in enumerate([date(2024, 1, 2), date(2024, 1, 2), date(2024, 3, 4)]):
+            invoice = Invoice.objects.create(
+                provider=self.provider, invoice_no=f"INV-{index:03d}", issued_on=issued_on
+            )
+            for number in range(index + 1):
+                barrel = Barrel.objects.create(
+                    provider=self.provider,
+                    number=f"BAR-{index}-{number}",
+                    oil_type="Olive",
+                    liters=10 + number,
+                )
+                invoice.add_line_for_barrel(
+                    barrel=barrel,
+                    liters=barrel.liters,
+                    unit_price_per_liter=Decimal("1234.5") + number,
+                    description=f"Línea «{number}» \u2028\"quoted\"",
+                )
+        Invoice.objects.create(
+            provider=self.provider, invoice_no="INV-EMPTY", issued_on=date(2023, 5, 6)
+        )
+        Barrel.objects.create(provider=self.provider, number="BAR-FREE", oil_type="Corn", liters=7)
+
+    def assert_same_bytes(self, viewset, serializer_class, row_serializer_class):
+        queryset = viewset.queryset.order_by("id")
+        expected = JSONRenderer().render(serializer_class(queryset, many=True).data)
+        rows = row_serializer_class(row_serializer_class.values(queryset)).data
+
+        self.assertEqual(JSONRenderer().render(rows), expected)
+        self.assertEqual(FastJSONRenderer().render(rows), expected)
+
+    def test_invoice_rows_match_invoice_serializer(self):
+        self.assert_same_bytes(InvoiceViewSet, InvoiceSerializer, InvoiceRowSerializer)
+
+    def test_barrel_rows_match_barrel_serializer(self):
+        self.assert_same_bytes(BarrelViewSet, BarrelSerializer, BarrelRowSerializer)
+
+    def test_provider_rows_match_provider_serializer(self):
+        self.assert_same_bytes(ProviderViewSet, ProviderSerializer, ProviderRowSerializer)
+
+    def test_fast_renderer_matches_json_renderer_on_serializer_output(self):
+        data = InvoiceSerializer(Invoice.objects.order_by("id"), many=True).data
+
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_fast_renderer_defers_indented_output(self):
+        data = {"name": self.provider.name}
+
+        self.assertEqual(
+            FastJSONRenderer().render(data, "application/json; indent=4"),
+            JSONRenderer().render(data, "application/json; indent=4"),
+        )
+
+    def test_list_endpoint_renders_like_the_model_serializer(self):
+        self.client.force_authenticate(user=self.superuser)
+        response = self.client.get(reverse("invoice-list"), {"page_size": 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        page_ids = [item["id"] for item in response.data["results"]]
+        invoices = sorted(
+            Invoice.objects.filter(id__in=page_ids), key=lambda invoice: page_ids.index(invoice.id)
+        )
+        expected = JSONRenderer().render(InvoiceSerializer(invoices, many=True).data)
+        self.assertIn(expected[1:-1], response.content)
+
+        # Keyset cursors still work on the row dicts.
+        following = self.client.get(response.data["next"])
+        self.assertEqual(len(following.data["results"]), 2)
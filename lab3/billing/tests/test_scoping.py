@@ -0,0 +1,114 @@
+from datetime import date
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from billing.models import Barrel, Invoice, Provider
+from billing.scoping import NO_PROVIDER, provider_setting, row_level_security
+from users import throttling
+
+User = get_user_model()
+
+
+class ScopedDataTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.provider = Provider.objects.create(
+            name="Acme Oils", address="Main St 1", tax_id="TAX-12345"
+        )
+        cls.other = Provider.objects.create(
+            name="Other Oils", address="Side St 2", tax_id="TAX-67890"
+        )
+        for provider in (cls.provider, cls.other):
+            Barrel.objects.create(
+                provider=provider, number=f"BAR-{provider.pk}", oil_type="Olive", liters=10
+            )
+            Invoice.objects.create(
+                provider=provider, invoice_no=f"INV-{provider.pk}", issued_on=date(2024, 5, 1)
+            )
+        cls.user = User.objects.create_user(
+            username="regular_user", password="strongpass123", provider=cls.provider
+        )
+        cls.loner = User.objects.create_user(username="loner", password="strongpass123")
+        cls.admin = User.objects.create_superuser(
+            username="admin", password="strongpass123", email="admin@example.com"
+        )
+
+
+class ProviderScopeTests(ScopedDataTestCase):
+    def test_users_see_their_provider_only(self):
+        for model in (Provider, Barrel, Invoice):
+            with self.subTest(model=model.__name__):
+                self.assertEqual(model.objects.for_user(self.admin).count(), model.objects.count())
+                self.assertEqual(model.objects.for_user(self.loner).count(), 0)
+                scoped = model.objects.for_user(self.user)
+                self.assertEqual(scoped.count(), 1)
+                self.assertEqual(
+                    scoped.get().pk, model.objects.for_provider(self.provider.pk).get().pk
+                )
+
+    def test_users_without_provider_see_themselves(self):
+        self.assertEqual(list(User.objects.for_user(self.loner)), [self.loner])
+        self.assertEqual(list(User.objects.for_user(self.user)), [self.user])
+        self.assertEqual(User.objects.for_user(self.admin).count(), 3)
+
+    def test_scope_composes_with_related_loading(self):
+        barrels = Barrel.objects.select_related("provider").for_user(self.user)
+        with self.assertNumQueries(1):
+            self.assertEqual([barrel.provider.name for barrel in barrels], ["Acme Oils"])
+
+        invoices = Invoice.objects.prefetch_related("lines").order_by("id").for_user(self.user)
+        with self.assertNumQueries(2):
+            self.assertEqual([list(invoice.lines.all()) for invoice in invoices], [[]])
+
+    @override_settings(POSTGRES_ROW_LEVEL_SECURITY=True)
+    def test_anonymous_requests_get_no_provider(self):
+        throttling.reset()
+        self.assertEqual(provider_setting(AnonymousUser()), NO_PROVIDER)
+        response = self.client.post(
+            reverse("user-signup"),
+            {
+                "username": "newcomer",
+                "password": "strongpass123",
+                "first_name": "New",
+                "last_name": "Comer",
+            },
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_row_level_security_is_off_by_default(self):
+        with self.assertNumQueries(1):
+            with row_level_security(self.user):
+                Barrel.objects.count()
+
+
+class RowLevelSecurityTests(ScopedDataTestCase):
+    def setUp(self):
+        if connection.vendor != "postgresql":
+            self.skipTest("Row-level security needs PostgreSQL.")
+        # Undone with the test's transaction.
+        call_command("row_level_security", "enable", stdout=StringIO())
+
+    def count_barrels(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM billing_barrel")
+            return cursor.fetchone()[0]
+
+    @override_settings(POSTGRES_ROW_LEVEL_SECURITY=True)
+    def test_policies_hide_other_providers_rows(self):
+        with row_level_security(self.user):
+            self.assertEqual(self.count_barrels(), 1)
+            self.assertEqual(Invoice.objects.count(), 1)
+        with row_level_security(self.loner):
+            self.assertEqual(self.count_barrels(), 0)
+        with row_level_security(self.admin):
+            self.assertEqual(self.count_barrels(), 2)
+        # Cleared when the block ends.
+        self.assertEqual(self.count_barrels(), 2)
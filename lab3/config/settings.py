@@ -25,6 +25,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "billing.api.instrumentation.RequestMetricsMiddleware",
+    "billing.replicas.ReplicaPinMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -52,6 +54,26 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "config.wsgi.application"
 
+# Connection reuse. POSTGRES_CONN_MAX_AGE keeps a worker's connection open
+# for that many seconds across requests (0: close after every request).
+# POSTGRES_POOL=1 uses psycopg's pool instead (one per worker process; it
+# needs CONN_MAX_AGE 0, which is then forced). Health checks test reused
+# connections, pooled or persistent, before handing them out.
+# POSTGRES_PGBOUNCER=1 is for pgbouncer in transaction mode: no server-side
+# cursors (prepared statements are already off in Django's psycopg3 backend).
+POSTGRES_POOL = os.environ.get("POSTGRES_POOL", "0") == "1"
+POSTGRES_PGBOUNCER = os.environ.get("POSTGRES_PGBOUNCER", "0") == "1"
+POSTGRES_OPTIONS = {}
+if POSTGRES_POOL:
+    POSTGRES_OPTIONS["pool"] = {
+        "min_size": int(os.environ.get("POSTGRES_POOL_MIN_SIZE", "2")),
+        "max_size": int(os.environ.get("POSTGRES_POOL_MAX_SIZE", "10")),
+        # Seconds a request waits for a free connection before failing.
+        "timeout": float(os.environ.get("POSTGRES_POOL_TIMEOUT", "10")),
+        # Seconds an idle connection above min_size is kept.
+        "max_idle": float(os.environ.get("POSTGRES_POOL_MAX_IDLE", "600")),
+    }
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
@@ -60,11 +82,82 @@ DATABASES = {
         "PASSWORD": os.environ.get("POSTGRES_PASSWORD", "billing_pass"),
         "HOST": os.environ.get("POSTGRES_HOST", "db"),
         "PORT": os.environ.get("POSTGRES_PORT", "5432"),
+        "CONN_MAX_AGE": 0 if POSTGRES_POOL else int(os.environ.get("POSTGRES_CONN_MAX_AGE", "0")),
+        "CONN_HEALTH_CHECKS": os.environ.get("POSTGRES_CONN_HEALTH_CHECKS", "1") == "1",
+        "DISABLE_SERVER_SIDE_CURSORS": POSTGRES_PGBOUNCER,
+        "OPTIONS": POSTGRES_OPTIONS,
     }
 }
 
+# POSTGRES_ROW_LEVEL_SECURITY=1 runs each API request with its provider in
+# the app.provider_id session variable, for the policies that
+# `manage.py row_level_security enable` switches on (billing.scoping). Not
+# with POSTGRES_PGBOUNCER: transaction pooling would hand one client's
+# session variable to another.
+POSTGRES_ROW_LEVEL_SECURITY = os.environ.get("POSTGRES_ROW_LEVEL_SECURITY", "0") == "1"
+
+# Read replicas: POSTGRES_REPLICA_HOSTS=host[:port],... adds "replica1",
+# "replica2", ... with the primary's database name and credentials. List and
+# detail reads are spread over them (billing.replicas); a user who wrote is
+# kept on the primary for REPLICA_PIN_SECONDS.
+DATABASE_REPLICAS = []
+for index, replica in enumerate(
+    filter(None, (h.strip() for h in os.environ.get("POSTGRES_REPLICA_HOSTS", "").split(","))),
+    start=1,
+):
+    replica_host, _, replica_port = replica.partition(":")
+    DATABASES[f"replica{index}"] = {
+        **DATABASES["default"],
+        "HOST": replica_host,
+        "PORT": replica_port or DATABASES["default"]["PORT"],
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(f"replica{index}")
+DATABASE_ROUTERS = ["billing.replicas.ReplicaRouter"]
+REPLICA_PIN_SECONDS = int(os.environ.get("REPLICA_PIN_SECONDS", "5"))
+
+# "responses" holds cached detail payloads (billing.api.caching). Point
+# RESPONSE_CACHE_URL at redis://... to share it between workers.
+RESPONSE_CACHE_URL = os.environ.get("RESPONSE_CACHE_URL", "")
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "responses": {
+        "BACKEND": (
+            "django.core.cache.backends.redis.RedisCache"
+            if RESPONSE_CACHE_URL
+            else "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": RESPONSE_CACHE_URL or "billing-responses",
+        "TIMEOUT": int(os.environ.get("RESPONSE_CACHE_TIMEOUT", "300")),
+    },
+}
+
 AUTH_PASSWORD_VALIDATORS = []
 
+# PASSWORD_HASHER picks the hasher new passwords are stored with. The others
+# stay listed so that existing hashes still verify (and are rehashed with the
+# chosen one on the next login). argon2 and bcrypt need the argon2-cffi and
+# bcrypt packages.
+PASSWORD_HASHER_CHOICES = {
+    "pbkdf2": "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "argon2": "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "bcrypt": "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "scrypt": "django.contrib.auth.hashers.ScryptPasswordHasher",
+}
+PASSWORD_HASHER = os.environ.get("PASSWORD_HASHER", "pbkdf2")
+PASSWORD_HASHERS = [
+    PASSWORD_HASHER_CHOICES[PASSWORD_HASHER],
+    *(path for name, path in PASSWORD_HASHER_CHOICES.items() if name != PASSWORD_HASHER),
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+]
+# Worker processes that hash passwords for bulk user imports (users.passwords).
+PASSWORD_HASH_PROCESSES = int(os.environ.get("PASSWORD_HASH_PROCESSES", os.cpu_count() or 1))
+# The same for POST /api/users/bulk/, per request: 1 hashes on the request's
+# own thread, so concurrent uploads cannot start a pool each.
+PASSWORD_HASH_API_PROCESSES = int(os.environ.get("PASSWORD_HASH_API_PROCESSES", "1"))
+
 LANGUAGE_CODE = "en-us"
 TIME_ZONE = "UTC"
 USE_I18N = True
@@ -79,7 +172,7 @@ AUTH_USER_MODEL = "users.User"
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.ClaimsJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",
@@ -87,7 +180,62 @@ REST_FRAMEWORK = {
     "DEFAULT_FILTER_BACKENDS": [
         "django_filters.rest_framework.DjangoFilterBackend",
     ],
+    "DEFAULT_PAGINATION_CLASS": "billing.api.pagination.KeysetPagination",
+    "PAGE_SIZE": int(os.environ.get("API_PAGE_SIZE", "50")),
+    # Reverse proxies in front of the app. Throttles take the client IP from
+    # X-Forwarded-For only this many hops in; with 0 they use REMOTE_ADDR,
+    # since any client can send the header.
+    "NUM_PROXIES": int(os.environ.get("API_NUM_PROXIES", "0")),
+}
+
+# Tokens carry the claims the API scopes by, so requests do not load the
+# user row (users.authentication). A revoked token is refused by every
+# worker within JWT_USER_CACHE_SECONDS.
+SIMPLE_JWT = {
+    "TOKEN_OBTAIN_SERIALIZER": "users.authentication.ClaimsTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "users.authentication.ClaimsTokenRefreshSerializer",
+}
+JWT_USER_CACHE_SECONDS = int(os.environ.get("JWT_USER_CACHE_SECONDS", "30"))
+
+# Token buckets guarding signup, /api/token/ and /api/token/refresh/
+# (users.throttling), per client IP and per username. "10/min" allows bursts
+# of 10 and 10 requests a minute; an empty rate disables that bucket. The
+# memory store keeps buckets per worker; "database" shares them.
+AUTH_THROTTLE_RATES = {
+    "signup_ip": os.environ.get("THROTTLE_SIGNUP_IP", "20/hour"),
+    "signup_username": os.environ.get("THROTTLE_SIGNUP_USERNAME", "5/hour"),
+    "token_ip": os.environ.get("THROTTLE_TOKEN_IP", "60/min"),
+    "token_username": os.environ.get("THROTTLE_TOKEN_USERNAME", "10/min"),
+    "refresh_ip": os.environ.get("THROTTLE_REFRESH_IP", "120/min"),
 }
+AUTH_THROTTLE_STORE = os.environ.get("AUTH_THROTTLE_STORE", "memory")
+# Password checks (login, signup) one worker runs at once; more get 429.
+AUTH_MAX_CONCURRENT_PASSWORD_CHECKS = int(
+    os.environ.get("AUTH_MAX_CONCURRENT_PASSWORD_CHECKS", "4")
+)
+
+# Add a Server-Timing header (query count, DB/serializer/total time) to
+# every response. Per-view aggregates are at /api/request-metrics/.
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "1") == "1"
+
+# Seconds a successful response is replayed for a repeated Idempotency-Key.
+IDEMPOTENCY_KEY_TTL = int(os.environ.get("IDEMPOTENCY_KEY_TTL", "86400"))
+# Seconds a request still running holds its key; retries meanwhile get 409.
+# Must outlast the slowest request, or a retry bills again; it only expires
+# early for requests whose worker died.
+IDEMPOTENCY_IN_FLIGHT_TIMEOUT = int(os.environ.get("IDEMPOTENCY_IN_FLIGHT_TIMEOUT", "3600"))
+
+# Background jobs (billing.jobs), run by `manage.py run_jobs`. A failed
+# attempt is retried JOB_RETRY_DELAY seconds later, doubling per attempt; a
+# running job whose worker sent no heartbeat for JOB_TIMEOUT seconds is
+# assumed lost and requeued. Workers send one every --poll-interval.
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_DELAY = float(os.environ.get("JOB_RETRY_DELAY", "10"))
+JOB_TIMEOUT = int(os.environ.get("JOB_TIMEOUT", "300"))
+# Files written by jobs (invoice exports); must be shared by web and workers.
+# `manage.py purge_job_output` deletes those older than JOB_OUTPUT_TTL seconds.
+JOB_OUTPUT_DIR = Path(os.environ.get("JOB_OUTPUT_DIR", BASE_DIR / "job_output"))
+JOB_OUTPUT_TTL = int(os.environ.get("JOB_OUTPUT_TTL", "604800"))
 
 SPECTACULAR_SETTINGS = {
     "TITLE": "Billing API",
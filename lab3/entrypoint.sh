@@ -17,8 +17,26 @@ else:
     raise SystemExit("PostgreSQL did not become available in time.")
 PY
 
-python manage.py migrate --noinput
-python manage.py collectstatic --noinput || true
+# Job workers leave migrations to the web container.
+if [ "${SERVER:-dev}" != "worker" ]; then
+  python manage.py migrate --noinput
+  python manage.py collectstatic --noinput || true
+fi
 
-# Dev server (simple). You can replace with gunicorn if desired.
-python manage.py runserver 0.0.0.0:8000
+# SERVER=wsgi: gunicorn sync workers; SERVER=asgi: uvicorn workers (async
+# views under /api/async/); SERVER=worker: background job worker; anything
+# else: the dev server.
+case "${SERVER:-dev}" in
+  worker)
+    exec python manage.py run_jobs --workers "${JOB_WORKERS:-4}" --pool "${JOB_POOL:-thread}"
+    ;;
+  wsgi)
+    exec gunicorn config.wsgi:application --bind 0.0.0.0:8000 --workers "${WEB_CONCURRENCY:-2}"
+    ;;
+  asgi)
+    exec uvicorn config.asgi:application --host 0.0.0.0 --port 8000 --workers "${WEB_CONCURRENCY:-2}"
+    ;;
+  *)
+    python manage.py runserver 0.0.0.0:8000
+    ;;
+esac
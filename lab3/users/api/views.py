@@ -1,32 +1,42 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from rest_framework import status, viewsets
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+from rest_framework import serializers, status, views, viewsets
 from rest_framework.decorators import action
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import PermissionDenied, UnsupportedMediaType
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
+from rest_framework_simplejwt import views as jwt_views
 
+from billing.api.permissions import IsSuperuser
+from billing.api.replicas import ReplicaReadMixin
+from billing.api.scoping import ProviderScopedMixin
+from billing.ingestion import CONTENT_TYPE_FORMATS
+from billing.models import Provider
+
+from .. import throttling
+from ..onboarding import import_users
+from ..throttling import auth_throttles, password_check_slot
 from .serializers import SignupSerializer, UserSerializer
 
 User = get_user_model()
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(ReplicaReadMixin, ProviderScopedMixin, viewsets.ModelViewSet):
     serializer_class = UserSerializer
     queryset = User.objects.select_related("provider").all().order_by("id")
 
-    def get_queryset(self):
-        user = self.request.user
-        if user.is_superuser:
-            return self.queryset
-        if user.provider_id is None:
-            return User.objects.filter(id=user.id)
-        return self.queryset.filter(provider_id=user.provider_id)
-
     def get_serializer_class(self):
         if self.action == "signup":
             return SignupSerializer
         return super().get_serializer_class()
 
+    def get_throttles(self):
+        if self.action == "signup":
+            return auth_throttles("signup")
+        return super().get_throttles()
+
     def perform_create(self, serializer):
         user = self.request.user
         if user.is_superuser:
@@ -46,6 +56,64 @@ class UserViewSet(viewsets.ModelViewSet):
     def signup(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        user = serializer.save()
+        with password_check_slot("signup"):
+            user = serializer.save()
         output = UserSerializer(user, context={"request": request})
         return Response(output.data, status=status.HTTP_201_CREATED)
+
+    @extend_schema(
+        request={content_type: OpenApiTypes.STR for content_type in CONTENT_TYPE_FORMATS},
+        parameters=[OpenApiParameter("provider", int, description="Superusers only.")],
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk(self, request, *args, **kwargs):
+        user = request.user
+        if not user.is_superuser:
+            if user.provider_id is None:
+                raise PermissionDenied("User is not linked to any provider.")
+            provider_id = user.provider_id
+        else:
+            provider_id = request.query_params.get("provider")
+            if provider_id is not None:
+                if not provider_id.isdigit() or not Provider.objects.filter(pk=provider_id).exists():
+                    raise serializers.ValidationError({"provider": "Provider does not exist."})
+                provider_id = int(provider_id)
+
+        content_type = request.content_type.split(";")[0].strip()
+        fmt = CONTENT_TYPE_FORMATS.get(content_type)
+        if fmt is None:
+            raise UnsupportedMediaType(content_type)
+        if request.stream is None:
+            raise serializers.ValidationError({"detail": "Request body is empty."})
+
+        lines = (line.decode("utf-8-sig") for line in iter(request.stream.readline, b""))
+        result = import_users(
+            lines,
+            fmt=fmt,
+            provider_id=provider_id,
+            processes=settings.PASSWORD_HASH_API_PROCESSES,
+        )
+        return Response(result.as_dict(), status=status.HTTP_200_OK)
+
+
+class TokenObtainPairView(jwt_views.TokenObtainPairView):
+    def get_throttles(self):
+        return auth_throttles("token")
+
+    def post(self, request, *args, **kwargs):
+        with password_check_slot("token"):
+            return super().post(request, *args, **kwargs)
+
+
+class TokenRefreshView(jwt_views.TokenRefreshView):
+    def get_throttles(self):
+        return auth_throttles("refresh")
+
+
+class ThrottleStatsView(views.APIView):
+    permission_classes = [IsSuperuser]
+
+    @extend_schema(responses={200: OpenApiTypes.OBJECT})
+    def get(self, request, *args, **kwargs):
+        return Response(throttling.stats())
@@ -0,0 +1,140 @@
+"""JWT authentication without a user query per request.
+
+Tokens from ``/api/token/`` carry the user's ``provider_id``,
+``is_superuser`` and ``token_version``, which is all the API needs for
+scoping. ``ClaimsJWTAuthentication`` builds ``request.user`` (a ``ClaimsUser``)
+from those claims. It only checks that the token has not been revoked:
+``User.save`` bumps ``token_version`` whenever a claimed field, ``is_active``
+or the password changes. Each worker keeps every user's
+``(is_active, token_version)`` for ``JWT_USER_CACHE_SECONDS``, so it reads
+a user's row at most once per interval. A revocation therefore reaches
+every worker within that interval, and the worker that saved the user
+forgets it at once.
+
+Tokens without these claims (issued before they existed) are checked
+against the database on every request, as simplejwt does.
+"""
+
+from __future__ import annotations
+
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.functional import cached_property
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.serializers import (
+    TokenObtainPairSerializer,
+    TokenRefreshSerializer,
+)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+User = get_user_model()
+
+CLAIMS = ("provider_id", "is_superuser", "token_version")
+# Bounds the per-worker cache; it is cleared when it grows past this.
+MAX_CACHED_USERS = 10000
+
+# user id -> (expires at, is_active, token_version), per worker.
+_token_states: dict = {}
+
+
+def token_state(user_id) -> tuple[bool, int] | None:
+    """``(is_active, token_version)`` of a user, or None if there is no such user."""
+    now = time.monotonic()
+    cached = _token_states.get(user_id)
+    if cached is not None and cached[0] > now:
+        return cached[1:]
+    state = (
+        User.objects.filter(**{api_settings.USER_ID_FIELD: user_id})
+        .values_list("is_active", "token_version")
+        .first()
+    )
+    if state is not None:
+        if len(_token_states) >= MAX_CACHED_USERS:
+            _token_states.clear()
+        _token_states[user_id] = (now + settings.JWT_USER_CACHE_SECONDS, *state)
+    return state
+
+
+def forget_token_state(user_id=None) -> None:
+    """Drop the cached state of one user, or of every user."""
+    if user_id is None:
+        _token_states.clear()
+    else:
+        _token_states.pop(user_id, None)
+
+
+@receiver(post_save, sender=User, dispatch_uid="forget_saved_user_token_state")
+@receiver(post_delete, sender=User, dispatch_uid="forget_deleted_user_token_state")
+def forget_changed_user(sender, instance, **kwargs):
+    forget_token_state(getattr(instance, api_settings.USER_ID_FIELD))
+
+
+def check_token(token) -> None:
+    """Raise ``AuthenticationFailed`` unless ``token`` is still valid for its user."""
+    try:
+        user_id = token[api_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise InvalidToken("Token contained no recognizable user identification")
+    state = token_state(user_id)
+    if state is None:
+        raise AuthenticationFailed("User not found", code="user_not_found")
+    is_active, token_version = state
+    if not is_active:
+        raise AuthenticationFailed("User is inactive", code="user_inactive")
+    if token["token_version"] != token_version:
+        raise AuthenticationFailed("Token has been revoked.", code="token_revoked")
+
+
+class ClaimsUser(TokenUser):
+    """``request.user`` for tokens with claims: everything but the row itself.
+
+    Code that needs the ``User`` instance must load it (e.g. ``created_by_id``
+    instead of ``created_by``).
+    """
+
+    def __str__(self) -> str:
+        return f"User {self.id}"
+
+    @cached_property
+    def provider_id(self) -> int | None:
+        return self.token["provider_id"]
+
+    @cached_property
+    def is_superuser(self) -> bool:
+        return self.token["is_superuser"]
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        if not all(claim in validated_token for claim in CLAIMS):
+            return super().get_user(validated_token)
+        check_token(validated_token)
+        return ClaimsUser(validated_token)
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token["provider_id"] = user.provider_id
+        token["is_superuser"] = user.is_superuser
+        token["token_version"] = user.token_version
+        return token
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refuse to refresh revoked tokens; access tokens inherit their claims."""
+
+    def validate(self, attrs):
+        refresh = RefreshToken(attrs["refresh"])
+        if "token_version" in refresh:
+            check_token(refresh)
+        return super().validate(attrs)
@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from users.passwords import hasher_algorithm, hasher_available, measure_hashing
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure password hashes per second, in total and per core, of the hashers "
+        "PASSWORD_HASHER can select"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hasher",
+            action="append",
+            dest="hashers",
+            choices=list(settings.PASSWORD_HASHER_CHOICES),
+            help="Only measure this hasher (can be repeated). Default: all.",
+        )
+        parser.add_argument(
+            "--passwords", type=int, default=50, help="Passwords hashed per measurement."
+        )
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=settings.PASSWORD_HASH_PROCESSES,
+            help="Also measure with this many processes (default: PASSWORD_HASH_PROCESSES).",
+        )
+
+    def handle(self, *args, **options):
+        if options["passwords"] < 1 or options["processes"] < 1:
+            raise CommandError("--passwords and --processes must be at least 1.")
+
+        for name in options["hashers"] or settings.PASSWORD_HASHER_CHOICES:
+            algorithm = hasher_algorithm(name)
+            if not hasher_available(algorithm):
+                self.stdout.write(f"{name:<8} not installed")
+                continue
+            for processes in sorted({1, options["processes"]}):
+                result = measure_hashing(
+                    algorithm, passwords=options["passwords"], processes=processes
+                )
+                self.stdout.write(
+                    f"{name:<8} processes={processes:<3} {result.per_second:9.1f} hashes/s  "
+                    f"{result.per_second_per_core:9.1f} hashes/s per core"
+                )
@@ -0,0 +1,64 @@
+import json
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from billing.ingestion import FORMATS
+from billing.models import Provider
+from users.onboarding import import_users
+
+
+class Command(BaseCommand):
+    help = "Bulk create users from a CSV or NDJSON file ('-' for stdin)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV/NDJSON file, or '-' to read stdin.")
+        parser.add_argument("--provider", type=int, help="Provider id to link the users to.")
+        parser.add_argument(
+            "--format",
+            choices=FORMATS,
+            help="Input format (default: from the file extension, csv for stdin).",
+        )
+        parser.add_argument("--chunk-size", type=int, default=500)
+        parser.add_argument(
+            "--processes",
+            type=int,
+            help="Password hashing processes (default: PASSWORD_HASH_PROCESSES).",
+        )
+
+    def handle(self, *args, **options):
+        provider_id = options["provider"]
+        if provider_id is not None and not Provider.objects.filter(id=provider_id).exists():
+            raise CommandError(f"Provider {provider_id} does not exist.")
+        if options["chunk_size"] < 1 or (options["processes"] or 1) < 1:
+            raise CommandError("--chunk-size and --processes must be at least 1.")
+
+        path = options["path"]
+        fmt = options["format"]
+        if fmt is None:
+            fmt = "ndjson" if Path(path).suffix.lower() in (".ndjson", ".jsonl") else "csv"
+
+        if path == "-":
+            result = self._load(sys.stdin, fmt, options)
+        else:
+            try:
+                with open(path, encoding="utf-8-sig", newline="") as lines:
+                    result = self._load(lines, fmt, options)
+            except OSError as exc:
+                raise CommandError(str(exc))
+
+        for rejection in result.rejected:
+            self.stdout.write(f"Row {rejection['row']} rejected: {json.dumps(rejection['errors'])}")
+        self.stdout.write(
+            self.style.SUCCESS(f"Created {result.created}, rejected {result.rejected_count}.")
+        )
+
+    def _load(self, lines, fmt, options):
+        return import_users(
+            lines,
+            fmt=fmt,
+            provider_id=options["provider"],
+            chunk_size=options["chunk_size"],
+            processes=options["processes"],
+        )
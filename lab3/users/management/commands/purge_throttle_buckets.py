@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from users.throttling import DatabaseBucketStore
+
+
+class Command(BaseCommand):
+    help = "Delete refilled auth throttle buckets (AUTH_THROTTLE_STORE=database)"
+
+    def handle(self, *args, **options):
+        deleted = DatabaseBucketStore().purge()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} throttle buckets."))
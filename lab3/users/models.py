@@ -1,6 +1,22 @@
 from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import UserManager as DjangoUserManager
 from django.db import models
 
+from billing.scoping import ProviderScopedQuerySet
+
+# Carried in the JWT claims (users.authentication) or deciding whether a
+# token may still be used; changing any of them revokes issued tokens.
+TOKEN_STATE_FIELDS = ("provider_id", "is_superuser", "is_active", "password")
+
+
+class UserQuerySet(ProviderScopedQuerySet):
+    def without_provider(self, user):
+        return self.filter(pk=user.pk)
+
+
+class UserManager(DjangoUserManager.from_queryset(UserQuerySet)):
+    pass
+
 
 class User(AbstractUser):
     provider = models.ForeignKey(
@@ -10,6 +26,47 @@ class User(AbstractUser):
         null=True,
         blank=True,
     )
+    # Embedded in issued tokens; bumping it revokes them.
+    token_version = models.PositiveIntegerField(default=1, editable=False)
+
+    objects = UserManager()
+    provider_scope_field = "provider"
 
     def __str__(self) -> str:
         return self.username
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if self.pk is not None and (
+            update_fields is None or set(update_fields) & {"provider", *TOKEN_STATE_FIELDS}
+        ):
+            stored = (
+                type(self).objects.filter(pk=self.pk).values(*TOKEN_STATE_FIELDS).first()
+            )
+            if stored is not None and any(
+                stored[field] != getattr(self, field) for field in TOKEN_STATE_FIELDS
+            ):
+                self.revoke_tokens()
+                if update_fields is not None:
+                    kwargs["update_fields"] = {*update_fields, "token_version"}
+        super().save(*args, **kwargs)
+
+    def revoke_tokens(self) -> None:
+        """Invalidate every token issued so far; saved with the next ``save``."""
+        self.token_version += 1
+
+
+class ThrottleBucket(models.Model):
+    """Token bucket of an auth throttle, for ``AUTH_THROTTLE_STORE=database``.
+
+    Times are Unix timestamps, so that every worker shares one clock. A row
+    past ``full_at`` is a full bucket and can be deleted.
+    """
+
+    key = models.CharField(max_length=255, primary_key=True)
+    tokens = models.FloatField()
+    updated_at = models.FloatField()
+    full_at = models.FloatField(db_index=True)
+
+    def __str__(self) -> str:
+        return self.key
@@ -0,0 +1,165 @@
+"""Bulk import of users from CSV or NDJSON, e.g. when onboarding a provider.
+
+Used by ``POST /api/users/bulk/`` and the ``import_users`` command. Rows are
+parsed like barrel loads (``billing.ingestion.iter_records``) and handled in
+chunks. Each chunk's passwords are hashed on a process pool
+(``users.passwords``) and its users are inserted with one ``bulk_create``.
+Invalid rows are reported and skipped; they never abort the rest of the load.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from billing.ingestion import MAX_REPORTED_REJECTIONS, iter_records
+
+from .passwords import PasswordHasherPool
+
+User = get_user_model()
+
+# Same rule as the signup and user serializers.
+PASSWORD_MIN_LENGTH = 8
+
+_validate_username = UnicodeUsernameValidator()
+
+
+@dataclass
+class UserImportResult:
+    created: int = 0
+    rejected_count: int = 0
+    rejected: list[dict] = field(default_factory=list)
+
+    def reject(self, row: int, errors: dict) -> None:
+        self.rejected_count += 1
+        if len(self.rejected) < MAX_REPORTED_REJECTIONS:
+            self.rejected.append({"row": row, "errors": errors})
+
+    def as_dict(self) -> dict:
+        return {
+            "created": self.created,
+            "rejected_count": self.rejected_count,
+            "rejected": self.rejected,
+        }
+
+
+def clean_record(record: dict) -> tuple[dict, dict]:
+    """Validate one raw record. Returns ``(values, errors)``."""
+    values: dict = {}
+    errors: dict = {}
+
+    for name in ("username", "first_name", "last_name"):
+        value = str(record.get(name) or "").strip()
+        max_length = User._meta.get_field(name).max_length
+        if not value:
+            errors[name] = "This field is required."
+        elif len(value) > max_length:
+            errors[name] = f"Ensure this field has no more than {max_length} characters."
+        values[name] = value
+    if "username" not in errors:
+        try:
+            _validate_username(values["username"])
+        except ValidationError as exc:
+            errors["username"] = exc.messages[0]
+
+    email = str(record.get("email") or "").strip()
+    if email:
+        try:
+            validate_email(email)
+        except ValidationError as exc:
+            errors["email"] = exc.messages[0]
+    values["email"] = email
+
+    password = record.get("password")
+    if not isinstance(password, str) or not password:
+        errors["password"] = "This field is required."
+    elif len(password) < PASSWORD_MIN_LENGTH:
+        errors["password"] = f"Ensure this field has at least {PASSWORD_MIN_LENGTH} characters."
+    values["password"] = password
+
+    return values, errors
+
+
+def import_users(
+    lines,
+    *,
+    fmt: str,
+    provider_id: int | None = None,
+    chunk_size: int = 500,
+    processes: int | None = None,
+) -> UserImportResult:
+    """Create users linked to ``provider_id`` from an iterable of text lines.
+
+    Usernames that already exist are rejected, not updated. ``processes``
+    defaults to ``PASSWORD_HASH_PROCESSES``.
+    """
+    result = UserImportResult()
+    records = iter_records(lines, fmt)
+    with PasswordHasherPool(processes) as pool:
+        while chunk := list(islice(records, chunk_size)):
+            _import_chunk(chunk, provider_id, pool, result)
+    return result
+
+
+def _import_chunk(chunk, provider_id, pool, result) -> None:
+    rejections: list[tuple[int, dict]] = []
+    valid: dict[str, tuple[int, dict]] = {}
+    for row_number, record, error in chunk:
+        if error is not None:
+            rejections.append((row_number, {"non_field_errors": error}))
+            continue
+        values, errors = clean_record(record)
+        if not errors and values["username"] in valid:
+            errors = {"username": "Duplicate username earlier in the same chunk."}
+        if errors:
+            rejections.append((row_number, errors))
+            continue
+        valid[values["username"]] = (row_number, values)
+
+    if valid:
+        existing = User.objects.filter(username__in=list(valid)).values_list(
+            "username", flat=True
+        )
+        for username in existing:
+            row_number, _ = valid.pop(username)
+            rejections.append(
+                (row_number, {"username": "A user with that username already exists."})
+            )
+
+    # Hashing is the slow part; no transaction is open while it runs.
+    passwords = dict(
+        zip(valid, pool.hash([values.pop("password") for _, values in valid.values()]))
+    )
+    # A username taken by another request meanwhile fails the insert; it is
+    # rejected like any existing one and the rest of the chunk is inserted.
+    while valid:
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create(
+                    [
+                        User(provider_id=provider_id, password=passwords[username], **values)
+                        for username, (_, values) in valid.items()
+                    ]
+                )
+            break
+        except IntegrityError:
+            taken = list(
+                User.objects.filter(username__in=list(valid)).values_list("username", flat=True)
+            )
+            if not taken:
+                raise
+            for username in taken:
+                row_number, _ = valid.pop(username)
+                rejections.append(
+                    (row_number, {"username": "A user with that username already exists."})
+                )
+
+    for row_number, errors in sorted(rejections, key=lambda rejection: rejection[0]):
+        result.reject(row_number, errors)
+    result.created += len(valid)
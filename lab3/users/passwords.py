@@ -0,0 +1,122 @@
+"""Hashing many passwords at once, and measuring how fast a hasher is.
+
+Password hashing is CPU-bound by design and holds the GIL, so threads do not
+help. ``PasswordHasherPool`` spreads ``make_password`` over worker processes.
+Small batches are hashed in-process, because starting the pool would cost
+more than it saves.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from time import perf_counter
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.utils.module_loading import import_string
+
+# By default, batches smaller than this are hashed in-process.
+MIN_POOL_BATCH = 8
+
+
+def hasher_algorithm(name: str) -> str:
+    """``make_password``'s ``hasher`` argument for a ``PASSWORD_HASHER_CHOICES`` name."""
+    return import_string(settings.PASSWORD_HASHER_CHOICES[name]).algorithm
+
+
+def hasher_available(algorithm: str) -> bool:
+    """False when the hasher's library (argon2-cffi, bcrypt) is not installed."""
+    hasher = get_hasher(algorithm)
+    if hasher.library is None:
+        return True
+    try:
+        hasher._load_library()
+    except ValueError:
+        return False
+    return True
+
+
+class PasswordHasherPool:
+    """``make_password`` on up to ``processes`` worker processes.
+
+    The pool is started on the first batch large enough to need it. Workers
+    are spawned rather than forked, so they never share this process's
+    database connections.
+    """
+
+    def __init__(
+        self,
+        processes: int | None = None,
+        hasher: str = "default",
+        min_batch: int = MIN_POOL_BATCH,
+    ):
+        if processes is None:
+            processes = settings.PASSWORD_HASH_PROCESSES
+        self.processes = processes
+        self.hasher = hasher
+        self.min_batch = min_batch
+        self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def start(self) -> None:
+        if self._executor is None and self.processes > 1:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=django.setup,
+            )
+            # Start every worker now rather than inside the first timed batch.
+            list(self._executor.map(_ready, range(self.processes)))
+
+    def hash(self, passwords: list[str]) -> list[str]:
+        encode = partial(make_password, hasher=self.hasher)
+        if self.processes <= 1 or len(passwords) < self.min_batch:
+            return [encode(password) for password in passwords]
+        self.start()
+        chunksize = max(1, len(passwords) // (self.processes * 4))
+        return list(self._executor.map(encode, passwords, chunksize=chunksize))
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+def _ready(_):
+    return True
+
+
+@dataclass
+class HashingResult:
+    hasher: str
+    processes: int
+    hashes: int
+    seconds: float
+
+    @property
+    def per_second(self) -> float:
+        return self.hashes / self.seconds if self.seconds else 0.0
+
+    @property
+    def per_second_per_core(self) -> float:
+        return self.per_second / self.processes
+
+
+def measure_hashing(algorithm: str, *, passwords: int, processes: int) -> HashingResult:
+    """Time hashing ``passwords`` distinct passwords with ``algorithm``."""
+    batch = [f"benchmark-password-{index}" for index in range(passwords)]
+    with PasswordHasherPool(processes, hasher=algorithm, min_batch=1) as pool:
+        pool.start()
+        started = perf_counter()
+        pool.hash(batch)
+        seconds = perf_counter() - started
+    return HashingResult(algorithm, processes, passwords, seconds)
@@ -0,0 +1,185 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from billing.models import Provider
+from users import onboarding
+from users.passwords import PasswordHasherPool
+
+User = get_user_model()
+
+
+# A fast hasher keeps these tests quick; the pool is exercised on its own below.
+@override_settings(
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+    PASSWORD_HASH_PROCESSES=1,
+)
+class UserBulkImportTests(APITestCase):
+    def setUp(self):
+        self.provider = Provider.objects.create(
+            name="Acme Oils", address="Main St 1", tax_id="TAX-12345"
+        )
+        self.other = Provider.objects.create(
+            name="Other Oils", address="Side St 2", tax_id="TAX-67890"
+        )
+        self.user = User.objects.create_user(
+            username="regular_user", password="strongpass123", provider=self.provider
+        )
+        self.admin = User.objects.create_superuser(
+            username="admin", password="strongpass123", email="admin@example.com"
+        )
+        self.url = reverse("user-bulk")
+
+    def post(self, user, body, content_type, **params):
+        self.client.force_authenticate(user=user)
+        url = self.url
+        if params:
+            url += "?" + "&".join(f"{key}={value}" for key, value in params.items())
+        return self.client.generic("POST", url, body, content_type=content_type)
+
+    def test_csv_upload_creates_provider_users_and_reports_rejections(self):
+        body = (
+            "username,password,first_name,last_name,email\n"
+            "ann,strongpass1,Ann,Lee,ann@example.com\n"
+            "regular_user,strongpass1,Reg,User,\n"
+            "bob,short,Bob,Ray,\n"
+            "ann,strongpass2,Ann,Again,\n"
+            "carl,strongpass3,,Stone,not-an-email\n"
+            "dora,strongpass4,Dora,Fox,\n"
+        )
+
+        response = self.post(self.user, body, "text/csv")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual(response.data["rejected_count"], 4)
+        self.assertEqual([item["row"] for item in response.data["rejected"]], [2, 3, 4, 5])
+        self.assertEqual(set(response.data["rejected"][3]["errors"]), {"first_name", "email"})
+        ann = User.objects.get(username="ann")
+        self.assertEqual(ann.provider_id, self.provider.pk)
+        self.assertEqual((ann.first_name, ann.email), ("Ann", "ann@example.com"))
+        self.assertTrue(ann.check_password("strongpass1"))
+        self.assertEqual(User.objects.get(username="dora").provider_id, self.provider.pk)
+
+    @override_settings(PASSWORD_HASH_PROCESSES=8, PASSWORD_HASH_API_PROCESSES=1)
+    def test_uploads_do_not_start_a_hashing_pool_per_request(self):
+        body = "username,password,first_name,last_name\nann,strongpass1,Ann,Lee\n"
+        with mock.patch.object(
+            onboarding, "PasswordHasherPool", wraps=PasswordHasherPool
+        ) as pool:
+            response = self.post(self.user, body, "text/csv")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(pool.call_args.args, (1,))
+
+    def test_usernames_taken_during_hashing_are_rejected_not_fatal(self):
+        hash_passwords = PasswordHasherPool.hash
+
+        def racing_hash(pool, passwords):
+            # Another request signs "ann" up while this chunk is hashed.
+            User.objects.get_or_create(username="ann")
+            return hash_passwords(pool, passwords)
+
+        body = (
+            "username,password,first_name,last_name\n"
+            "ann,strongpass1,Ann,Lee\n"
+            "bob,strongpass2,Bob,Ray\n"
+        )
+        with mock.patch.object(PasswordHasherPool, "hash", racing_hash):
+            response = self.post(self.user, body, "text/csv")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual([item["row"] for item in response.data["rejected"]], [1])
+        self.assertEqual(User.objects.get(username="bob").provider_id, self.provider.pk)
+        self.assertIsNone(User.objects.get(username="ann").provider_id)
+
+    def test_superusers_choose_the_provider(self):
+        body = json.dumps(
+            {"username": "eve", "password": "strongpass1", "first_name": "Eve", "last_name": "Z"}
+        )
+
+        response = self.post(self.admin, body, "application/x-ndjson", provider=self.other.pk)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(User.objects.get(username="eve").provider_id, self.other.pk)
+
+        response = self.post(self.admin, body, "application/x-ndjson", provider=999999)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_users_without_provider_cannot_import(self):
+        loner = User.objects.create_user(username="loner", password="strongpass123")
+
+        response = self.post(loner, "username,password\n", "text/csv")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_import_users_command_loads_file_in_chunks(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "users.ndjson"
+            path.write_text(
+                "\n".join(
+                    json.dumps(
+                        {
+                            "username": f"user{index}",
+                            "password": f"strongpass{index}",
+                            "first_name": "User",
+                            "last_name": str(index),
+                        }
+                    )
+                    for index in range(5)
+                )
+            )
+            output = StringIO()
+            call_command(
+                "import_users",
+                str(path),
+                "--provider",
+                str(self.provider.pk),
+                "--chunk-size",
+                "2",
+                stdout=output,
+            )
+
+        self.assertIn("Created 5, rejected 0.", output.getvalue())
+        self.assertEqual(User.objects.filter(username__startswith="user").count(), 5)
+
+
+class PasswordHasherPoolTests(SimpleTestCase):
+    def test_pool_hashes_match_their_passwords(self):
+        passwords = [f"strongpass{index}" for index in range(8)]
+
+        with PasswordHasherPool(processes=2) as pool:
+            hashes = pool.hash(passwords)
+
+        self.assertEqual(len(set(hashes)), len(passwords))
+        for password, encoded in zip(passwords, hashes):
+            self.assertTrue(check_password(password, encoded))
+
+    @override_settings(PASSWORD_HASH_PROCESSES=8)
+    def test_zero_processes_hash_inline(self):
+        self.assertEqual(PasswordHasherPool(processes=0).processes, 0)
+        self.assertEqual(PasswordHasherPool().processes, 8)
+
+    def test_benchmark_reports_hashes_per_core(self):
+        output = StringIO()
+        call_command(
+            "benchmark_password_hashers",
+            "--hasher",
+            "scrypt",
+            "--passwords",
+            "1",
+            "--processes",
+            "1",
+            stdout=output,
+        )
+
+        self.assertRegex(output.getvalue(), r"scrypt +processes=1 .* hashes/s per core")
@@ -0,0 +1,126 @@
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from billing.models import Provider
+from users import throttling
+from users.authentication import forget_token_state
+
+User = get_user_model()
+
+
+class ClaimsAuthenticationTests(APITestCase):
+    def setUp(self):
+        caches["responses"].clear()
+        forget_token_state()
+        throttling.reset()
+        self.provider = Provider.objects.create(
+            name="Acme Oils", address="Main St 1", tax_id="TAX-12345"
+        )
+        self.other = Provider.objects.create(
+            name="Other Oils", address="Side St 2", tax_id="TAX-67890"
+        )
+        self.user = User.objects.create_user(
+            username="regular_user", password="strongpass123", provider=self.provider
+        )
+
+    def obtain(self, username="regular_user", password="strongpass123"):
+        response = self.client.post(
+            reverse("token_obtain_pair"),
+            {"username": username, "password": password},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def get(self, access, url=None):
+        return self.client.get(
+            url or reverse("provider-list"), headers={"Authorization": f"Bearer {access}"}
+        )
+
+    def user_queries(self, access):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(access)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [query["sql"] for query in queries if "users_user" in query["sql"]]
+
+    def test_tokens_carry_the_scoping_claims(self):
+        token = AccessToken(self.obtain()["access"])
+
+        self.assertEqual(token["provider_id"], self.provider.pk)
+        self.assertFalse(token["is_superuser"])
+        self.assertEqual(token["token_version"], 1)
+
+    def test_requests_do_not_load_the_user_row(self):
+        access = self.obtain()["access"]
+        # The first request of a worker reads the user's token state.
+        self.assertEqual(len(self.user_queries(access)), 1)
+        self.assertEqual(self.user_queries(access), [])
+
+        response = self.get(access)
+        self.assertEqual([item["id"] for item in response.data["results"]], [self.provider.pk])
+
+    def test_claim_changes_revoke_issued_tokens(self):
+        for change in [
+            lambda user: setattr(user, "provider", self.other),
+            lambda user: setattr(user, "is_superuser", True),
+            lambda user: user.set_password("strongpass123"),
+        ]:
+            tokens = self.obtain()
+            self.assertEqual(self.get(tokens["access"]).status_code, status.HTTP_200_OK)
+
+            change(self.user)
+            self.user.save()
+
+            response = self.get(tokens["access"])
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+            self.assertEqual(response.data["detail"].code, "token_revoked")
+            response = self.client.post(
+                reverse("token_refresh"), {"refresh": tokens["refresh"]}, format="json"
+            )
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_unrelated_saves_keep_tokens_valid(self):
+        access = self.obtain()["access"]
+        self.user.first_name = "Ann"
+        self.user.save()
+        self.user.save(update_fields=["last_login"])
+
+        self.assertEqual(self.get(access).status_code, status.HTTP_200_OK)
+
+    def test_deactivated_users_are_refused(self):
+        access = self.obtain()["access"]
+        self.user.is_active = False
+        self.user.save(update_fields=["is_active"])
+
+        response = self.get(access)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revocations_from_other_workers_apply_after_the_cache_interval(self):
+        access = self.obtain()["access"]
+        self.get(access)
+        # As if saved by another worker: this worker's cache is not told.
+        User.objects.filter(pk=self.user.pk).update(token_version=2)
+
+        self.assertEqual(self.get(access).status_code, status.HTTP_200_OK)
+        later = time.monotonic() + settings.JWT_USER_CACHE_SECONDS + 1
+        with mock.patch("users.authentication.time.monotonic", return_value=later):
+            self.assertEqual(self.get(access).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_tokens_without_claims_are_checked_against_the_database(self):
+        access = AccessToken.for_user(self.user)
+        self.assertEqual(len(self.user_queries(access)), 1)
+        self.assertEqual(len(self.user_queries(access)), 1)
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.get(access).status_code, status.HTTP_401_UNAUTHORIZED)
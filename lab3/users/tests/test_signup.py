@@ -3,11 +3,14 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 
+from users import throttling
+
 User = get_user_model()
 
 
 class SignupEndpointTests(APITestCase):
     def setUp(self):
+        throttling.reset()
         self.signup_url = reverse("user-signup")
 
         self.valid_payload = {
@@ -0,0 +1,151 @@
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from users import throttling
+from users.models import ThrottleBucket
+
+User = get_user_model()
+
+RATES = {
+    "signup_ip": "2/min",
+    "signup_username": "",
+    "token_ip": "3/min",
+    "token_username": "2/min",
+    "refresh_ip": "1/hour",
+}
+
+
+@override_settings(
+    AUTH_THROTTLE_RATES=RATES,
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+)
+class AuthThrottleTests(APITestCase):
+    def setUp(self):
+        throttling.reset()
+        self.user = User.objects.create_user(username="regular_user", password="strongpass123")
+
+    def obtain(self, username="regular_user", password="strongpass123", ip="10.0.0.1", **extra):
+        return self.client.post(
+            reverse("token_obtain_pair"),
+            {"username": username, "password": password},
+            format="json",
+            REMOTE_ADDR=ip,
+            **extra,
+        )
+
+    def signup(self, username, ip="10.0.0.1"):
+        return self.client.post(
+            reverse("user-signup"),
+            {
+                "username": username,
+                "password": "strongpass123",
+                "first_name": "New",
+                "last_name": "User",
+            },
+            format="json",
+            REMOTE_ADDR=ip,
+        )
+
+    def test_token_attempts_are_limited_per_username(self):
+        response = self.obtain(password="wrong-pass")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.obtain().status_code, status.HTTP_200_OK)
+
+        response = self.obtain(ip="10.0.0.2")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response["Retry-After"], "30")
+        # Usernames are not case-sensitive for throttling.
+        response = self.obtain(username="Regular_User", ip="10.0.0.3")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_token_attempts_are_limited_per_ip(self):
+        for username in ["a", "b", "c"]:
+            response = self.obtain(username=username)
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        response = self.obtain(username="d")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        response = self.obtain(username="d", ip="10.0.0.2")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_forwarded_for_is_ignored_without_trusted_proxies(self):
+        for index, username in enumerate(["a", "b", "c", "d"]):
+            response = self.obtain(username=username, HTTP_X_FORWARDED_FOR=f"192.0.2.{index}")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, "NUM_PROXIES": 1}):
+            response = self.obtain(username="e", HTTP_X_FORWARDED_FOR="192.0.2.9")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_buckets_refill_over_time(self):
+        self.obtain()
+        self.obtain()
+        self.assertEqual(self.obtain().status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        later = time.monotonic() + 30
+        with mock.patch("users.throttling.time.monotonic", return_value=later):
+            self.assertEqual(self.obtain().status_code, status.HTTP_200_OK)
+            self.assertEqual(self.obtain().status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_signup_and_refresh_are_throttled(self):
+        self.assertEqual(self.signup("first").status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.signup("second").status_code, status.HTTP_201_CREATED)
+        response = self.signup("third")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertFalse(User.objects.filter(username="third").exists())
+
+        refresh = self.obtain(ip="10.0.0.9").data["refresh"]
+        url = reverse("token_refresh")
+        self.assertEqual(
+            self.client.post(url, {"refresh": refresh}, format="json").status_code,
+            status.HTTP_200_OK,
+        )
+        self.assertEqual(
+            self.client.post(url, {"refresh": refresh}, format="json").status_code,
+            status.HTTP_429_TOO_MANY_REQUESTS,
+        )
+
+    @override_settings(AUTH_MAX_CONCURRENT_PASSWORD_CHECKS=1)
+    def test_concurrent_password_checks_are_capped(self):
+        with throttling.password_check_slot("test"):
+            response = self.obtain()
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        self.assertEqual(self.obtain().status_code, status.HTTP_200_OK)
+
+    def test_superusers_see_rejection_counts(self):
+        for _ in range(3):
+            self.obtain()
+        admin = User.objects.create_superuser(username="admin", password="strongpass123")
+        self.client.force_authenticate(user=admin)
+
+        response = self.client.get(reverse("throttle-stats"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["store"], settings.AUTH_THROTTLE_STORE)
+        token = response.data["scopes"]["token"]
+        self.assertEqual(token["username"], {"checked": 3, "rejected": 1})
+        self.assertEqual(token["concurrency"], {"checked": 2, "rejected": 0})
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse("throttle-stats"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(AUTH_THROTTLE_STORE="database")
+    def test_database_store_shares_buckets(self):
+        self.obtain()
+        self.obtain()
+        throttling.reset()  # Another worker: its in-process state is empty.
+
+        self.assertEqual(self.obtain().status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(ThrottleBucket.objects.count(), 2)
+
+        with mock.patch("users.throttling.time.time", return_value=time.time() + 3600):
+            self.assertEqual(throttling.DatabaseBucketStore().purge(), 2)
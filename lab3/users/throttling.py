@@ -0,0 +1,216 @@
+"""Token-bucket throttles for the unauthenticated, password-hashing endpoints.
+
+Signup, ``/api/token/`` and ``/api/token/refresh/`` are guarded per client IP
+and, where the request names one, per username. The client IP is DRF's
+``get_ident``: ``REMOTE_ADDR``, or with ``REST_FRAMEWORK["NUM_PROXIES"]``
+trusted proxies the ``X-Forwarded-For`` entry the outermost one added. Each
+scope and kind has its own rate in ``AUTH_THROTTLE_RATES``. A rate of
+``"10/min"`` lets a bucket hold 10 requests and refills it at 10 per minute,
+so bursts up to the rate pass and a steady stream above it is refused with
+``429`` and ``Retry-After``. A check costs one dictionary lookup (the default in-process
+store, per worker) or one locked row (``AUTH_THROTTLE_STORE=database``,
+shared by every worker).
+
+On top of the buckets, ``password_check_slot`` caps how many password checks
+a worker runs at once (``AUTH_MAX_CONCURRENT_PASSWORD_CHECKS``). Requests
+past the cap are refused instead of queueing behind the hashing.
+
+Checks and rejections are counted per worker and shown at
+``/api/throttle-stats/``.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from rest_framework.exceptions import Throttled
+from rest_framework.throttling import BaseThrottle
+
+from .models import ThrottleBucket
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+# Oldest buckets are dropped past this many in the in-process store.
+MAX_MEMORY_BUCKETS = 100_000
+MAX_KEY_LENGTH = ThrottleBucket._meta.get_field("key").max_length
+
+_lock = threading.Lock()
+_counters: dict = {}
+_semaphores: dict = {}
+
+
+def parse_rate(rate: str) -> tuple[int, int]:
+    """``"10/min"`` -> ``(10, 60)``: bucket capacity and refill period in seconds."""
+    count, _, period = rate.partition("/")
+    try:
+        return int(count), PERIODS[period.strip()[:1]]
+    except (KeyError, ValueError):
+        raise ImproperlyConfigured(f"Invalid throttle rate {rate!r}, expected e.g. '10/min'.")
+
+
+def _refill(tokens, updated_at, now, capacity, per_second) -> float:
+    return min(capacity, tokens + max(0.0, now - updated_at) * per_second)
+
+
+class MemoryBucketStore:
+    """Buckets in a dictionary of this worker, oldest dropped first."""
+
+    def __init__(self, max_buckets: int = MAX_MEMORY_BUCKETS):
+        self.max_buckets = max_buckets
+        self._buckets: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: int, per_second: float) -> float:
+        """Take one token. Returns 0, or the seconds until one is available."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (capacity, now))
+            tokens = _refill(tokens, updated_at, now, capacity, per_second)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / per_second
+            self._buckets[key] = (tokens - 1 if not wait else tokens, now)
+            if len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class DatabaseBucketStore:
+    """Buckets in ``ThrottleBucket`` rows, shared by every worker."""
+
+    def take(self, key: str, capacity: int, per_second: float) -> float:
+        now = time.time()
+        with transaction.atomic():
+            ThrottleBucket.objects.bulk_create(
+                [ThrottleBucket(key=key, tokens=capacity, updated_at=now, full_at=now)],
+                ignore_conflicts=True,
+            )
+            bucket = ThrottleBucket.objects.select_for_update().get(key=key)
+            tokens = _refill(bucket.tokens, bucket.updated_at, now, capacity, per_second)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / per_second
+            if not wait:
+                tokens -= 1
+            bucket.tokens = tokens
+            bucket.updated_at = now
+            bucket.full_at = now + (capacity - tokens) / per_second
+            bucket.save(update_fields=["tokens", "updated_at", "full_at"])
+        return wait
+
+    def clear(self) -> None:
+        ThrottleBucket.objects.all().delete()
+
+    def purge(self) -> int:
+        """Delete the rows of buckets that have refilled; returns how many."""
+        deleted, _ = ThrottleBucket.objects.filter(full_at__lte=time.time()).delete()
+        return deleted
+
+
+_memory_store = MemoryBucketStore()
+
+
+def get_store():
+    if settings.AUTH_THROTTLE_STORE == "memory":
+        return _memory_store
+    if settings.AUTH_THROTTLE_STORE == "database":
+        return DatabaseBucketStore()
+    raise ImproperlyConfigured("AUTH_THROTTLE_STORE must be 'memory' or 'database'.")
+
+
+def _count(scope: str, kind: str, rejected: bool) -> None:
+    with _lock:
+        counter = _counters.setdefault((scope, kind), {"checked": 0, "rejected": 0})
+        counter["checked"] += 1
+        counter["rejected"] += rejected
+
+
+def stats() -> dict:
+    with _lock:
+        snapshot = {key: dict(counter) for key, counter in _counters.items()}
+    result: dict = {}
+    for (scope, kind), counter in sorted(snapshot.items()):
+        result.setdefault(scope, {})[kind] = counter
+    return {"store": settings.AUTH_THROTTLE_STORE, "scopes": result}
+
+
+def reset() -> None:
+    """Forget this worker's counters and in-process buckets."""
+    with _lock:
+        _counters.clear()
+    _memory_store.clear()
+
+
+class BucketThrottle(BaseThrottle):
+    """One token bucket per ``(scope, kind, identity)``; see the module docstring."""
+
+    kind: str
+
+    def __init__(self, scope: str):
+        self.scope = scope
+        self.retry_after = None
+
+    def identity(self, request) -> str | None:
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        rate = settings.AUTH_THROTTLE_RATES.get(f"{self.scope}_{self.kind}")
+        identity = self.identity(request) if rate else None
+        if identity is None:
+            return True
+        capacity, period = parse_rate(rate)
+        key = f"{self.scope}:{self.kind}:{identity}"[:MAX_KEY_LENGTH]
+        self.retry_after = get_store().take(key, capacity, capacity / period)
+        _count(self.scope, self.kind, rejected=bool(self.retry_after))
+        return not self.retry_after
+
+    def wait(self):
+        return self.retry_after
+
+
+class IPThrottle(BucketThrottle):
+    kind = "ip"
+
+    def identity(self, request) -> str | None:
+        return self.get_ident(request)
+
+
+class UsernameThrottle(BucketThrottle):
+    kind = "username"
+
+    def identity(self, request) -> str | None:
+        username = request.data.get("username") if hasattr(request.data, "get") else None
+        if not isinstance(username, str) or not username:
+            return None
+        return username.lower()
+
+
+def auth_throttles(scope: str) -> list[BucketThrottle]:
+    return [IPThrottle(scope), UsernameThrottle(scope)]
+
+
+def _semaphore(size: int) -> threading.BoundedSemaphore:
+    with _lock:
+        semaphore = _semaphores.get(size)
+        if semaphore is None:
+            semaphore = _semaphores[size] = threading.BoundedSemaphore(size)
+    return semaphore
+
+
+@contextmanager
+def password_check_slot(scope: str):
+    """Hold one of the worker's password check slots, or raise ``Throttled``."""
+    semaphore = _semaphore(settings.AUTH_MAX_CONCURRENT_PASSWORD_CHECKS)
+    acquired = semaphore.acquire(blocking=False)
+    _count(scope, "concurrency", rejected=not acquired)
+    if not acquired:
+        raise Throttled(wait=1, detail="Too many concurrent login attempts, retry shortly.")
+    try:
+        yield
+    finally:
+        semaphore.release()